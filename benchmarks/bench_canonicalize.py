@@ -0,0 +1,75 @@
+# scraper_module/benchmarks/bench_canonicalize.py
+"""
+Time canonicalize_url over a synthetic link stream in which, as on a real
+site, the same menu and pager links show up on every page, and compare it
+with the uncached canonicalizer and the old path-only version.
+
+    python -m scraper_module.benchmarks.bench_canonicalize --pages 2000 --links 80
+"""
+import argparse
+import random
+import time
+from urllib.parse import urlparse, urlunparse
+
+from scraper_module.scraper_lib.helpers import UrlCanonicalizer
+
+
+def old_canonicalize_url(url):
+    # canonicalize_url before the UrlCanonicalizer: trailing slash only.
+    parsed = urlparse(url)
+    path = parsed.path.rstrip('/')
+    if not path:
+        path = '/'
+    return urlunparse((parsed.scheme, parsed.netloc, path, parsed.params, parsed.query, parsed.fragment))
+
+
+def link_stream(pages, links, seed=3):
+    """
+    The links of 'pages' pages: links/2 shared menu links, each written one
+    of four ways (query order, host case, default port, tracking
+    parameters), plus links/2 course links unique to each page.
+    """
+    rng = random.Random(seed)
+    menu = []
+    for i in range(links // 2):
+        menu.append([
+            f"https://catalog.example.edu/menu/{i}/?dept={i % 7}&page={i}",
+            f"https://catalog.example.edu/menu/{i}?page={i}&dept={i % 7}",
+            f"https://Catalog.Example.EDU:443/menu/{i}/?dept={i % 7}&page={i}#top",
+            f"https://catalog.example.edu/menu/{i}/?dept={i % 7}&page={i}&utm_source=newsletter&utm_medium=email",
+        ])
+    for p in range(pages):
+        for variants in menu:
+            yield rng.choice(variants)
+        for j in range(links - links // 2):
+            yield f"https://catalog.example.edu/courses/{p}/{j}/?coid={p * links + j}&catoid=7"
+
+
+def bench(canonicalize, urls):
+    start = time.perf_counter()
+    keys = {canonicalize(url) for url in urls}
+    return time.perf_counter() - start, len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--links", type=int, default=80, help="Links per page, half of them the shared menu")
+    args = parser.parse_args()
+
+    urls = list(link_stream(args.pages, args.links))
+    cached = UrlCanonicalizer()
+    configurations = {
+        "old": old_canonicalize_url,
+        "uncached": UrlCanonicalizer(cache_size=0),
+        "cached": cached,
+    }
+    for label, canonicalize in configurations.items():
+        seconds, keys = bench(canonicalize, urls)
+        print(f"{label:>8}: {len(urls)} URLs in {seconds:.3f}s = {len(urls) / seconds / 1e6:.2f}M URLs/s, {keys} visited keys")
+    info = cached.cache_info()
+    print(f"cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# scraper_module/benchmarks/bench_distributed.py
+"""
+Run the fixture sites (see fixtures.py) with DistributedRunAllEngines on one
+node and then on several, each node its own process sharing one directory,
+as a local stand-in for a fleet of machines. The fixture server answers
+every request after --latency seconds, and each node keeps only a few
+requests in flight, so the crawl is bound by politeness rather than CPU, as
+a real nightly run is.
+
+    python -m scraper_module.benchmarks.bench_distributed --nodes 3 --latency 0.05
+    python -m scraper_module.benchmarks.bench_distributed --nodes 3 --kill-after 5
+
+--kill-after SIGKILLs one node partway through the multi-node run; the
+others take its requests over once its leases run out. Every run must merge
+the same items (checked).
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from scraper_module.benchmarks import fixtures, suite
+
+NODE_SETTINGS = {
+    "LOG_LEVEL": "ERROR",
+    "CONCURRENT_REQUESTS": 4,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+}
+
+
+class SlowReplayHandler(fixtures.ReplayHandler):
+    def __init__(self, *args, latency, **kwargs):
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+
+def serve(paths, latency):
+    pages, key_params = fixtures.load(paths)
+    handler = functools.partial(SlowReplayHandler, pages=pages, key_params=key_params, latency=latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def digest(items):
+    lines = sorted(json.dumps(item, sort_keys=True, ensure_ascii=False) for item in items)
+    return hashlib.blake2b("\n".join(lines).encode("utf8"), digest_size=8).hexdigest()
+
+
+async def run_node(base_url, shared_dir, node, lease_seconds):
+    from scraper_module.scraper_lib.distributed import DistributedRunAllEngines
+    from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+    engines = [ScraperEngine(factory(base_url)) for factory in (suite.listing_config, suite.menu_config, suite.catalog_config)]
+    runner = DistributedRunAllEngines(
+        engines, shared_dir, NODE_SETTINGS, node=node, lease_seconds=lease_seconds, poll_seconds=0.5,
+    )
+    merged = await runner.run_all()
+    return {
+        "merged": {name: [len(items), digest(items)] for name, items in merged.items()},
+        "throughput": runner.throughput,
+    }
+
+
+def run_fleet(base_url, nodes, lease_seconds, kill_after=None):
+    shared_dir = tempfile.mkdtemp(prefix="scraper_fleet_")
+    start = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "scraper_module.benchmarks.bench_distributed",
+             "--child", base_url, shared_dir, f"node{i}", str(lease_seconds)],
+            stdout=subprocess.PIPE, text=True, cwd=shared_dir,
+        )
+        for i in range(nodes)
+    ]
+    if kill_after:
+        time.sleep(kill_after)
+        procs[0].send_signal(signal.SIGKILL)
+        print(f"  killed node0 after {kill_after}s", file=sys.stderr)
+    merged, throughput = {}, {}
+    for proc in procs:
+        out, _ = proc.communicate()
+        if proc.returncode:
+            continue
+        result = json.loads(out.strip().splitlines()[-1])
+        merged.update(result["merged"])
+        throughput = result["throughput"]
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(shared_dir, ignore_errors=True)
+    return elapsed, dict(sorted(merged.items())), throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="./bench_fixtures", help="Folder of recorded sites (created if missing)")
+    parser.add_argument("--scale", type=float, default=0.5, help="Size of the generated sites")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the server takes per response")
+    parser.add_argument("--lease-seconds", type=float, default=5)
+    parser.add_argument("--kill-after", type=float, help="SIGKILL one node this many seconds into the multi-node run")
+    parser.add_argument("--child", nargs=4, metavar=("URL", "DIR", "NODE", "LEASE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.basicConfig(level=logging.ERROR)
+        base_url, shared_dir, node, lease_seconds = args.child
+        print(json.dumps(asyncio.run(run_node(base_url, shared_dir, node, float(lease_seconds)))))
+        return
+
+    paths = fixtures.record_all(os.path.abspath(args.fixtures), args.scale).values()
+    server = serve(paths, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    results = {}
+    for nodes in sorted({1, args.nodes}):
+        kill_after = args.kill_after if nodes > 1 else None
+        elapsed, merged, throughput = results[nodes] = run_fleet(base_url, nodes, args.lease_seconds, kill_after)
+        print(f"{nodes} node(s): {elapsed:.1f}s, merged {merged}")
+        for node, report in throughput.items():
+            print(f"  {node}: {report['pages']} pages, {report['items']} items, {report['pages_per_sec']} pages/s")
+    server.shutdown()
+
+    single = results[1][1]
+    if any(merged != single for _, merged, _ in results.values()):
+        raise SystemExit("The runs merged different items.")
+    if args.nodes > 1:
+        print(f"speedup with {args.nodes} nodes: {results[1][0] / results[args.nodes][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
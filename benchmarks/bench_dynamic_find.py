@@ -0,0 +1,140 @@
+# scraper_module/benchmarks/bench_dynamic_find.py
+"""
+Crawl a local fake course catalog with DynamicFind, fetching the course
+fragments as Scrapy requests and through the direct AjaxClient path, and
+compare courses/sec and the crawler's CPU time.
+
+    python -m scraper_module.benchmarks.bench_dynamic_find --courses 5000 --per-page 100
+
+Each configuration runs in its own subprocess, since a Twisted reactor can
+only be started once per process.
+"""
+import argparse
+import functools
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """
+    /catalog/<n>.html lists per_page course links (each page also repeats
+    the first few courses of the previous one) and links every catalog page;
+    /ajax/preview_course.php?coid=<id> returns one course fragment.
+    """
+    protocol_version = "HTTP/1.1"  # Keep-alive, as a real catalog server would
+
+    def __init__(self, *args, courses, per_page, **kwargs):
+        self.courses = courses
+        self.per_page = per_page
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/ajax/"):
+            coid = int(parse_qs(url.query).get("coid", ["-1"])[0])
+            if not 0 <= coid < self.courses:
+                self.send_error(404)
+                return
+            body = f'<div class="course"><h3>Course {coid}</h3><p>Description of course <b>{coid}</b>.</p></div>'
+        else:
+            try:
+                n = int(url.path.rsplit("/", 1)[-1].split(".")[0])
+            except ValueError:
+                n = -1
+            pages = -(-self.courses // self.per_page)
+            if not 0 <= n < pages:
+                self.send_error(404)
+                return
+            first = max(0, n * self.per_page - 5)
+            links = "".join(
+                f'<li><a href="preview_course_nopop.php?catoid=7&coid={c}">Course {c}</a></li>'
+                for c in range(first, min((n + 1) * self.per_page, self.courses))
+            )
+            pager = "".join(f'<a href="/catalog/{i}.html">{i}</a>' for i in range(pages))
+            body = f'<html><body><ul id="courses">{links}</ul><div id="pager">{pager}</div></body></html>'
+        body = body.encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(courses, per_page):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(CatalogHandler, courses=courses, per_page=per_page))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(base_url, direct_fetch):
+    from scraper_module.config import SpiderConfig, DynamicFind
+    from scraper_module.scraper_lib.runner import RunAllEngines
+    from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+    config = SpiderConfig(
+        name="bench_dynamic_find",
+        start_url=f"{base_url}/catalog/0.html",
+        tasks=[DynamicFind(
+            task_name="courses",
+            search_space='xpath://ul[@id="courses"]//a/@href',
+            base_url=f"{base_url}/ajax/preview_course.php",
+            catoid=7,
+            fields={"title": "xpath://h3/text()", "description": "xpath://p//text()join"},
+            pagination_selector='xpath://div[@id="pager"]/a/@href',
+            direct_fetch=direct_fetch,
+        )],
+    )
+    runner = RunAllEngines([ScraperEngine(config)], {
+        "LOG_LEVEL": "ERROR",
+        "CONCURRENT_REQUESTS": 16,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+    })
+    start = time.perf_counter()
+    items = runner.run_all()["bench_dynamic_find"]
+    elapsed = time.perf_counter() - start
+    # The local server shares the machine, so the crawler's own CPU time is the fairer cost measure.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "courses": len(items),
+        "seconds": round(elapsed, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "courses_per_sec": round(len(items) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--child", nargs=2, metavar=("URL", "DIRECT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        url, direct = args.child
+        print(json.dumps(crawl(url, direct == "1")))
+        return
+
+    server = serve(args.courses, args.per_page)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    for label, direct in [("requests", "0"), ("direct", "1")]:
+        out = subprocess.run(
+            [sys.executable, "-m", "scraper_module.benchmarks.bench_dynamic_find", "--child", base_url, direct],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{label:>8}: {result['courses']} courses in {result['seconds']:.2f}s = {result['courses_per_sec']:.0f} courses/s, "
+              f"crawler CPU {result['cpu_seconds']:.2f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
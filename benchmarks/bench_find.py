@@ -0,0 +1,73 @@
+# scraper_module/benchmarks/bench_find.py
+"""
+Compare per-row and batched Find extraction on a large synthetic course listing.
+
+    python -m scraper_module.benchmarks.bench_find --rows 5000 --repeat 5
+"""
+import argparse
+import time
+from parsel import Selector
+from scraper_module.scraper_lib.helpers import compile_steps, find
+
+
+def course_listing(rows):
+    blocks = []
+    for i in range(rows):
+        blocks.append(
+            '<div class="courseblock">'
+            f'<p class="courseblocktitle"><strong>CS {i:04d}. Course {i}.</strong> <strong>3 Units.</strong></p>'
+            f'<p class="courseblockdesc">Description of course {i}. <a href="/courses/{i}">More</a> text.</p>'
+            f'<p class="courseblockextra">Prerequisite: CS {max(i - 1, 0):04d}.</p>'
+            f'<span class="credits">{i % 5}</span>'
+            '</div>'
+        )
+    return f'<html><body><div id="courseinventorycontainer"><div>{"".join(blocks)}</div></div></body></html>'
+
+
+STEP = {
+    "type": "find",
+    "task_name": "courses",
+    "search_space": 'xpath://*[@id="courseinventorycontainer"]/div',
+    "repeating_selector": "div.courseblock",
+    "fields": {
+        "title": 'xpath:p[@class="courseblocktitle"]/strong//text()',
+        "description": 'xpath:p[@class="courseblockdesc"]//text()join',
+        "link": "p.courseblockdesc a::attr(href)",
+        "prerequisites": 'xpath:p[@class="courseblockextra"]/text()',
+        "credits": "span.credits::text",
+        "extra": 'xpath:p[@class="missing"]/text()',
+    },
+    "num_required": 1,
+}
+
+
+def bench(selector, step, repeat):
+    best = float("inf")
+    items = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = list(find(selector, step))
+        best = min(best, time.perf_counter() - start)
+    return best, items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    selector = Selector(text=course_listing(args.rows))
+    per_row_step, batched_step = compile_steps([STEP, {**STEP, "batched": True}])
+    per_row_time, per_row_items = bench(selector, per_row_step, args.repeat)
+    batched_time, batched_items = bench(selector, batched_step, args.repeat)
+    if per_row_items != batched_items:
+        raise SystemExit("Batched extraction produced different items than the per-row path.")
+
+    print(f"rows: {args.rows}, fields: {len(STEP['fields'])}, items: {len(per_row_items)}")
+    print(f"per-row: {per_row_time * 1000:.1f} ms")
+    print(f"batched: {batched_time * 1000:.1f} ms ({per_row_time / batched_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# scraper_module/benchmarks/bench_frontier.py
+"""
+Replay a saved site graph from a local server and count how many requests
+a Search_Links crawl needs to reach the first N target pages, breadth-first
+and best-first.
+
+    python -m scraper_module.benchmarks.bench_frontier --graph site_graph.json --targets 30
+
+The graph is a JSON object {"pages": {path: {"links": [[href, anchor], ...],
+"target": bool}}}. If --graph doesn't exist, a synthetic university site
+(departments with people, news and program pages, and a catalog whose
+course pages are the targets) is generated and saved there first. Each
+strategy runs in its own subprocess, since a Twisted reactor can only be
+started once per process.
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+TARGET_MARKER = '<div id="tabs"><ul><li id="courseinventorytab"><a href="#">Courses</a></li></ul></div>'
+
+
+def generate_graph(departments=12, seed=7):
+    rng = random.Random(seed)
+    pages = {}
+
+    def add(path, links, target=False):
+        links = list(links)
+        rng.shuffle(links)
+        pages[path] = {"links": links, "target": target}
+
+    add("/", [(f"/dept{d}/index.html", f"Department {d}") for d in range(departments)])
+    for d in range(departments):
+        base = f"/dept{d}"
+        add(f"{base}/index.html", [
+            (f"{base}/about.html", "About"),
+            (f"{base}/people/index.html", "People"),
+            (f"{base}/news/index.html", "News"),
+            (f"{base}/programs/index.html", "Programs"),
+            (f"{base}/catalog/index.html", "Catalog"),
+        ])
+        add(f"{base}/about.html", [(f"{base}/index.html", "Home")])
+        add(f"{base}/people/index.html", [(f"{base}/people/person-{i}.html", f"Person {i}") for i in range(30)])
+        for i in range(30):
+            other = rng.randrange(departments)
+            add(f"{base}/people/person-{i}.html", [
+                (f"{base}/index.html", "Home"),
+                (f"/dept{other}/people/person-{rng.randrange(30)}.html", "Colleague"),
+            ])
+        add(f"{base}/news/index.html", [(f"{base}/news/archive-{i}.html", f"News archive {i}") for i in range(20)])
+        for i in range(20):
+            add(f"{base}/news/archive-{i}.html", [(f"{base}/news/story-{i}-{j}.html", f"Story {j}") for j in range(10)])
+            for j in range(10):
+                add(f"{base}/news/story-{i}-{j}.html", [(f"{base}/index.html", "Home")])
+        add(f"{base}/programs/index.html", [(f"{base}/programs/program-{i}.html", f"Program {i}") for i in range(5)])
+        for i in range(5):
+            add(f"{base}/programs/program-{i}.html", [(f"{base}/catalog/index.html", "Catalog")])
+        add(f"{base}/catalog/index.html", [(f"{base}/catalog/courses-{k}.html", f"Courses: Subject {k}") for k in range(6)])
+        for k in range(6):
+            add(f"{base}/catalog/courses-{k}.html", [(f"{base}/catalog/index.html", "Catalog")], target=True)
+    return {"pages": pages}
+
+
+def render(path, page):
+    links = "".join(f'<li><a href="{href}">{anchor}</a></li>' for href, anchor in page["links"])
+    body = f'<div id="nav"><ul>{links}</ul></div>'
+    if page["target"]:
+        blocks = "".join(
+            f'<div><p class="courseblocktitle"><strong>{path} course {i}</strong></p></div>' for i in range(5)
+        )
+        body = f'{TARGET_MARKER}<div id="courseinventorycontainer"><div>{blocks}</div></div>{body}'
+    return f"<html><body>{body}</body></html>"
+
+
+class GraphHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, pages, **kwargs):
+        self.pages = pages
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        page = self.pages.get(path)
+        if page is None:
+            self.send_error(404)
+            return
+        body = render(path, page).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def crawl(base_url, graph_path, strategy, targets):
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scraper_module.config import SpiderConfig, Find, Search_Links
+    from scraper_module.scraper_lib.engine_spider import StepSpider
+    from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+    with open(graph_path, encoding="utf8") as f:
+        target_paths = {path for path, page in json.load(f)["pages"].items() if page["target"]}
+    engine = ScraperEngine(SpiderConfig(
+        name="bench_frontier",
+        start_url=f"{base_url}/",
+        pagination=Search_Links(
+            search_space='xpath://div[@id="nav"]',
+            link_selector="xpath:.//a/@href",
+            target_page_selector='xpath://li[@id="courseinventorytab"]/a/@href',
+            max_depth=10,
+            strategy=strategy,
+        ),
+        tasks=[Find(
+            task_name="courses",
+            search_space='xpath://*[@id="courseinventorycontainer"]/div',
+            repeating_selector="div",
+            fields={"title": 'xpath:p[@class="courseblocktitle"]/strong//text()'},
+            num_required=1,
+        )],
+    ))
+    process = CrawlerProcess({"LOG_LEVEL": "ERROR", "CONCURRENT_REQUESTS": 4})
+    crawler = process.create_crawler(StepSpider)
+    counts = {"requests": 0, "targets": 0, "requests_to_target": []}
+
+    def response_received(response, request, spider):
+        counts["requests"] += 1
+        if urlsplit(response.url).path in target_paths:
+            counts["targets"] += 1
+            counts["requests_to_target"].append(counts["requests"])
+            if counts["targets"] == targets:
+                crawler.engine.close_spider(spider, "enough_targets")
+
+    crawler.signals.connect(response_received, signal=signals.response_received, weak=False)
+    process.crawl(crawler, **engine.spider_kwargs())
+    process.start()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graph", default="site_graph.json")
+    parser.add_argument("--targets", type=int, default=30, help="Stop after this many target pages")
+    parser.add_argument("--child", nargs=2, metavar=("URL", "STRATEGY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(crawl(args.child[0], args.graph, args.child[1], args.targets)))
+        return
+
+    if not os.path.exists(args.graph):
+        with open(args.graph, "w", encoding="utf8") as f:
+            json.dump(generate_graph(), f)
+    with open(args.graph, encoding="utf8") as f:
+        pages = json.load(f)["pages"]
+    total_targets = sum(page["target"] for page in pages.values())
+    print(f"Site graph {args.graph}: {len(pages)} pages, {total_targets} targets")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(GraphHandler, pages=pages))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    results = {}
+    for strategy in ("bfs", "best_first"):
+        out = subprocess.run(
+            [sys.executable, "-m", "scraper_module.benchmarks.bench_frontier", "--graph", args.graph,
+             "--targets", str(args.targets), "--child", base_url, strategy],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[strategy] = result = json.loads(out.strip().splitlines()[-1])
+        first = result["requests_to_target"][0] if result["requests_to_target"] else None
+        print(f"{strategy:>10}: first target after {first} requests, "
+              f"{result['targets']} targets after {result['requests']} requests")
+    server.shutdown()
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
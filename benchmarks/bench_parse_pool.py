@@ -0,0 +1,127 @@
+# scraper_module/benchmarks/bench_parse_pool.py
+"""
+Crawl a local paginated listing of large pages with parsing on the reactor
+and in a parse pool, and compare requests/sec.
+
+    python -m scraper_module.benchmarks.bench_parse_pool --pages 60 --rows 2000 --workers 4
+
+Each configuration runs in its own subprocess, since a Twisted reactor can
+only be started once per process.
+"""
+import argparse
+import functools
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scraper_module.benchmarks.bench_find import course_listing
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    """
+    Serves /list/<n>.html: a course listing with links to the next 10 pages,
+    after an optional delay that stands in for network latency.
+    """
+
+    def __init__(self, *args, pages, body, latency, **kwargs):
+        self.pages = pages
+        self.body = body
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        try:
+            n = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+        except ValueError:
+            n = -1
+        if not 0 <= n < self.pages:
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        links = "".join(f'<a href="/list/{i}.html">{i}</a>' for i in range(n + 1, min(n + 11, self.pages)))
+        body = self.body.replace("</body>", f'<div id="pg">{links}</div></body>').encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(pages, rows, latency):
+    handler = functools.partial(ListingHandler, pages=pages, body=course_listing(rows), latency=latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(base_url, workers, mode):
+    from scraper_module.config import SpiderConfig, Find, Listed_Links
+    from scraper_module.scraper_lib.runner import RunAllEngines
+    from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+    config = SpiderConfig(
+        name="bench_parse_pool",
+        start_url=f"{base_url}/list/0.html",
+        pagination=Listed_Links(search_space='xpath://div[@id="pg"]', link_selector="xpath:a"),
+        tasks=[Find(
+            task_name="courses",
+            search_space='xpath://*[@id="courseinventorycontainer"]/div',
+            repeating_selector="div.courseblock",
+            fields={
+                "title": 'xpath:p[@class="courseblocktitle"]/strong//text()',
+                "description": 'xpath:p[@class="courseblockdesc"]//text()join',
+                "link": "p.courseblockdesc a::attr(href)",
+                "credits": "span.credits::text",
+            },
+            num_required=1,
+        )],
+        parse_workers=workers,
+        parse_mode=mode,
+    )
+    runner = RunAllEngines([ScraperEngine(config)], {
+        "LOG_LEVEL": "ERROR",
+        "CONCURRENT_REQUESTS": 16,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16,
+    })
+    start = time.perf_counter()
+    items = runner.run_all()["bench_parse_pool"]
+    elapsed = time.perf_counter() - start
+    pages = runner.stats["bench_parse_pool"].get("response_received_count", 0)
+    return {"pages": pages, "items": len(items), "seconds": round(elapsed, 3), "pages_per_sec": round(pages / elapsed, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=2000, help="Course rows per page")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server delay per request, in seconds")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child", nargs=3, metavar=("URL", "WORKERS", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        url, workers, mode = args.child
+        print(json.dumps(crawl(url, int(workers), mode)))
+        return
+
+    server = serve(args.pages, args.rows, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    results = {}
+    for label, workers, mode in [("reactor", 0, "thread"), ("thread", args.workers, "thread"), ("process", args.workers, "process")]:
+        out = subprocess.run(
+            [sys.executable, "-m", "scraper_module.benchmarks.bench_parse_pool", "--child", base_url, str(workers), mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[label] = json.loads(out.strip().splitlines()[-1])
+        print(f"{label:>8}: {results[label]['pages']} pages, {results[label]['items']} items "
+              f"in {results[label]['seconds']:.2f}s = {results[label]['pages_per_sec']:.1f} pages/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
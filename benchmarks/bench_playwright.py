@@ -0,0 +1,166 @@
+# scraper_module/benchmarks/bench_playwright.py
+"""
+Crawl local pages whose course listing is injected by JavaScript, with the
+fixed 3 s Playwright wait and with the condition waits and page pool, and
+compare pages/sec.
+
+    python -m scraper_module.benchmarks.bench_playwright --pages 20 --delay 0.3
+
+Needs a Playwright browser (`playwright install chromium`). Each
+configuration runs in its own subprocess, since a Twisted reactor can only
+be started once per process.
+"""
+import argparse
+import functools
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 1x1 transparent GIF, served slowly so blocking images makes a difference.
+PIXEL = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+
+PAGE = """<html><body>
+<img src="/img/{n}.gif"><img src="/img/{n}b.gif">
+<div id="pg">{links}</div>
+<script>
+setTimeout(() => {{
+    const outer = document.createElement("div");
+    outer.id = "courseinventorycontainer";
+    const inner = document.createElement("div");
+    for (let i = 0; i < {rows}; i++) {{
+        const block = document.createElement("div");
+        block.className = "courseblock";
+        block.innerHTML = `<p class="courseblocktitle"><strong>P{n} Course ${{i}}</strong></p>`
+            + `<p class="courseblockdesc">Description ${{i}}</p>`;
+        inner.appendChild(block);
+    }}
+    outer.appendChild(inner);
+    document.body.appendChild(outer);
+}}, {delay_ms});
+</script>
+</body></html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, pages, rows, delay, **kwargs):
+        self.pages = pages
+        self.rows = rows
+        self.delay = delay
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path.startswith("/img/"):
+            time.sleep(self.delay)
+            self._send(PIXEL, "image/gif")
+            return
+        try:
+            n = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+        except ValueError:
+            n = -1
+        if not 0 <= n < self.pages:
+            self.send_error(404)
+            return
+        links = "".join(f'<a href="/page/{i}.html">{i}</a>' for i in range(n + 1, min(n + 6, self.pages)))
+        body = PAGE.format(n=n, links=links, rows=self.rows, delay_ms=int(self.delay * 1000))
+        self._send(body.encode("utf8"), "text/html; charset=utf-8")
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(pages, rows, delay):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(FixtureHandler, pages=pages, rows=rows, delay=delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+CONFIGURATIONS = {
+    "fixed_3s": dict(playwright_wait="timeout"),
+    "selector": dict(playwright_wait="selector", playwright_pool_size=4),
+    "domstable": dict(playwright_wait="domstable", playwright_pool_size=4),
+    "networkidle": dict(playwright_wait="networkidle", playwright_pool_size=4),
+    "selector_blocked": dict(playwright_wait="selector", playwright_pool_size=4, playwright_block_resources=True),
+}
+
+
+def crawl(base_url, label):
+    from scraper_module.config import SpiderConfig, Find, Listed_Links
+    from scraper_module.scraper_lib.runner import RunAllEngines
+    from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+    config = SpiderConfig(
+        name="bench_playwright",
+        start_url=f"{base_url}/page/0.html",
+        use_playwright=True,
+        pagination=Listed_Links(search_space='xpath://div[@id="pg"]', link_selector="xpath:a"),
+        tasks=[Find(
+            task_name="courses",
+            search_space='xpath://*[@id="courseinventorycontainer"]/div',
+            repeating_selector="div.courseblock",
+            fields={
+                "title": 'xpath:p[@class="courseblocktitle"]/strong//text()',
+                "description": 'xpath:p[@class="courseblockdesc"]//text()join',
+            },
+            num_required=1,
+        )],
+        **CONFIGURATIONS[label],
+    )
+    runner = RunAllEngines([ScraperEngine(config)], {
+        "LOG_LEVEL": "ERROR",
+        "CONCURRENT_REQUESTS": 4,
+        "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+        "DOWNLOAD_HANDLERS": {
+            "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+            "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+        },
+    })
+    start = time.perf_counter()
+    items = runner.run_all()["bench_playwright"]
+    elapsed = time.perf_counter() - start
+    stats = runner.stats["bench_playwright"]
+    return {
+        "pages": stats.get("response_received_count", 0),
+        "items": len(items),
+        "browser_pages": stats.get("playwright/page_count", 0),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(stats.get("response_received_count", 0) / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=50, help="Course rows injected per page")
+    parser.add_argument("--delay", type=float, default=0.3, help="Seconds before the rows are injected (and per image)")
+    parser.add_argument("--child", nargs=2, metavar=("URL", "LABEL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(crawl(*args.child)))
+        return
+
+    server = serve(args.pages, args.rows, args.delay)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    for label in CONFIGURATIONS:
+        out = subprocess.run(
+            [sys.executable, "-m", "scraper_module.benchmarks.bench_playwright", "--child", base_url, label],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{label:>16}: {result['pages']} pages, {result['items']} items, {result['browser_pages']} browser pages "
+              f"in {result['seconds']:.2f}s = {result['pages_per_sec']:.1f} pages/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
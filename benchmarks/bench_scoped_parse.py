@@ -0,0 +1,99 @@
+# scraper_module/benchmarks/bench_scoped_parse.py
+"""
+Compare full-page parsing with scoped_parse on large catalog pages: a course
+listing near the top of the page, below megabytes of inline scripts, a big
+navigation menu and a long footer.
+
+    python -m scraper_module.benchmarks.bench_scoped_parse --pages 50 --rows 200 --script-kb 2000
+
+Both modes extract the same items and pagination links (checked), and each
+runs in its own subprocess so its peak RSS is its own.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from scrapy.http import HtmlResponse, Request
+from scraper_module.benchmarks.bench_find import STEP, course_listing
+from scraper_module.scraper_lib.helpers import compile_steps, find, find_pages
+from scraper_module.scraper_lib.scoped_parse import scoped_parsers
+
+PAGINATION = {"type": "listed_links", "search_space": 'xpath://div[@id="pg"]', "link_selector": "xpath:a"}
+
+
+def catalog_page(n, rows, script_kb):
+    """
+    Page n: head scripts and a menu, then the listing and pager, then scripts and a footer as large again.
+    """
+    script = "<script>var catalog = %s;</script>" % json.dumps(["x" * 1000] * (script_kb // 2))
+    menu = "".join(f'<li><a href="/dept/{i}.html">Department {i}</a></li>' for i in range(500))
+    footer = "".join(f'<div class="f"><a href="/about/{i}">About {i}</a><span>Note {i}</span></div>' for i in range(5000))
+    listing = course_listing(rows).replace("CS ", f"P{n} CS ")
+    listing = listing[listing.index("<body>") + len("<body>"):listing.index("</body>")]
+    pager = "".join(f'<a href="/catalog/{i}.html">{i}</a>' for i in range(n + 1, n + 11))
+    return (
+        f'<html><head>{script}</head><body><ul id="menu">{menu}</ul>{listing}<div id="pg">{pager}</div>'
+        f'{script}<div id="footer">{footer}</div></body></html>'
+    ).encode("utf8")
+
+
+def run(mode, pages, rows, script_kb):
+    step, = compile_steps([STEP])
+    page_parser = scoped_parsers([step], PAGINATION)[0] if mode == "scoped" else None
+    bodies = [catalog_page(n, rows, script_kb) for n in range(pages)]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    items, links = [], []
+    start = time.perf_counter()
+    for n, body in enumerate(bodies):
+        url = f"http://example.com/catalog/{n}.html"
+        response = HtmlResponse(url, body=body, encoding="utf-8", request=Request(url))
+        if page_parser is not None:
+            page_parser.scope(response)
+        items.extend(find(response, step))
+        links.extend(find_pages(response, PAGINATION))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "ms_per_page": round(elapsed / pages * 1000, 2),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        "peak_rss_growth_mb": round((peak - baseline) / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "items": items,
+        "links": links,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--script-kb", type=int, default=2000, help="Size of each of the two inline scripts")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run(args.child, args.pages, args.rows, args.script_kb)))
+        return
+
+    results = {}
+    for mode in ("full", "scoped"):
+        out = subprocess.run(
+            [sys.executable, "-m", "scraper_module.benchmarks.bench_scoped_parse", "--child", mode,
+             "--pages", str(args.pages), "--rows", str(args.rows), "--script-kb", str(args.script_kb)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+    full, scoped = results["full"], results["scoped"]
+    if (full["items"], full["links"]) != (scoped["items"], scoped["links"]):
+        raise SystemExit("Scoped parsing produced different items or links than parsing whole pages.")
+
+    size_kb = len(catalog_page(0, args.rows, args.script_kb)) // 1024
+    print(f"pages: {args.pages} of {size_kb} KB, items: {len(full['items'])}, links: {len(full['links'])}")
+    for mode in ("full", "scoped"):
+        print(f"{mode:>6}: {results[mode]['ms_per_page']:.1f} ms/page, peak RSS +{results[mode]['peak_rss_growth_mb']:.0f} MB")
+    print(f"speedup: {full['ms_per_page'] / scoped['ms_per_page']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
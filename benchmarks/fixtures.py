@@ -0,0 +1,163 @@
+# scraper_module/benchmarks/fixtures.py
+"""
+Recorded fixture sites for the offline benchmarks, and a local server that
+replays them.
+
+A recording is a gzipped JSON file:
+
+    {"site": "listing",
+     "key_params": {"/catalog/ajax/preview_course.php": ["coid"]},
+     "pages": {"/listing/0.html": {"content_type": "text/html; charset=utf-8", "body": "..."}}}
+
+Pages are keyed by path, plus the query string when there is one. For the
+paths in key_params only those query parameters are part of the key, so
+requests that add cache busters or display options still match. Links in
+the recorded pages are root-relative, so a recording can be served from
+any port. record_all() generates the three synthetic sites below
+deterministically; a recording of a real site in the same format can be
+dropped into the fixtures folder and served the same way.
+"""
+import functools
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from scraper_module.benchmarks.bench_find import course_listing
+from scraper_module.benchmarks.bench_frontier import generate_graph, render
+
+HTML = "text/html; charset=utf-8"
+SITES = ("listing", "menu", "catalog")
+
+
+def record_listing(pages=200, rows=100):
+    """
+    /listing/<n>.html: a large paginated course listing, each page linking the next 10.
+    """
+    recorded = {}
+    for n in range(pages):
+        body = course_listing(rows).replace("CS ", f"P{n} CS ")
+        links = "".join(f'<a href="/listing/{i}.html">{i}</a>' for i in range(n + 1, min(n + 11, pages)))
+        recorded[f"/listing/{n}.html"] = {"content_type": HTML, "body": body.replace("</body>", f'<div id="pg">{links}</div></body>')}
+    return {"site": "listing", "pages": recorded}
+
+
+def record_menu(departments=12):
+    """
+    /menu/...: a deep, heavily interlinked university menu tree whose catalog
+    course pages are the Search_Links targets (see bench_frontier).
+    """
+    recorded = {}
+    for path, page in generate_graph(departments)["pages"].items():
+        page = dict(page, links=[(f"/menu{href}", anchor) for href, anchor in page["links"]])
+        recorded[f"/menu{path}"] = {"content_type": HTML, "body": render(path, page)}
+    return {"site": "menu", "pages": recorded}
+
+
+def record_catalog(courses=3000, per_page=100):
+    """
+    /catalog/<n>.html: listings of course links, each page repeating the last
+    few courses of the previous one; /catalog/ajax/preview_course.php?coid=<id>
+    returns one course fragment (see bench_dynamic_find).
+    """
+    recorded = {}
+    pages = -(-courses // per_page)
+    pager = "".join(f'<a href="/catalog/{i}.html">{i}</a>' for i in range(pages))
+    for n in range(pages):
+        first = max(0, n * per_page - 5)
+        links = "".join(
+            f'<li><a href="/catalog/preview_course_nopop.php?catoid=7&coid={c}">Course {c}</a></li>'
+            for c in range(first, min((n + 1) * per_page, courses))
+        )
+        recorded[f"/catalog/{n}.html"] = {
+            "content_type": HTML,
+            "body": f'<html><body><ul id="courses">{links}</ul><div id="pager">{pager}</div></body></html>',
+        }
+    for coid in range(courses):
+        recorded[f"/catalog/ajax/preview_course.php?coid={coid}"] = {
+            "content_type": HTML,
+            "body": f'<div class="course"><h3>Course {coid}</h3><p>Description of course <b>{coid}</b>.</p></div>',
+        }
+    return {"site": "catalog", "key_params": {"/catalog/ajax/preview_course.php": ["coid"]}, "pages": recorded}
+
+
+RECORDERS = {"listing": record_listing, "menu": record_menu, "catalog": record_catalog}
+
+
+def record_all(folder, scale=1.0):
+    """
+    Write any missing recordings to folder (<site>.json.gz) and return their paths.
+    'scale' multiplies the size of every site.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    sizes = {
+        "listing": dict(pages=max(1, int(200 * scale))),
+        "menu": dict(departments=max(1, int(12 * scale))),
+        "catalog": dict(courses=max(1, int(3000 * scale))),
+    }
+    paths = {}
+    for site in SITES:
+        path = paths[site] = folder / f"{site}.json.gz"
+        if not path.exists():
+            with gzip.open(path, "wt", encoding="utf8") as f:
+                json.dump(RECORDERS[site](**sizes[site]), f)
+    return paths
+
+
+def load(paths):
+    """
+    Merge recordings into one {key: page} dict and one key_params dict.
+    """
+    pages, key_params = {}, {}
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf8") as f:
+            recording = json.load(f)
+        pages.update(recording["pages"])
+        key_params.update(recording.get("key_params", {}))
+    return pages, key_params
+
+
+def page_key(path, query, key_params):
+    params = key_params.get(path)
+    if params is not None:
+        query = urlencode([(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k in params])
+    return f"{path}?{query}" if query else path
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as a real site would
+
+    def __init__(self, *args, pages, key_params, **kwargs):
+        self.pages = pages
+        self.key_params = key_params
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        page = self.pages.get(page_key(url.path, url.query, self.key_params))
+        if page is None:
+            self.send_error(404)
+            return
+        body = page["body"].encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", page["content_type"])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(paths):
+    """
+    Serve the recordings on a free local port from a background thread.
+    """
+    pages, key_params = load(paths)
+    handler = functools.partial(ReplayHandler, pages=pages, key_params=key_params)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
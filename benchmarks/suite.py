@@ -0,0 +1,250 @@
+# scraper_module/benchmarks/suite.py
+"""
+Offline benchmark suite: replays the recorded fixture sites (see
+fixtures.py) from a local server, runs representative SpiderConfigs
+through ScraperEngine and RunAllEngines, and reports pages/sec, items/sec,
+CPU time and peak RSS as JSON.
+
+    python -m scraper_module.benchmarks.suite --output results.json
+    python -m scraper_module.benchmarks.suite --compare results.json --tolerance 0.1
+
+With --compare, every scenario is checked against the earlier results and
+the exit status is 1 if pages/sec or items/sec dropped, or CPU time or peak
+RSS grew, by more than the tolerance. Each scenario runs in its own
+subprocess, since a Twisted reactor can only be started once per process
+and peak RSS is per process.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from scraper_module.benchmarks import fixtures
+
+# Metric -> True if higher is better
+METRICS = {"pages_per_sec": True, "items_per_sec": True, "cpu_seconds": False, "peak_rss_mb": False}
+
+FIND_COURSES = dict(
+    task_name="courses",
+    search_space='xpath://*[@id="courseinventorycontainer"]/div',
+    repeating_selector="div.courseblock",
+    fields={
+        "title": 'xpath:p[@class="courseblocktitle"]/strong//text()join',
+        "description": 'xpath:p[@class="courseblockdesc"]//text()join',
+    },
+    num_required=1,
+)
+
+
+def listing_config(base_url, name="listing", batched=False):
+    from scraper_module.config import SpiderConfig, Find, Listed_Links
+    return SpiderConfig(
+        name=name,
+        start_url=f"{base_url}/listing/0.html",
+        pagination=Listed_Links(search_space='xpath://div[@id="pg"]', link_selector="xpath:a"),
+        tasks=[Find(**FIND_COURSES, batched=batched)],
+    )
+
+
+def menu_config(base_url, name="menu", strategy="bfs"):
+    from scraper_module.config import SpiderConfig, Find, Search_Links
+    return SpiderConfig(
+        name=name,
+        start_url=f"{base_url}/menu/",
+        pagination=Search_Links(
+            search_space='xpath://div[@id="nav"]',
+            link_selector="xpath:.//a/@href",
+            target_page_selector='xpath://li[@id="courseinventorytab"]/a/@href',
+            strategy=strategy,
+        ),
+        tasks=[Find(
+            task_name="courses",
+            search_space='xpath://*[@id="courseinventorycontainer"]/div',
+            repeating_selector="div",
+            fields={"title": 'xpath:p[@class="courseblocktitle"]/strong//text()'},
+            num_required=1,
+        )],
+    )
+
+
+def catalog_config(base_url, name="catalog", direct_fetch=False):
+    from scraper_module.config import SpiderConfig, DynamicFind
+    return SpiderConfig(
+        name=name,
+        start_url=f"{base_url}/catalog/0.html",
+        tasks=[DynamicFind(
+            task_name="courses",
+            search_space='xpath://ul[@id="courses"]//a/@href',
+            base_url=f"{base_url}/catalog/ajax/preview_course.php",
+            catoid=7,
+            fields={"title": "xpath://h3/text()", "description": "xpath://p//text()join"},
+            pagination_selector='xpath://div[@id="pager"]/a/@href',
+            direct_fetch=direct_fetch,
+        )],
+    )
+
+
+# Scenario -> (runner, config factories). "engine" runs the single config with ScraperEngine.run,
+# "runner" runs all of them together with RunAllEngines.run_all.
+SCENARIOS = {
+    "listing_engine": ("engine", [listing_config]),
+    "listing_batched": ("runner", [lambda url: listing_config(url, batched=True)]),
+    "menu_bfs": ("runner", [menu_config]),
+    "menu_best_first": ("runner", [lambda url: menu_config(url, strategy="best_first")]),
+    "catalog_requests": ("runner", [catalog_config]),
+    "catalog_direct": ("runner", [lambda url: catalog_config(url, direct_fetch=True)]),
+    "all_engines": ("runner", [listing_config, menu_config, catalog_config]),
+}
+
+RUNNER_SETTINGS = {
+    "LOG_LEVEL": "ERROR",
+    "CONCURRENT_REQUESTS": 16,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+}
+
+
+def run_scenario(base_url, scenario):
+    """
+    Run one scenario in this process and return its measurements.
+    """
+    from scraper_module.scraper_lib.runner import RunAllEngines
+    from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+    kind, factories = SCENARIOS[scenario]
+    engines = [ScraperEngine(factory(base_url)) for factory in factories]
+    output_dir = tempfile.mkdtemp(prefix="scraper_bench_")
+    os.chdir(output_dir)  # The project pipelines write next to the working directory
+    start = time.perf_counter()
+    if kind == "engine":
+        # ScraperEngine.run uses the project settings, which log at DEBUG; keep the console quiet.
+        logging.disable(logging.INFO)
+        items = len(engines[0].run(output_dir))
+        stats = [engines[0].stats]
+    else:
+        runner = RunAllEngines(engines, RUNNER_SETTINGS, output_dir)
+        items = sum(len(collected) for collected in runner.run_all().values())
+        stats = list(runner.stats.values())
+    elapsed = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    pages = sum(s.get("response_received_count", 0) + s.get("dynamicfind/fetched", 0) for s in stats)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "pages": pages,
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(peak_rss, 1),
+        "pages_per_sec": round(pages / elapsed, 1),
+        "items_per_sec": round(items / elapsed, 1),
+    }
+
+
+def run_child(base_url, scenario):
+    out = subprocess.run(
+        [sys.executable, "-m", "scraper_module.benchmarks.suite", "--child", base_url, scenario],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def median_run(runs):
+    """
+    The run with the median pages/sec, so every reported number comes from one real run.
+    """
+    ordered = sorted(runs, key=lambda r: r["pages_per_sec"])
+    result = dict(ordered[len(ordered) // 2])
+    if len(runs) > 1:
+        result["pages_per_sec_stdev"] = round(statistics.stdev(r["pages_per_sec"] for r in runs), 1)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print each metric's change against the baseline; return the regressions.
+    """
+    regressions = []
+    for scenario, result in results["results"].items():
+        before = baseline.get("results", {}).get(scenario)
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            print(f"{scenario:>18} {metric:>14}: {old:>10} -> {new:>10} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((scenario, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="./bench_fixtures", help="Folder of recorded sites (created if missing)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Size of the generated sites")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median run is reported")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--child", nargs=2, metavar=("URL", "SCENARIO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(*args.child)))
+        return
+
+    server = fixtures.serve(fixtures.record_all(args.fixtures, args.scale).values())
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    results = {
+        "suite": "scraper_module",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": args.scale,
+        "results": {},
+    }
+    for scenario in args.scenarios:
+        result = results["results"][scenario] = median_run([run_child(base_url, scenario) for _ in range(args.repeat)])
+        print(f"{scenario:>18}: {result['pages']} pages, {result['items']} items in {result['seconds']:.2f}s = "
+              f"{result['pages_per_sec']:.0f} pages/s, {result['items_per_sec']:.0f} items/s, "
+              f"CPU {result['cpu_seconds']:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB", file=sys.stderr)
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
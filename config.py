@@ -20,6 +20,7 @@ class Search_Links(PaginationConfig, _DefaultConfig):
     target_page_selector: str = None        # Selector for target page links
     max_depth: int = 10
     base_url: str = None
+    strategy: str = "bfs"                   # "bfs" or "best_first": fetch links that look like target pages first
 
 @dataclass
 class TaskConfig:
@@ -33,12 +34,23 @@ class Find(TaskConfig, _DefaultConfig):
     fields: Dict[str, str]         # Mapping of field names to selectors
     num_required: int = 0
     include: Optional[Dict[str, str]] = None
+    batched: bool = False          # Evaluate each field once per search_space instead of once per row
+    dedup_keys: Optional[List[str]] = None  # Fields that identify an item when de-duplicating (default: all but source)
 
 @dataclass
 class Follow(_DefaultConfig, TaskConfig):
     link_field: str                # Field containing the link to follow
     fields: Dict[str, str]         # Mapping of field names to selectors
 
+@dataclass
+class CrawlRate:
+    target_latency: Optional[float] = None  # Seconds; per-host concurrency backs off while responses are slower
+    max_per_host: int = 8                   # Most requests in flight per host
+    min_per_host: int = 1
+    start_per_host: int = 2                 # In-flight requests per host before any response was seen
+    backoff: float = 0.5                    # Concurrency is multiplied by this on a 5xx/429 or download error
+    download_timeout: Optional[float] = None  # Overrides DOWNLOAD_TIMEOUT for this engine
+
 @dataclass
 class SpiderConfig:
     name: str
@@ -46,6 +58,36 @@ class SpiderConfig:
     use_playwright: bool = False
     pagination: Optional[PaginationConfig] = None
     tasks: List[TaskConfig] = field(default_factory=list)
+    resume: bool = False                  # Persist crawl state so an interrupted crawl picks up where it stopped
+    state_dir: str = "./crawl_state"      # Where resumable crawl state is kept, one SQLite file per name
+    visited_backend: str = "exact"        # "exact", "hash64" or "bloom" for visited URLs and seen items
+    visited_fp_rate: float = 0.001        # False-positive rate of the "bloom" backend
+    incremental: bool = False             # Conditional requests; replay last run's items for unchanged pages
+    cache_dir: str = "./http_cache"       # Where the incremental HTTP/item cache is kept, one SQLite file per name
+    stream_output: bool = False           # Write items to <name>.jsonl as they are scraped instead of holding them in memory
+    output_compression: Optional[str] = None  # None, "gzip" or "zstd" for the streamed output file
+    keep_items: bool = False              # Also keep streamed items in items_collected
+    output_format: str = "json"           # Feed written by run/schedule: "json" or "parquet" (needs pyarrow)
+    parse_workers: int = 0                # Parse pages in this many pool workers off the reactor (0 = on the reactor)
+    scoped_parse: bool = False            # Only build the id-anchored containers the selectors read, and stop reading after them
+    parse_mode: str = "thread"            # "thread" or "process" pool for parse_workers
+    playwright_wait: str = "timeout"      # "timeout" (fixed 3 s), "selector", "networkidle" or "domstable"
+    playwright_wait_selector: Optional[str] = None  # For "selector"; defaults to the first step's search_space
+    playwright_wait_timeout: int = 10000  # Longest a condition wait may take, in ms
+    playwright_pool_size: int = 0         # Reuse up to this many open pages (0 = a new page per request)
+    playwright_contexts: int = 1          # Browser contexts the page pool is spread over
+    playwright_block_resources: bool = False  # Abort image, font and media requests
+    crawl_rate: Optional[CrawlRate] = None    # Adapt per-host concurrency to latency and errors
+    instrument: bool = False              # Record step, selector and phase timings into the crawl stats
+    stats_dump: Optional[str] = None      # Write the final crawl stats here: *.prom as Prometheus text, else JSON
+    profile_page: Optional[str] = None    # Profile the parse of the first page whose URL contains this
+    profiler: str = "cprofile"            # "cprofile" (./profiles/<name>.prof) or "pyinstrument" (./profiles/<name>.html)
+    archive_mode: Optional[str] = None    # "capture" responses to an archive, or "replay" the crawl from it offline
+    archive_dir: str = "./archives"       # Where response archives are kept, one SQLite file per name
+    follow_cache_size: int = 1024         # Follow targets whose extracted results are kept for later parent items
+    dedup: bool = False                   # Drop items whose normalized fields match an earlier item (see Find.dedup_keys)
+    dedup_store: Optional[str] = None     # With dedup: SQLite file of item hashes; share it to dedup across runs and engines
+    tracking_params: Optional[List[str]] = None  # Query params ignored when de-duplicating URLs ("utm_*" is a prefix); None = utm_*, gclid, fbclid, ...
     
 @dataclass
 class DynamicFind(TaskConfig, _DefaultConfig):
@@ -53,4 +95,7 @@ class DynamicFind(TaskConfig, _DefaultConfig):
     base_url: str      # Base AJAX URL for course details
     catoid: int        # Category ID for the courses
     fields: Dict[str, str]  # Mapping for extracting course details (e.g., title, description)
-    pagination_selector: str
\ No newline at end of file
+    pagination_selector: str
+    direct_fetch: bool = False  # Fetch course fragments over pooled keep-alive connections instead of Scrapy requests;
+                                # same TLS, headers and cookies, but no other downloader middlewares, and proxied URLs stay Scrapy requests
+    max_per_host: int = 8       # Concurrent direct fetches per host
@@ -0,0 +1,104 @@
+# scraper_module/scraper_lib/ajax_client.py
+from urllib.parse import urlsplit
+from urllib.request import getproxies, proxy_bypass
+from scrapy.core.downloader.contextfactory import load_context_factory_from_settings
+from scrapy.downloadermiddlewares.cookies import CookiesMiddleware
+from twisted.internet.defer import DeferredSemaphore
+from twisted.web.client import Agent, CookieAgent, HTTPConnectionPool, RedirectAgent, readBody
+from twisted.web.http_headers import Headers
+
+
+class AjaxClient:
+    """
+    Fetches small AJAX fragments (DynamicFind course details) straight from
+    a Twisted Agent over pooled keep-alive connections, skipping the Scrapy
+    scheduler, middlewares and Response objects. Redirects are followed.
+    At most max_per_host fetches run against one host at a time.
+
+    Like Scrapy requests, fetches use the crawler's TLS context factory (no
+    certificate checks by default), DEFAULT_REQUEST_HEADERS, USER_AGENT and,
+    with COOKIES_ENABLED, the CookiesMiddleware's default cookie jar. Other
+    downloader middlewares (retries, robots.txt, download delays) do not
+    apply, and URLs that go through a proxy are left to Scrapy requests
+    (see proxied()).
+    """
+
+    def __init__(self, crawler, max_per_host=8, timeout=30):
+        from twisted.internet import reactor
+        self._reactor = reactor
+        settings = crawler.settings
+        self.pool = HTTPConnectionPool(reactor, persistent=True)
+        self.pool.maxPersistentPerHost = max_per_host
+        agent = Agent(
+            reactor, contextFactory=load_context_factory_from_settings(settings, crawler),
+            connectTimeout=timeout, pool=self.pool,
+        )
+        jar = self._cookie_jar(crawler)
+        if jar is not None:
+            agent = CookieAgent(agent, jar)
+        self.agent = RedirectAgent(agent)
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        headers = {name: [value] for name, value in settings.getdict("DEFAULT_REQUEST_HEADERS").items()}
+        if settings.get("USER_AGENT"):
+            headers["User-Agent"] = [settings.get("USER_AGENT")]
+        self.headers = Headers({
+            name.encode("latin1"): [v.encode("latin1") if isinstance(v, str) else v for v in values]
+            for name, values in headers.items()
+        })
+        self.proxies = getproxies() if settings.getbool("HTTPPROXY_ENABLED") else {}
+        # (scheme, host) -> proxied()
+        self._proxied = {}
+        self._limits = {}
+
+    @staticmethod
+    def _cookie_jar(crawler):
+        """
+        The http.cookiejar.CookieJar Scrapy keeps for requests without a
+        cookiejar meta key, or None if cookies are disabled.
+        """
+        if not crawler.settings.getbool("COOKIES_ENABLED"):
+            return None
+        for middleware in crawler.engine.downloader.middleware.middlewares:
+            if isinstance(middleware, CookiesMiddleware):
+                return middleware.jars[None].jar
+        return None
+
+    def proxied(self, url):
+        """
+        True if Scrapy's HttpProxyMiddleware would send url through a proxy
+        from the environment. The Agent does not speak to proxies, so such
+        URLs should be fetched as Scrapy requests.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname or "")
+        proxied = self._proxied.get(key)
+        if proxied is None:
+            proxied = self._proxied[key] = parts.scheme in self.proxies and not proxy_bypass(key[1])
+        return proxied
+
+    def fetch(self, url):
+        """
+        GET a URL; returns a Deferred firing with (status, Content-Type header, body bytes).
+        """
+        host = urlsplit(url).netloc
+        limit = self._limits.get(host)
+        if limit is None:
+            limit = self._limits[host] = DeferredSemaphore(self.max_per_host)
+        return limit.run(self._get, url)
+
+    def _get(self, url):
+        d = self.agent.request(b"GET", url.encode("ascii"), self.headers)
+        d.addCallback(lambda response: readBody(response).addCallback(
+            lambda body: (response.code, self._content_type(response), body)
+        ))
+        d.addTimeout(self.timeout, self._reactor)
+        return d
+
+    @staticmethod
+    def _content_type(response):
+        values = response.headers.getRawHeaders(b"content-type")
+        return values[0].decode("latin1") if values else None
+
+    def close(self):
+        return self.pool.closeCachedConnections()
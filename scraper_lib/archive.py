@@ -0,0 +1,92 @@
+# scraper_module/scraper_lib/archive.py
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Optional: bodies fall back to zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MODES = ("capture", "replay")
+
+
+class ResponseArchive:
+    """
+    Per-engine SQLite archive of fetched responses (final URL, status,
+    headers and body), keyed by canonical request URL. Bodies are zstd
+    compressed when zstandard is installed, zlib otherwise; the codec is
+    stored per row, so an archive stays readable either way.
+
+    archive_mode="capture" fills it while crawling; "replay" answers every
+    request from it, so a changed config can be re-run over the stored pages
+    without touching the network (see ResponseArchiveMiddleware).
+    """
+
+    def __init__(self, name, archive_dir="./archives", mode="capture"):
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(f"Unknown archive_mode '{mode}'. Expected one of: {', '.join(ARCHIVE_MODES)}")
+        self.mode = mode
+        self.path = os.path.join(archive_dir, f"{name}.sqlite3")
+        if mode == "replay" and not os.path.exists(self.path):
+            raise FileNotFoundError(f"No response archive at {self.path}; run with archive_mode='capture' first")
+        os.makedirs(archive_dir, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                response_url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                body BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        if zstandard is not None:
+            self._codec = "zstd"
+            self._compress = zstandard.ZstdCompressor(level=10).compress
+        else:
+            self._codec = "zlib"
+            self._compress = zlib.compress
+        self._zstd = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def put(self, url, response_url, status, headers, body):
+        """
+        Store a response under its canonical request URL; headers map names to lists of values.
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, response_url, status, json.dumps(headers), self._codec, self._compress(body), time.time()),
+        )
+
+    def get(self, url):
+        """
+        Return (response_url, status, headers, body) for a canonical URL, or None.
+        """
+        row = self.conn.execute(
+            "SELECT response_url, status, headers, codec, body FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        response_url, status, headers, codec, body = row
+        if codec == "zstd":
+            if self._zstd is None:
+                raise RuntimeError(f"{self.path} holds zstd-compressed bodies; pip install zstandard to replay it")
+            body = self._zstd.decompress(body)
+        else:
+            body = zlib.decompress(body)
+        return response_url, status, json.loads(headers), body
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,149 @@
+# scraper_module/scraper_lib/async_runner.py
+import asyncio
+import functools
+import logging
+import sys
+import threading
+from scrapy.crawler import CrawlerRunner
+from .runner import RunAllEngines
+
+logger = logging.getLogger(__name__)
+
+ASYNCIO_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+# Marks the end of a stream() queue.
+_DONE = object()
+
+
+def asyncio_reactor():
+    """
+    The Twisted reactor, running on the current asyncio event loop. It is
+    installed by the first call, so nothing may import twisted.internet.reactor
+    before that; every later crawl in the process reuses it, which means all
+    of them must run on that same event loop.
+    """
+    from scrapy.utils.reactor import install_reactor
+    loop = asyncio.get_running_loop()
+    if "twisted.internet.reactor" not in sys.modules:
+        install_reactor(ASYNCIO_REACTOR)
+    from twisted.internet import reactor
+    if getattr(reactor, "_asyncioEventloop", None) is not loop:
+        raise RuntimeError(
+            f"The installed reactor ({type(reactor).__name__}) does not run on this event loop. Use the async API "
+            f"from a single event loop, before anything else imports twisted.internet.reactor."
+        )
+    if not reactor.running:
+        # The reactor is never stopped (that would stop the event loop too), so the
+        # threads of its DNS thread pool must not keep the process alive.
+        reactor.getThreadPool().threadFactory = functools.partial(threading.Thread, daemon=True)
+        # The event loop is already running; this only fires the reactor's startup triggers.
+        reactor.startRunning(installSignalHandlers=False)
+    return reactor
+
+
+class AsyncRunAllEngines(RunAllEngines):
+    """
+    RunAllEngines for asyncio programs: crawls run on a CrawlerRunner over
+    the asyncio reactor, so a long-lived process can run engines one after
+    another or side by side in one event loop, instead of a CrawlerProcess
+    (and a new Python process) per crawl.
+
+        runner = AsyncRunAllEngines(engines)
+        results = await runner.run_all()
+        async for item in runner.stream(engine):
+            ...
+
+    stream() hands items over through a queue of queue_size items; while it is
+    full the spider stops taking new items, and so new pages, until the
+    consumer catches up. Unlike CrawlerProcess, CrawlerRunner leaves logging
+    to the program.
+    """
+
+    def __init__(self, engines=(), global_settings=None, output_folder="./data_output", queue_size=100):
+        super().__init__(list(engines), global_settings, output_folder)
+        self.queue_size = queue_size
+        self._runner = None
+        self._running = set()
+        # Engine name -> the asyncio.Queue of its running stream()
+        self._queues = {}
+
+    def runner(self):
+        if self._runner is None:
+            asyncio_reactor()
+            self._runner = CrawlerRunner(self.global_settings)
+        return self._runner
+
+    def _collect(self, engine, item):
+        queue = self._queues.get(engine.name)
+        if queue is None:
+            engine.collect(item)
+            return None
+        if engine.sink is not None:
+            engine.sink.write(item)
+        if not queue.full():
+            queue.put_nowait(item)
+            return None
+        # Scrapy holds the item (and the response it came from) until this Deferred fires.
+        from twisted.internet.defer import Deferred
+        return Deferred.fromFuture(asyncio.ensure_future(queue.put(item)))
+
+    async def _crawl(self, engine, on_crawler=None):
+        if engine.name in self._running:
+            raise RuntimeError(f"Engine '{engine.name}' is already crawling.")
+        self._running.add(engine.name)
+        try:
+            engine.new_run()
+            crawler, done = self._schedule(self.runner(), engine)
+            if on_crawler is not None:
+                on_crawler(crawler)
+            await done.asFuture(asyncio.get_running_loop())
+        finally:
+            self._running.discard(engine.name)
+        return engine.items_collected
+
+    async def crawl(self, engine):
+        """
+        Crawl one engine and return its items.
+        """
+        return await self._crawl(engine)
+
+    async def run_all(self):
+        """
+        Crawl all the engines at once; returns the same as RunAllEngines.run_all.
+        """
+        self.logger.info(f"Starting {len(self.engines)} spiders...")
+        results = await asyncio.gather(*(self._crawl(engine) for engine in self.engines))
+        return {engine.name: items for engine, items in zip(self.engines, results)}
+
+    async def stream(self, engine):
+        """
+        Crawl one engine, yielding its items as they are scraped instead of
+        collecting them. Leaving the loop early stops the crawl.
+        """
+        if engine.name in self._running:
+            raise RuntimeError(f"Engine '{engine.name}' is already crawling.")
+        queue = asyncio.Queue(self.queue_size)
+        self._queues[engine.name] = queue
+        crawlers = []
+        task = asyncio.ensure_future(self._crawl(engine, crawlers.append))
+        task.add_done_callback(lambda _task: asyncio.ensure_future(queue.put(_DONE)))
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                yield item
+            await task
+        finally:
+            if not task.done():
+                # Unblock the item handlers while the spider shuts down.
+                drain = asyncio.ensure_future(self._drain(queue))
+                if crawlers:
+                    await crawlers[0].stop().asFuture(asyncio.get_running_loop())
+                await asyncio.gather(task, return_exceptions=True)
+                drain.cancel()
+            self._queues.pop(engine.name, None)
+
+    @staticmethod
+    async def _drain(queue):
+        while True:
+            await queue.get()
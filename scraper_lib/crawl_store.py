@@ -0,0 +1,162 @@
+# scraper_module/scraper_lib/crawl_store.py
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def connect_wal(path, attempts=50):
+    """
+    Autocommit connection to an SQLite file in WAL mode. Switching a file to
+    WAL needs an exclusive lock and fails at once, without waiting out the
+    busy timeout, while another process is opening the same file, so that
+    is retried.
+    """
+    conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+    for attempt in range(attempts):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            break
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class CrawlStore:
+    """
+    SQLite record of one engine's crawl: canonical visited URLs, requests that
+    were scheduled but not yet parsed, and the items scraped so far. If the
+    process dies, the next run with the same name resumes from here instead
+    of starting again at start_url.
+    """
+    # Whether other processes crawl from this store at the same time (see distributed.py)
+    shared = False
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS pending (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            callback TEXT NOT NULL,
+            state TEXT NOT NULL,
+            playwright INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, item TEXT NOT NULL);
+    """
+
+    def __init__(self, name, state_dir="./crawl_state"):
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"{name}.sqlite3")
+        # Autocommit + WAL: every write is durable on its own without an fsync per statement.
+        self.conn = connect_wal(self.path)
+        self.conn.executescript(self.SCHEMA)
+
+    def has_state(self):
+        """
+        True if an earlier run of this crawl stopped before finishing.
+        """
+        row = self.conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM pending) OR EXISTS (SELECT 1 FROM visited) OR EXISTS (SELECT 1 FROM items)"
+        ).fetchone()
+        return row[0] == 1
+
+    def visited(self):
+        return [row[0] for row in self.conn.execute("SELECT url FROM visited")]
+
+    def visited_set(self, backend):
+        """
+        Wrap a visited-set backend (see visited.py) so it is loaded from and
+        written through to this store.
+        """
+        return StoredVisitedSet(self, backend)
+
+    def add_visited(self, url):
+        """
+        Record a visited URL; False if it was recorded before.
+        """
+        return self.conn.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (url,)).rowcount == 1
+
+    def add_pending(self, url, callback, state, playwright=False):
+        """
+        Record a scheduled request and return its id. 'state' is the crawl state
+        carried in the request meta (depth, step index, parent item).
+        """
+        cur = self.conn.execute(
+            "INSERT INTO pending (url, callback, state, playwright) VALUES (?, ?, ?, ?)",
+            (url, callback, json.dumps(state, ensure_ascii=False), int(playwright)),
+        )
+        return cur.lastrowid
+
+    def update_pending(self, pending_id, state):
+        """
+        Replace the crawl state of a scheduled request, e.g. when more parent
+        items wait on it. False if the request can no longer be changed.
+        """
+        cur = self.conn.execute("UPDATE pending SET state = ? WHERE id = ?", (json.dumps(state, ensure_ascii=False), pending_id))
+        return cur.rowcount == 1
+
+    def pending(self):
+        """
+        Yield (id, url, callback, state, playwright) for every unfinished request.
+        """
+        rows = self.conn.execute("SELECT id, url, callback, state, playwright FROM pending ORDER BY id").fetchall()
+        for pending_id, url, callback, state, playwright in rows:
+            yield pending_id, url, callback, json.loads(state), bool(playwright)
+
+    def mark_done(self, pending_id):
+        self.conn.execute("DELETE FROM pending WHERE id = ?", (pending_id,))
+
+    def add_item(self, item):
+        item = dict(item)
+        key = json.dumps(item, ensure_ascii=False, sort_keys=True)
+        self.conn.execute("INSERT OR IGNORE INTO items (key, item) VALUES (?, ?)", (key, json.dumps(item, ensure_ascii=False)))
+
+    def items(self):
+        return [json.loads(row[0]) for row in self.conn.execute("SELECT item FROM items ORDER BY rowid")]
+
+    def clear(self):
+        """
+        Forget the crawl, e.g. once it finished, so the next run starts fresh.
+        """
+        self.conn.executescript("DELETE FROM visited; DELETE FROM pending; DELETE FROM items;")
+
+    def finished(self):
+        """
+        Called when the spider finished the crawl.
+        """
+        self.clear()
+
+    def close(self):
+        self.conn.close()
+
+
+class StoredVisitedSet:
+    """
+    A visited-URL set that writes every new URL through to the CrawlStore.
+    """
+
+    def __init__(self, store, backend):
+        self._store = store
+        self._backend = backend
+        self.backend = backend.backend
+        for url in store.visited():
+            backend.add(url)
+
+    def add(self, url):
+        if url not in self._backend:
+            self._backend.add(url)
+            self._store.add_visited(url)
+
+    def __contains__(self, url):
+        return url in self._backend
+
+    def __len__(self):
+        return len(self._backend)
+
+    def memory_bytes(self):
+        return self._backend.memory_bytes()
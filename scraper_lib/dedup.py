@@ -0,0 +1,127 @@
+# scraper_module/scraper_lib/dedup.py
+import hashlib
+import os
+import re
+import time
+from .crawl_store import connect_wal
+
+_WHITESPACE = re.compile(r"\s+")
+# Fields never part of an item's identity: the same course found on two listing pages is one course.
+IGNORED_FIELDS = frozenset({"source"})
+# Index of the Find step an item came from, set by the spider when that step has dedup_keys; DedupPipeline removes it.
+STEP_FIELD = "_dedup_step"
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return "\x1f".join(_normalize(v) for v in value)
+    return _WHITESPACE.sub(" ", str(value)).strip().casefold()
+
+
+def item_hash(item, fields=None):
+    """
+    Stable 64-bit hash of an item's normalized field values (whitespace
+    collapsed, case folded): of 'fields' if given, else of every field but source.
+    """
+    if fields is None:
+        fields = sorted(k for k in item if k not in IGNORED_FIELDS)
+    key = "\x1e".join(f"{name}\x1d{_normalize(item.get(name))}" for name in fields)
+    return int.from_bytes(hashlib.blake2b(key.encode("utf8"), digest_size=8).digest(), "little")
+
+
+class DedupStore:
+    """
+    SQLite file of item hashes, so dedup carries over between runs and
+    between engines (and worker processes) pointed at the same path.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = connect_wal(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                hash INTEGER PRIMARY KEY,
+                engine TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            )
+        """)
+
+    def add(self, h, engine):
+        """
+        Record a hash; False if some run or engine recorded it before.
+        """
+        # SQLite integers are signed 64-bit.
+        signed = h - (1 << 64) if h >= 1 << 63 else h
+        cursor = self.conn.execute("INSERT OR IGNORE INTO items VALUES (?, ?, ?)", (signed, engine, time.time()))
+        return cursor.rowcount == 1
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class ItemDeduplicator:
+    """
+    Decides whether an item was already scraped, by item_hash. Each Find
+    task may name its key fields (Find.dedup_keys); an item is keyed by
+    those of the step it came from, and by all its fields but source
+    otherwise. Hashes are kept in 'seen' (the engine's visited-set
+    backend) and, if given, in a shared DedupStore.
+    """
+
+    def __init__(self, steps, seen, store=None, name="engine"):
+        # Step index -> key fields
+        self.key_fields = {index: step["dedup_keys"] for index, step in enumerate(steps) if step.get("dedup_keys")}
+        self.seen = seen
+        self.store = store
+        self.name = name
+        # Keys of items restored by a resumed crawl, which the store already holds from before the interruption
+        self._restored = set()
+        # Set for resumable crawls: id(item) -> Find step of the items check() let through, until step_of() takes it
+        self.keep_steps = False
+        self._steps = {}
+
+    def key(self, item, step_index=None):
+        return item_hash(item, self.key_fields.get(step_index))
+
+    def check(self, item, step_index=None):
+        """
+        Return None for a new item (and remember it), "run" for an item seen
+        earlier in this run, or "store" for one the store already held.
+        step_index is the Find step the item came from (STEP_FIELD).
+        """
+        # Hex digests, since the visited backends take string keys.
+        key = f"{self.key(item, step_index):016x}"
+        if key in self.seen:
+            return "run"
+        self.seen.add(key)
+        if key in self._restored:
+            self._restored.discard(key)
+        elif self.store is not None and not self.store.add(int(key, 16), self.name):
+            return "store"
+        if self.keep_steps and step_index is not None:
+            self._steps[id(item)] = step_index
+        return None
+
+    def step_of(self, item):
+        """
+        The Find step of an item check() let through (once), so the crawl
+        store can keep it with the item for restored().
+        """
+        return self._steps.pop(id(item), None)
+
+    def restored(self, item):
+        """
+        Mark an item a resumed crawl re-emits, so the store does not count it
+        as a duplicate. It is keyed as check() will key it, by its STEP_FIELD.
+        """
+        self._restored.add(f"{self.key(item, item.get(STEP_FIELD)):016x}")
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
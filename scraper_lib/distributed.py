@@ -0,0 +1,505 @@
+# scraper_module/scraper_lib/distributed.py
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import time
+from scrapy.core.scheduler import Scheduler
+from .async_runner import AsyncRunAllEngines
+from .crawl_store import CrawlStore, StoredVisitedSet, connect_wal
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCrawlStore(CrawlStore):
+    """
+    A CrawlStore that the nodes of a distributed run crawl one engine from
+    at the same time. Requests are rows any node may claim. A claim is a
+    lease the node renews while it lives, so the requests of a node that
+    dies go back to the others once its lease runs out. The store also holds
+    the visited URLs and item hashes of the run, and the items of every node.
+    """
+    shared = True
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS pending (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            callback TEXT NOT NULL,
+            state TEXT NOT NULL,
+            playwright INTEGER NOT NULL DEFAULT 0,
+            priority INTEGER NOT NULL DEFAULT 0,
+            node TEXT,
+            lease_until REAL
+        );
+        CREATE INDEX IF NOT EXISTS pending_order ON pending (priority DESC, id);
+        CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, item TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS hashes (hash INTEGER PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+
+    def __init__(self, name, state_dir, node, lease_seconds=60):
+        super().__init__(name, state_dir)
+        self.node = node
+        self.lease_seconds = lease_seconds
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two nodes cannot read the same free row.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def seed(self, url, callback, playwright=False):
+        """
+        If no node has started the crawl yet, record its start request, claimed
+        by this node, and return its id; otherwise None.
+        """
+        with self._transaction():
+            if self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('started_by', ?)", (self.node,)).rowcount == 0:
+                return None
+            return self.conn.execute(
+                "INSERT INTO pending (url, callback, state, playwright, node, lease_until) VALUES (?, ?, '{}', ?, ?, ?)",
+                (url, callback, int(playwright), self.node, time.time() + self.lease_seconds),
+            ).lastrowid
+
+    def add_pending(self, url, callback, state, playwright=False, priority=0):
+        """
+        Record a request for any node to claim and return its id.
+        """
+        cur = self.conn.execute(
+            "INSERT INTO pending (url, callback, state, playwright, priority) VALUES (?, ?, ?, ?, ?)",
+            (url, callback, json.dumps(state, ensure_ascii=False), int(playwright), priority),
+        )
+        return cur.lastrowid
+
+    def update_pending(self, pending_id, state):
+        # A claimed request may already be in flight on another node.
+        cur = self.conn.execute(
+            "UPDATE pending SET state = ? WHERE id = ? AND node IS NULL",
+            (json.dumps(state, ensure_ascii=False), pending_id),
+        )
+        return cur.rowcount == 1
+
+    def claim(self):
+        """
+        Lease the free (or expired) request with the highest priority to this
+        node; returns (id, url, callback, state, playwright) or None.
+        """
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute(
+                "SELECT id, url, callback, state, playwright FROM pending WHERE node IS NULL OR lease_until < ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE pending SET node = ?, lease_until = ? WHERE id = ?", (self.node, now + self.lease_seconds, row[0])
+            )
+        pending_id, url, callback, state, playwright = row
+        return pending_id, url, callback, json.loads(state), bool(playwright)
+
+    def renew_leases(self):
+        self.conn.execute("UPDATE pending SET lease_until = ? WHERE node = ?", (time.time() + self.lease_seconds, self.node))
+
+    def release(self):
+        """
+        Give back every request this node holds, so other nodes can take them at once.
+        """
+        self.conn.execute("UPDATE pending SET node = NULL, lease_until = NULL WHERE node = ?", (self.node,))
+
+    def has_open_work(self):
+        """
+        True while requests this node does not hold remain: free ones, or ones
+        other nodes are working on, which may lead to more.
+        """
+        row = self.conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM pending WHERE node IS NULL OR node != ? OR lease_until < ?)",
+            (self.node, time.time()),
+        ).fetchone()
+        return row[0] == 1
+
+    def status(self):
+        """
+        "new" before any node started the crawl, "claimable" while free or
+        expired requests wait, "drained" once no requests are left, else "busy".
+        """
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'started_by'").fetchone() is None:
+            return "new"
+        row = self.conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM pending), EXISTS (SELECT 1 FROM pending WHERE node IS NULL OR lease_until < ?)",
+            (time.time(),),
+        ).fetchone()
+        if not row[0]:
+            return "drained"
+        return "claimable" if row[1] else "busy"
+
+    def visited_set(self, backend):
+        return SharedVisitedSet(self, backend)
+
+    def add_hash(self, h):
+        """
+        Record an item hash; False if some node recorded it before.
+        """
+        # SQLite integers are signed 64-bit.
+        signed = h - (1 << 64) if h >= 1 << 63 else h
+        return self.conn.execute("INSERT OR IGNORE INTO hashes VALUES (?)", (signed,)).rowcount == 1
+
+    def finished(self):
+        """
+        This node has finished; the node that merges the run's items clears the store (see DistributedRunAllEngines).
+        """
+
+    def clear(self):
+        # meta keeps started_by: a node that still lists the engine as unfinished
+        # must see it "drained", not "new", or it would crawl it all over again.
+        super().clear()
+        self.conn.execute("DELETE FROM hashes")
+
+
+class SharedVisitedSet(StoredVisitedSet):
+    """
+    A visited-URL set shared by the nodes of a distributed run. URLs seen on
+    this node are answered from the local backend, others from the store.
+    The spider adds every URL it does not find, so a URL the store does not
+    hold yet is recorded by the lookup itself. Otherwise two nodes could both
+    find it missing and both request it.
+    """
+
+    def __contains__(self, url):
+        if url in self._backend:
+            return True
+        self._backend.add(url)
+        return not self._store.add_visited(url)
+
+
+class SharedHashes:
+    """
+    The item hashes of a SharedCrawlStore, in the shape ItemDeduplicator
+    expects of a DedupStore: items are de-duplicated across the nodes of one
+    run, and forgotten with the run.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def add(self, h, engine):
+        return self.store.add_hash(h)
+
+    def close(self):
+        # The store belongs to the spider, which closes it.
+        pass
+
+
+class SharedScheduler(Scheduler):
+    """
+    Scrapy scheduler for a spider crawling from a SharedCrawlStore. New
+    requests go to the store for any node to claim. Requests this node
+    holds (retries, redirects) stay in the local queues. Once those are
+    empty, the next request is claimed from the store. The spider stays
+    open while other nodes still hold requests, since they may lead to more.
+    """
+
+    def open(self, spider):
+        from twisted.internet import task
+        self.store = spider.crawl_store
+        # Scrapy only asks a scheduler that had nothing to give again every 5 seconds.
+        self._poll = task.LoopingCall(self._claim_when_idle)
+        self._poll.start(self.crawler.settings.getfloat("DISTRIBUTED_POLL_SECONDS", 1.0), now=False)
+        return super().open(spider)
+
+    def close(self, reason):
+        self._poll.stop()
+        if reason != "finished":
+            self.store.release()
+        return super().close(reason)
+
+    def _claim_when_idle(self):
+        # Requests other nodes queued since; crawl() wakes the engine up for them.
+        if super().has_pending_requests():
+            return
+        claimed = self.store.claim()
+        if claimed is not None:
+            self.stats.inc_value("distributed/claimed", spider=self.spider)
+            self.crawler.engine.crawl(self.spider._pending_request(*claimed))
+
+    def enqueue_request(self, request):
+        shared = request.meta.pop("shared_pending", None)
+        if shared is None:
+            return super().enqueue_request(request)
+        callback, state = shared
+        request.meta["pending_id"] = self.store.add_pending(
+            request.url, callback, state, request.meta.get("playwright", False), request.priority
+        )
+        self.stats.inc_value("distributed/shared", spider=self.spider)
+        return True
+
+    def next_request(self):
+        request = super().next_request()
+        if request is not None:
+            return request
+        claimed = self.store.claim()
+        if claimed is None:
+            return None
+        self.stats.inc_value("distributed/claimed", spider=self.spider)
+        return self.spider._pending_request(*claimed)
+
+    def has_pending_requests(self):
+        return super().has_pending_requests() or self.store.has_open_work()
+
+
+class EngineQueue:
+    """
+    The run-wide record of a distributed run, in <shared_dir>/queue.sqlite3:
+    which engines are finished, which nodes are crawling each one (a lease
+    per node and engine), and what each node has crawled.
+    """
+
+    def __init__(self, shared_dir, node, lease_seconds=60):
+        os.makedirs(shared_dir, exist_ok=True)
+        self.path = os.path.join(shared_dir, "queue.sqlite3")
+        self.node = node
+        self.lease_seconds = lease_seconds
+        self.conn = connect_wal(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS engines (
+                name TEXT PRIMARY KEY,
+                done INTEGER NOT NULL DEFAULT 0,
+                merged_by TEXT
+            );
+            CREATE TABLE IF NOT EXISTS members (
+                engine TEXT NOT NULL,
+                node TEXT NOT NULL,
+                lease_until REAL NOT NULL,
+                PRIMARY KEY (engine, node)
+            );
+            CREATE TABLE IF NOT EXISTS nodes (
+                node TEXT PRIMARY KEY,
+                started REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                pages INTEGER NOT NULL DEFAULT 0,
+                items INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+
+    def register(self, names):
+        now = time.time()
+        self.conn.executemany("INSERT OR IGNORE INTO engines (name) VALUES (?)", [(name,) for name in names])
+        self.conn.execute("INSERT OR IGNORE INTO nodes (node, started, last_seen) VALUES (?, ?, ?)", (self.node, now, now))
+
+    def unfinished(self, names):
+        done = {row[0] for row in self.conn.execute("SELECT name FROM engines WHERE done = 1")}
+        return [name for name in names if name not in done]
+
+    def join(self, engine):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO members VALUES (?, ?, ?)", (engine, self.node, time.time() + self.lease_seconds)
+        )
+
+    def leave(self, engine):
+        self.conn.execute("DELETE FROM members WHERE engine = ? AND node = ?", (engine, self.node))
+
+    def renew(self):
+        self.conn.execute("UPDATE members SET lease_until = ? WHERE node = ?", (time.time() + self.lease_seconds, self.node))
+
+    def finish(self, engine):
+        """
+        Mark an engine done, unless it is already or some other live node
+        still crawls it. True for the one node that should merge its items.
+        """
+        cur = self.conn.execute(
+            "UPDATE engines SET done = 1, merged_by = ? WHERE name = ? AND done = 0 "
+            "AND NOT EXISTS (SELECT 1 FROM members WHERE engine = ? AND node != ? AND lease_until >= ?)",
+            (self.node, engine, engine, self.node, time.time()),
+        )
+        return cur.rowcount == 1
+
+    def record(self, stats):
+        """
+        Add a finished crawl's pages and items to this node's totals.
+        """
+        self.conn.execute(
+            "UPDATE nodes SET pages = pages + ?, items = items + ?, last_seen = ? WHERE node = ?",
+            (stats.get("response_received_count", 0), stats.get("item_scraped_count", 0), time.time(), self.node),
+        )
+
+    def throughput(self):
+        """
+        {node: {"pages", "items", "seconds", "pages_per_sec", "items_per_sec"}} for every node of the run.
+        """
+        report = {}
+        for node, started, last_seen, pages, items in self.conn.execute(
+            "SELECT node, started, last_seen, pages, items FROM nodes ORDER BY started"
+        ):
+            seconds = max(last_seen - started, 1e-9)
+            report[node] = {
+                "pages": pages,
+                "items": items,
+                "seconds": round(seconds, 1),
+                "pages_per_sec": round(pages / seconds, 1),
+                "items_per_sec": round(items / seconds, 1),
+            }
+        return report
+
+    def close(self):
+        self.conn.close()
+
+
+class DistributedRunAllEngines(AsyncRunAllEngines):
+    """
+    One node of a distributed run. Every node is given the same engines and
+    the same shared_dir, and pulls work from it until all engines are done:
+
+    - Engines no node has started yet are started first, up to
+      concurrent_engines at a time.
+    - After that, the node joins engines that have requests no node holds.
+      Every request is queued in the engine's SharedCrawlStore, so several
+      nodes can work through one large engine.
+    - Visited URLs and item dedup hashes are shared the same way, and every
+      node's items are stored there too.
+    - A node holds leases on its requests and engines, renewed every
+      lease_seconds / 3. If it dies, the other nodes take its requests over
+      once the leases run out.
+    - The last node to finish an engine merges the items of every node and
+      returns them from run_all(). save_all() only writes the engines this
+      node merged.
+
+    Use a new shared_dir for every run. The nodes need it on a filesystem
+    where SQLite's WAL locking works across them.
+    """
+
+    def __init__(self, engines, shared_dir, global_settings=None, output_folder="./data_output", node=None,
+                 concurrent_engines=4, lease_seconds=60, poll_seconds=2.0):
+        super().__init__(engines, global_settings, output_folder)
+        self.shared_dir = shared_dir
+        self.node = node or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrent_engines = concurrent_engines
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.queue = EngineQueue(shared_dir, self.node, lease_seconds)
+        # Names of the engines whose merged items this node returns
+        self.merged = []
+        # Per-node throughput of the whole run, filled in by run_all()
+        self.throughput = {}
+        # Engine name -> SharedCrawlStore of its running crawl on this node
+        self._stores = {}
+
+    def _store(self, name):
+        return SharedCrawlStore(name, self.shared_dir, self.node, self.lease_seconds)
+
+    def _crawler_settings(self, engine):
+        settings = super()._crawler_settings(engine)
+        settings["SCHEDULER"] = "scraper_module.scraper_lib.distributed.SharedScheduler"
+        settings["DISTRIBUTED_POLL_SECONDS"] = self.poll_seconds
+        return settings
+
+    def _spider_kwargs(self, engine):
+        store = self._stores[engine.name] = self._store(engine.name)
+        # A dedup_store in the config still de-duplicates across runs (and nodes).
+        hashes = None if engine.config.dedup_store else SharedHashes(store)
+        return engine.spider_kwargs(crawl_store=store, dedup_store=hashes)
+
+    def _finish(self, engine, stats):
+        super()._finish(engine, stats)
+        self._stores.pop(engine.name, None)
+        self.queue.record(stats)
+        self.queue.leave(engine.name)
+        if stats.get("finish_reason") == "finished":
+            self._merge(engine)
+
+    def _merge(self, engine):
+        store = self._store(engine.name)
+        try:
+            if store.status() != "drained" or not self.queue.finish(engine.name):
+                return
+            engine.items_collected = store.items()
+            self.merged.append(engine.name)
+            self.logger.info(f"{engine.name}: merged {len(engine.items_collected)} items from all nodes")
+            store.clear()
+        finally:
+            store.close()
+
+    def _next_engine(self, by_name, running):
+        """
+        The next engine for this node to crawl: one nobody started, else one
+        with requests to claim. Engines whose nodes all died after their last
+        request are merged here.
+        """
+        join = None
+        for name in self.queue.unfinished(by_name):
+            if name in running:
+                continue
+            store = self._store(name)
+            try:
+                status = store.status()
+            finally:
+                store.close()
+            if status == "new" and name in self.queue.unfinished([name]):
+                return name
+            if status == "claimable" and join is None:
+                join = name
+            elif status == "drained":
+                self._merge(by_name[name])
+        return join
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            self.queue.renew()
+            for store in self._stores.values():
+                store.renew_leases()
+
+    async def run_all(self):
+        """
+        Crawl until every engine is done on some node; returns {name: items} for the engines merged here.
+        """
+        by_name = {engine.name: engine for engine in self.engines}
+        self.queue.register(by_name)
+        self.logger.info(f"Node {self.node} joining the run in {self.shared_dir}")
+        heartbeat = asyncio.ensure_future(self._heartbeat())
+        running = {}
+        try:
+            while True:
+                while len(running) < self.concurrent_engines:
+                    name = self._next_engine(by_name, running)
+                    if name is None:
+                        break
+                    self.queue.join(name)
+                    running[name] = asyncio.ensure_future(self._crawl(by_name[name]))
+                if not running:
+                    if not self.queue.unfinished(by_name):
+                        break
+                    # Other nodes hold the remaining work; wait for it to finish or free up.
+                    await asyncio.sleep(self.poll_seconds)
+                    continue
+                await asyncio.wait(running.values(), timeout=self.poll_seconds, return_when=asyncio.FIRST_COMPLETED)
+                for name, task in list(running.items()):
+                    if task.done():
+                        del running[name]
+                        task.result()
+        finally:
+            heartbeat.cancel()
+        self.throughput = self.queue.throughput()
+        for node, report in self.throughput.items():
+            self.logger.info(f"{node}: {report['pages']} pages, {report['items']} items in {report['seconds']}s "
+                             f"({report['pages_per_sec']} pages/s, {report['items_per_sec']} items/s)")
+        return {name: by_name[name].items_collected for name in self.merged}
+
+    def save_all(self, output_folder=None, format="json"):
+        """
+        Write the merged items of the engines this node merged (see RunAllEngines.save_all).
+        """
+        engines = self.engines
+        self.engines = [engine for engine in engines if engine.name in self.merged]
+        try:
+            super().save_all(output_folder, format)
+        finally:
+            self.engines = engines
@@ -1,102 +1,474 @@
 # scraper_module/scraper_lib/engine_spider.py
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+import lxml.html
+from lxml import etree
 import scrapy
-from scrapy_playwright.page import PageMethod
-from .helpers import canonicalize_url, find_pages, find, _select
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.defer import maybe_deferred_to_future
+from w3lib.encoding import html_to_unicode
+from .helpers import LinkExtractor, LinkScope, UrlCanonicalizer, canonicalize_url, find_pages, find, compile_steps, compile_selector, pagination_extractor, _root
+from .ajax_client import AjaxClient
+from .dedup import STEP_FIELD
+from .frontier import Frontier
+from .parse_pool import ParsePool
+from .scoped_parse import scoped_parsers
+from .playwright_pool import PLAYWRIGHT_WAITS, PagePool, wait_for_condition
+from .visited import make_visited_set
+
+_COID_RE = re.compile(r"coid=(\d+)")
+# Parses course fragments (decoded, then re-encoded as UTF-8) into the same document tree parsel would build.
+_FRAGMENT_PARSER = lxml.html.HTMLParser(recover=True, encoding="utf8")
+_DISPLAY_OPTIONS = quote('a:2:{s:8:"~location~";s:8:"~template~";s:28:"~course_program_display_field~";s:0:"";}')
+
 
 class StepSpider(scrapy.Spider):
     name = "step_spider"
     custom_settings = {}  # Allow per-spider settings override if needed
+    # Merged into DOWNLOADER_MIDDLEWARES by update_settings; each is a no-op unless its feature is configured.
+    downloader_middlewares = {
+        "scraper_module.scraper_project.middlewares.ResponseArchiveMiddleware": 50,
+        "scraper_module.scraper_project.middlewares.IncrementalCacheMiddleware": 585,
+        "scraper_module.scraper_project.middlewares.AdaptiveConcurrencyMiddleware": 900,
+        "scraper_module.scraper_project.middlewares.PlaywrightPagePoolMiddleware": 950,
+    }
+    # Merged into ITEM_PIPELINES the same way; ahead of the project pipelines and every feed exporter.
+    item_pipelines = {
+        "scraper_module.scraper_project.pipelines.DedupPipeline": 100,
+    }
+    # Callbacks whose page can be parsed in the parse pool before they run.
+    pooled_callbacks = {"parse_steps", "handle_pagination", "_search_links_page", "_parse_followed_page"}
 
-    def __init__(self, start_url, steps, use_playwright=False, pagination=None, *args, **kwargs):
+    def __init__(self, start_url, steps, use_playwright=False, pagination=None, crawl_store=None,
+                 visited_backend="exact", visited_fp_rate=0.001, http_cache=None,
+                 parse_workers=0, parse_mode="thread", playwright_wait="timeout", playwright_wait_selector=None,
+                 playwright_wait_timeout=10000, playwright_pool_size=0, playwright_contexts=1, crawl_rate=None,
+                 tracking_params=None, instrumentation=None, archive=None, item_dedup=None, follow_cache_size=1024,
+                 scoped_parse=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.start_url = start_url
-        self.steps = steps or []
+        # Selector strings are compiled once here and reused for every response.
+        self.steps = compile_steps(steps or [])
         self.use_playwright = use_playwright
         self.pagination = pagination
-        # NEW: Create a spider-level set to track visited URLs
-        self.visited_urls = set()
+        target_page_selector = pagination.get("target_page_selector") if pagination else None
+        self._target_selector = compile_selector(target_page_selector) if target_page_selector else None
+        # Orders Search_Links requests (see frontier.py); best-first holds up to a window of them back
+        is_search_links = bool(pagination) and pagination.get("type") == "search_links"
+        self.frontier = Frontier(pagination.get("strategy") or "bfs") if is_search_links else None
+        self._frontier_window = 16
+        # Search_Links settings resolved once rather than per page
+        link_space = pagination.get("search_space") if is_search_links else None
+        self._link_scope = LinkScope(start_url, pagination.get("base_url")) if is_search_links else None
+        max_depth = pagination.get("max_depth") if is_search_links else None
+        self._max_depth = 10 if max_depth is None else max_depth
+        # Optional CrawlStore that makes the crawl resumable (see crawl_store.py)
+        self.crawl_store = crawl_store
+        # Visited-URL keys; the shared canonicalize_url (and its cache) unless tracking_params are configured
+        self.canonicalize_url = canonicalize_url if tracking_params is None else UrlCanonicalizer(tracking_params)
+        # Search_Links discovery: every <a href> in the search_space, filtered by scope (see LinkExtractor)
+        self._search_links = LinkExtractor(link_space, scope=self._link_scope, canonicalize=self.canonicalize_url) if link_space else None
+        # Listed_Links discovery, kept for the crawl like _search_links
+        is_listed_links = bool(pagination) and pagination.get("type") == "listed_links"
+        self._page_links = pagination_extractor(pagination, self.canonicalize_url) if is_listed_links else None
+        # NEW: Create a spider-level set to track visited URLs (backends in visited.py)
+        visited_urls = make_visited_set(visited_backend, visited_fp_rate)
+        self.visited_urls = crawl_store.visited_set(visited_urls) if crawl_store is not None else visited_urls
+        # Optional HttpCacheStore for incremental re-crawls (see http_cache.py)
+        self.http_cache = http_cache
+        # Optional ScopedParsers that only build the containers the selectors read (see scoped_parse.py):
+        # one for crawled pages, one per Follow step for its followed pages
+        self.page_parser = None
+        self.follow_parsers = {}
+        if scoped_parse:
+            self.page_parser, self.follow_parsers = scoped_parsers(self.steps, pagination)
+        # Optional ParsePool that parses pages off the reactor thread (see parse_pool.py)
+        self.parse_pool = ParsePool(self.steps, pagination, parse_mode, parse_workers, scoped_parse) if parse_workers else None
+        if playwright_wait not in PLAYWRIGHT_WAITS:
+            raise ValueError(f"Unknown playwright_wait '{playwright_wait}'. Expected one of: {', '.join(PLAYWRIGHT_WAITS)}")
+        if playwright_wait == "selector" and not playwright_wait_selector:
+            # Wait for the container the first step extracts from.
+            playwright_wait_selector = next((step["search_space"] for step in self.steps if step.get("search_space")), None)
+        if playwright_wait_selector:
+            playwright_wait_selector = f"xpath={compile_selector(playwright_wait_selector).expr}"
+        self.playwright_wait = (playwright_wait, playwright_wait_selector, playwright_wait_timeout)
+        # Follow: meta of the in-flight request per canonical target URL (its parent_items grow while it is
+        # in flight), and an LRU of the next_steps results of fetched targets
+        self._follow_waiting = {}
+        self._follow_results = OrderedDict()
+        self._follow_cache_size = follow_cache_size
+        # DynamicFind: course ids already requested, per step, and the AjaxClient for direct_fetch steps
+        self._seen_coids = {}
+        self.ajax_client = None
+        self._ajax_in_flight = 0
+        # Optional ResponseArchive that responses are captured to or replayed from (see archive.py)
+        self.archive = archive
+        # Optional Instrumentation of step, selector and phase timings (see instrumentation.py)
+        self.instrumentation = instrumentation
+        # Optional ItemDeduplicator that DedupPipeline drops repeated items with (see dedup.py)
+        self.item_dedup = item_dedup
+        # Optional crawl-rate policy that AdaptiveConcurrencyMiddleware tunes per-host concurrency with
+        self.crawl_rate = crawl_rate
+        # Optional PagePool of reused Playwright pages (see playwright_pool.py)
+        self.page_pool = PagePool(playwright_pool_size, playwright_contexts, self.name) if use_playwright and playwright_pool_size else None
         if self.use_playwright:
             self.custom_settings.update({
                 "PLAYWRIGHT_BROWSER_TYPE": "chromium",
                 "PLAYWRIGHT_LAUNCH_OPTIONS": {"headless": True, "timeout": 30000},
             })
 
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        # Merge rather than override, so middlewares from the project settings are kept.
+        middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+        for path, order in cls.downloader_middlewares.items():
+            middlewares.setdefault(path, order)
+        settings.set("DOWNLOADER_MIDDLEWARES", middlewares, priority="spider")
+        pipelines = settings.getdict("ITEM_PIPELINES")
+        for path, order in cls.item_pipelines.items():
+            pipelines.setdefault(path, order)
+        settings.set("ITEM_PIPELINES", pipelines, priority="spider")
+        if settings.get("LOG_FORMATTER") == "scrapy.logformatter.LogFormatter":
+            # One DEBUG line per dropped duplicate rather than a WARNING.
+            settings.set("LOG_FORMATTER", "scraper_module.scraper_project.pipelines.QuietDuplicatesLogFormatter", priority="spider")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._wait_for_ajax, signal=signals.spider_idle)
+        crawler.signals.connect(spider._drain_frontier, signal=signals.spider_idle)
+        spider._frontier_window = crawler.settings.getint("CONCURRENT_REQUESTS")
+        if spider.crawl_store is not None:
+            if not spider.crawl_store.shared:
+                crawler.signals.connect(spider._restore_items, signal=signals.spider_opened)
+                if spider.item_dedup is not None:
+                    # Stored items keep their Find step, so restored ones are keyed as before.
+                    spider.item_dedup.keep_steps = True
+                    crawler.signals.connect(spider._forget_item_step, signal=signals.item_dropped)
+                    crawler.signals.connect(spider._forget_item_step, signal=signals.item_error)
+            crawler.signals.connect(spider._store_item, signal=signals.item_scraped)
+            crawler.signals.connect(spider._request_dropped, signal=signals.request_dropped)
+        return spider
+
     def start_requests(self):
-        canonical_start = canonicalize_url(self.start_url)
+        if self.crawl_store is not None and self.crawl_store.shared:
+            yield from self._seed_shared_crawl()
+            return
+        if self.crawl_store is not None and self.crawl_store.has_state():
+            yield from self._resume_requests()
+            return
+        canonical_start = self.canonicalize_url(self.start_url)
         # Mark the start_url as visited
         self.visited_urls.add(canonical_start)
         # If pagination is configured, use handle_pagination; otherwise, parse steps directly.
         callback = self.handle_pagination if self.pagination else self.parse_steps
         yield self._make_request(self.start_url, callback)
 
-    def _make_request(self, url, callback):
-        meta = {}
-        if self.use_playwright:
+    def _seed_shared_crawl(self):
+        # Only the first node of a distributed crawl requests the start_url; the
+        # others take their requests from the shared store (see distributed.py).
+        self.visited_urls.add(self.canonicalize_url(self.start_url))
+        callback = self.handle_pagination if self.pagination else self.parse_steps
+        pending_id = self.crawl_store.seed(self.start_url, callback.__name__, self.use_playwright)
+        if pending_id is not None:
+            yield self._pending_request(pending_id, self.start_url, callback.__name__, {}, self.use_playwright)
+
+    def _make_request(self, url, callback, playwright=None, pending_id=None, priority=0, errback=None,
+                      dont_filter=False, **state):
+        """
+        Build a request for one of the spider's own callbacks. Crawl state
+        (crawl_depth, step_index, parent_item) travels in the request meta, so
+        it can be recorded in the crawl store and rebuilt after a restart.
+        """
+        meta = dict(state)
+        name = callback.__name__
+        if self.use_playwright if playwright is None else playwright:
             meta.update({
                 "playwright": True,
-                "playwright_page_methods": [PageMethod("wait_for_timeout", 3000)]
+                "playwright_page_methods": [self._playwright_wait_method()]
             })
-            canonical_url = canonicalize_url(url)
-            if canonical_url in self.visited_urls:
-                return None
-            self.visited_urls.add(canonical_url)
-        return scrapy.Request(url, callback=callback, meta=meta)
-
-    def _search_links_recursive(self, response, max_depth, depth=0):
-        if depth > max_depth:
-            self.logger.debug(f"Reached max recursion depth {max_depth}")
+        pooled = self.parse_pool is not None and name in self.pooled_callbacks
+        if pooled:
+            meta["follow_index"] = state.get("step_index") if name == "_parse_followed_page" else None
+        if self.instrumentation is not None:
+            meta.update({"queued_at": time.perf_counter(), "timed_callback": name})
+            callback = self._timed_callback
+        if self.crawl_store is not None:
+            if pending_id is None and self.crawl_store.shared:
+                # Recorded once the scheduler hands the request to the shared store
+                meta["shared_pending"] = (name, state)
+            elif pending_id is None:
+                pending_id = self.crawl_store.add_pending(url, name, state, meta.get("playwright", False))
+            if pending_id is not None:
+                meta["pending_id"] = pending_id
+            meta.update({"callback": callback.__name__, "errback": errback and errback.__name__})
+            callback, errback = self._resume_callback, self._resume_errback
+        if pooled:
+            meta["pooled_callback"] = callback.__name__
+            callback = self._pooled_callback
+        return scrapy.Request(url, callback=callback, errback=errback, meta=meta, priority=priority, dont_filter=dont_filter)
+
+    def _playwright_wait_method(self):
+        # Imported here so crawls without Playwright never load it.
+        from scrapy_playwright.page import PageMethod
+        condition, selector, timeout = self.playwright_wait
+        if condition == "timeout":
+            return PageMethod("wait_for_timeout", 3000)
+        return PageMethod(wait_for_condition, condition, selector, timeout)
+
+    async def _pooled_callback(self, response):
+        # Parse in the pool, then run the real callback, which reads the results from meta["parsed"].
+        content_type = response.headers.get('Content-Type', b'').decode('utf8').lower()
+        if "html" in content_type and not response.meta.get("incremental_unchanged"):
+            start = time.perf_counter()
+            parsed = await maybe_deferred_to_future(self.parse_pool.parse(response, response.meta["follow_index"]))
+            if self.instrumentation is not None:
+                response.meta["pool_parse_seconds"] = time.perf_counter() - start
+                self.instrumentation.add("phase", "pool_parse", response.meta["pool_parse_seconds"])
+            steps = self.steps if response.meta["follow_index"] is None else self.steps[response.meta["follow_index"]].get("next_steps", [])
+            response.meta["parsed"] = {
+                "finds": {id(step): items for step, items in zip(steps, parsed["finds"])},
+                "is_target": parsed["is_target"],
+                "links": parsed["links"],
+            }
+        for result in getattr(self, response.meta["pooled_callback"])(response):
+            yield result
+
+    def _timed_callback(self, response):
+        """
+        Run the real callback (meta["timed_callback"]), recording how long the
+        request waited, downloaded and took to parse. Only the time spent
+        inside the callback counts as parsing, not the time its output spends
+        in the engine.
+        """
+        meta = response.meta
+        inst = self.instrumentation
+        download = meta.get("download_latency", 0.0)
+        inst.add("phase", "download", download, len(response.body))
+        waited = time.perf_counter() - meta["queued_at"] - download - meta.get("pool_parse_seconds", 0.0)
+        inst.add("phase", "queued", max(0.0, waited))
+        name = meta["timed_callback"]
+        callback = getattr(self, name)
+        if inst.wants_profile(response.url):
+            results = iter(inst.profile(lambda: list(callback(response) or ()), response.url))
+        else:
+            results = iter(callback(response) or ())
+        parse = 0.0
+        while True:
+            start = time.perf_counter()
+            try:
+                result = next(results)
+            except StopIteration:
+                break
+            finally:
+                parse += time.perf_counter() - start
+            yield result
+        inst.add("phase", "parse", parse)
+        inst.add("callback", name, parse)
+
+    def _find(self, response, step):
+        parsed = response.meta.get("parsed")
+        if parsed is not None and id(step) in parsed["finds"]:
+            return parsed["finds"][id(step)]
+        if self.instrumentation is None:
+            return find(response, step)
+        start = time.perf_counter()
+        items = list(find(response, step, timings=self.instrumentation))
+        self.instrumentation.add("step", step.get("task_name") or step.get("type"), time.perf_counter() - start, len(items))
+        return items
+
+    def _new_pages(self, response):
+        """
+        Listed pagination URLs on the page that haven't been visited yet; marks them visited.
+        """
+        parsed = response.meta.get("parsed")
+        if parsed is None:
+            yield from find_pages(
+                response, self.pagination, seen=self.visited_urls, canonicalize=self.canonicalize_url, extractor=self._page_links
+            )
             return
-        target_page_selector = self.pagination.get("target_page_selector")
-        if (not target_page_selector) or (target_page_selector and _select(response, target_page_selector)):
+        for url in parsed["links"]:
+            canonical_url = self.canonicalize_url(url)
+            if canonical_url not in self.visited_urls:
+                self.visited_urls.add(canonical_url)
+                yield url
+
+    def _new_search_links(self, response):
+        """
+        (absolute URL, anchor text) of every in-scope, unvisited link in the search_space; marks them visited.
+        """
+        parsed = response.meta.get("parsed")
+        if parsed is None:
+            return self._search_links.links(response, self.visited_urls, anchor_text=True)
+        new = []
+        for abs_url, anchor_text in parsed["links"]:
+            canonical_url = self.canonicalize_url(abs_url)
+            if self._link_scope.allows(canonical_url) and canonical_url not in self.visited_urls:
+                self.visited_urls.add(canonical_url)
+                new.append((abs_url, anchor_text))
+        return new
+
+    def _restore_items(self, spider):
+        # Items scraped before the interruption go through the pipelines (and collectors) again.
+        # Yielding them from start_requests would feed them one per engine heartbeat.
+        for item in self.crawl_store.items():
+            if self.item_dedup is not None:
+                self.item_dedup.restored(item)
+            self.crawler.engine.scraper.start_itemproc(item, response=None)
+
+    def _resume_requests(self):
+        self.logger.info(f"Resuming crawl from {self.crawl_store.path}")
+        for pending_id, url, callback, state, playwright in self.crawl_store.pending():
+            yield self._pending_request(pending_id, url, callback, state, playwright)
+
+    def _pending_request(self, pending_id, url, callback, state, playwright):
+        """
+        Rebuild a request recorded in the crawl store.
+        """
+        if callback == "_parse_followed_page":
+            # Crawl state written before follows were grouped carries a single parent_item.
+            parent_items = state.get("parent_items") or [state["parent_item"]]
+            return self._follow_request(url, state["step_index"], parent_items, pending_id=pending_id)
+        return self._make_request(url, getattr(self, callback), playwright=playwright, pending_id=pending_id, **state)
+
+    def _resume_callback(self, response):
+        # The request only leaves the pending table once its callback has run to completion.
+        yield from getattr(self, response.meta["callback"])(response)
+        self.crawl_store.mark_done(response.meta["pending_id"])
+
+    def _resume_errback(self, failure):
+        self.logger.debug("Request failed: %s", failure.request.url)
+        self.crawl_store.mark_done(failure.request.meta["pending_id"])
+        if failure.request.meta.get("errback"):
+            getattr(self, failure.request.meta["errback"])(failure)
+
+    def _request_dropped(self, request, spider):
+        if "pending_id" in request.meta:
+            self.crawl_store.mark_done(request.meta["pending_id"])
+
+    def _store_item(self, item, response, spider):
+        step = self.item_dedup.step_of(item) if self.item_dedup is not None else None
+        self.crawl_store.add_item(item if step is None else {**item, STEP_FIELD: step})
+
+    def _forget_item_step(self, item, spider, **kwargs):
+        self.item_dedup.step_of(item)
+
+    def closed(self, reason):
+        stats = self.crawler.stats
+        stats.set_value("visited/backend", self.visited_urls.backend)
+        stats.set_value("visited/count", len(self.visited_urls))
+        stats.set_value("visited/memory_bytes", self.visited_urls.memory_bytes())
+        if self.http_cache is not None:
+            self.http_cache.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.ajax_client is not None:
+            self.ajax_client.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.crawl_store is not None:
+            # A finished crawl starts from scratch next time; anything else resumes.
+            if reason == "finished":
+                self.crawl_store.finished()
+            self.crawl_store.close()
+
+    def _search_links_recursive(self, response, depth=0):
+        """
+        Parse a target page and queue the in-scope links of any page. Links
+        are only queued while they stay within max_depth, so no page is
+        fetched just to be thrown away. Depth, parent URL and anchor text
+        travel in the request meta.
+        """
+        is_target = self._is_target_page(response)
+        self.frontier.add_page(response.url, response.meta.get("anchor_text"), is_target)
+        if is_target:
             yield from self.parse_steps(response)
-        search_space = self.pagination.get("search_space")
-        must_contain = self.pagination.get("base_url")
-        if not must_contain:
-            must_contain = list(str(self.start_url).strip("http://").split('/'))[0]
-        if not search_space:
+        if self._search_links is not None and depth < self._max_depth:
+            child_depth = depth + 1
+            for abs_url, anchor_text in self._new_search_links(response):
+                request = self._make_request(
+                    abs_url,
+                    self._search_links_page,
+                    priority=-child_depth,
+                    crawl_depth=child_depth,
+                    parent_url=response.url,
+                    anchor_text=anchor_text,
+                )
+                if self.frontier.best_first:
+                    self.frontier.push(request, abs_url, anchor_text, child_depth)
+                else:
+                    yield request
+        elif depth >= self._max_depth:
+            self.logger.debug("Reached max recursion depth %d at %s", self._max_depth, response.url)
+        yield from self._release_frontier()
+
+    def _release_frontier(self):
+        """
+        Move held best-first requests into the scheduler while it holds fewer
+        than CONCURRENT_REQUESTS, so they are scored as late as possible.
+        """
+        scheduler = self.crawler.engine.slot.scheduler
+        while self.frontier and len(scheduler) < self._frontier_window:
+            yield self.frontier.pop()
+
+    def _drain_frontier(self, spider):
+        # Held requests are invisible to the scheduler; keep the spider open until they are released.
+        if not self.frontier:
             return
-        for parent in _select(response, search_space):
-            for ln in _select(parent, "xpath:.//a/@href"):
-                href = ln.get()
-                if href:
-                    abs_url = response.urljoin(href)
-                    canonical_url = canonicalize_url(abs_url)
-                    if (canonical_url not in self.visited_urls) and (must_contain in canonical_url):
-                        self.visited_urls.add(canonical_url)
-                        yield self._make_request(abs_url, lambda r: self._search_links_recursive(response = r, depth = depth+1, max_depth = self.pagination.get("max_depth", 10)))
+        for request in self._release_frontier():
+            self.crawler.engine.crawl(request)
+        raise DontCloseSpider
+
+    def _search_links_page(self, response):
+        if self.page_parser is not None:
+            self.page_parser.scope(response)
+        yield from self._search_links_recursive(response, depth=response.meta.get("crawl_depth", 0))
+
+    def _is_target_page(self, response):
+        parsed = response.meta.get("parsed")
+        if parsed is not None:
+            return parsed["is_target"]
+        return self._target_selector is None or bool(self._target_selector.nodes(_root(response)))
 
     def handle_pagination(self, response):
+        if self.page_parser is not None:
+            self.page_parser.scope(response)
         content_type = response.headers.get('Content-Type', b'').decode('utf8').lower()
         if "html" not in content_type:
-            self.logger.debug(f"Skipping pagination on non-HTML response: {response.url} with content type: {content_type}")
+            self.logger.debug("Skipping pagination on non-HTML response: %s with content type: %s", response.url, content_type)
             return
 
-        target_page_selector = self.pagination.get("target_page_selector")
-        if (not target_page_selector) or (target_page_selector and _select(response, target_page_selector)):
-            yield from self.parse_steps(response)
         ptype = self.pagination.get("type")
-
-        if ptype == "listed_links":
-            yield from self.parse_steps(response)
-            for url in find_pages(response, self.pagination):
-                abs_url = response.urljoin(url)
-                canonical_url = canonicalize_url(abs_url)
-                if canonical_url not in self.visited_urls:
-                    self.visited_urls.add(canonical_url)
-                    yield self._make_request(abs_url, self.handle_pagination)
-        elif ptype == "search_links":
-            yield from self._search_links_recursive(response, max_depth = self.pagination.get("max_depth", 10))
-        else:
+        if ptype == "search_links":
+            # Parses the page itself if it is a target page.
+            yield from self._search_links_recursive(response)
+            return
+        # Each page is parsed once; Listed_Links has no target selector, so every page is a target.
+        if self._is_target_page(response):
             yield from self.parse_steps(response)
+        if ptype == "listed_links":
+            # Only URLs not yet in visited_urls, which are marked visited.
+            for url in self._new_pages(response):
+                yield self._make_request(url, self.handle_pagination)
 
 
-    def parse_steps(self, response, step_index=0, parent_item=None):
+    def parse_steps(self, response, step_index=0, parent_item=None, replay=True):
         content_type = response.headers.get('Content-Type', b'').decode('utf8').lower()
         if "html" not in content_type:
-            self.logger.debug(f"Skipping non-HTML response: {response.url} with content type: {content_type}")
+            self.logger.debug("Skipping non-HTML response: %s with content type: %s", response.url, content_type)
+            return
+
+        if step_index == 0 and self.page_parser is not None:
+            self.page_parser.scope(response)
+        if replay and step_index == 0 and self.http_cache is not None:
+            yield from self._parse_steps_incremental(response)
             return
     
-        self.logger.debug(f"ATTEMPTING TO PARSE STEP {step_index}")
+        self.logger.debug("ATTEMPTING TO PARSE STEP %d", step_index)
         if step_index >= len(self.steps):
             if parent_item:
                 yield parent_item
@@ -104,14 +476,18 @@ class StepSpider(scrapy.Spider):
 
         step = self.steps[step_index]
         action = step.get("type", "").lower()
-        self.logger.debug(f"ACTION: {action}")
+        self.logger.debug("ACTION: %s", action)
         if action == "find":
-            self.logger.debug(f"FINDING {step['task_name']}")
-            for item in find(response, step):
-                self.logger.debug(f"FOUND ITEM: {item}")
+            self.logger.debug("FINDING %s", step['task_name'])
+            tag = self.item_dedup is not None and step.get("dedup_keys")
+            for item in self._find(response, step):
+                self.logger.debug("FOUND ITEM: %s", item)
+                if tag:
+                    # Carried through Follow merges, so the pipeline keys the item by this step's dedup_keys.
+                    item[STEP_FIELD] = step_index
                 yield from self.parse_steps(response, step_index + 1, item)
         elif action == "dynamicfind":
-            yield from self.dynamic_find(response, step)
+            yield from self.dynamic_find(response, step, step_index)
         elif action == "follow":
             link_field = step.get("link_field")
             if not parent_item or not parent_item.get(link_field):
@@ -120,15 +496,36 @@ class StepSpider(scrapy.Spider):
                 links = parent_item[link_field]
                 if not isinstance(links, list):
                     links = [links]
-                next_steps = step.get("next_steps", [])
                 for url in links:
-                    yield response.follow(
-                        url,
-                        callback=lambda r, s=next_steps, pi=parent_item: self.parse_followed_steps(r, s, pi)
-                    )
+                    yield from self._follow(response.urljoin(url), step_index, parent_item)
         else:
             yield from self.parse_steps(response, step_index + 1, parent_item)
             
+    def _parse_steps_incremental(self, response):
+        """
+        Replay the items recorded for an unchanged page, otherwise run the
+        steps and record their items. Pages whose steps schedule further
+        requests (follow, dynamicfind) are always parsed again.
+        """
+        url = self.canonicalize_url(response.url)
+        if response.meta.get("incremental_unchanged"):
+            items = self.http_cache.items(url)
+            if items is not None:
+                self.crawler.stats.inc_value("incremental/replayed_pages")
+                yield from items
+                return
+        items = []
+        replayable = True
+        for result in self.parse_steps(response, replay=False):
+            if isinstance(result, scrapy.Request):
+                replayable = False
+            elif replayable and result is not None:
+                # A copy: DedupPipeline may take STEP_FIELD out of the item before the page is done.
+                items.append(dict(result))
+            yield result
+        if replayable:
+            self.http_cache.store_items(url, items)
+
     '''def dynamic_find(self, response, step):
         # Extract links (each link should be an AJAX URL parameter containing a course ID)
         links = _select(response, step.get("search_space")).getall()
@@ -144,62 +541,185 @@ class StepSpider(scrapy.Spider):
                 ajax_url = f"{step.get('base_url')}?catoid={step.get('catoid')}&coid={coid}&display_options={encoded_display_options}&show"
                 yield scrapy.Request(url=ajax_url, callback=self.parse_dynamic_course, meta={'step': step})'''
                 
-    def dynamic_find(self, response, step):
+    def dynamic_find(self, response, step, step_index=None):
         # First, extract AJAX course links (each should contain a course ID in its query string)
-        links = _select(response, step.get("search_space")).getall()
-        self.logger.debug(f"DynamicFind: Found {len(links)} course links.")
-        import re
+        plan = step["plan"]
+        root = _root(response)
+        links = plan.search_space.getall(root)
+        self.logger.debug("DynamicFind: Found %d course links.", len(links))
+        # A course listed on several catalog pages is fetched once.
+        seen_coids = self._seen_coids.setdefault(step_index, set())
+        ajax_prefix = f"{step.get('base_url')}?catoid={step.get('catoid')}&coid="
         for link in links:
-            match = re.search(r'coid=(\d+)', link)
-            if match:
-                coid = match.group(1)
-                display_options = 'a:2:{s:8:"~location~";s:8:"~template~";s:28:"~course_program_display_field~";s:0:"";}'
-                from urllib.parse import quote
-                encoded_display_options = quote(display_options)
-                ajax_url = (
-                    f"{step.get('base_url')}?catoid={step.get('catoid')}"
-                    f"&coid={coid}&display_options={encoded_display_options}&show"
-                )
-                yield scrapy.Request(
-                    url=ajax_url,
-                    callback=self.parse_dynamic_course,
-                    meta={'step': step}
-                )
+            match = _COID_RE.search(link)
+            if not match:
+                continue
+            coid = match.group(1)
+            if coid in seen_coids:
+                self.crawler.stats.inc_value("dynamicfind/duplicate_coids")
+                continue
+            seen_coids.add(coid)
+            ajax_url = f"{ajax_prefix}{coid}&display_options={_DISPLAY_OPTIONS}&show"
+            if step.get("direct_fetch") and not self._ajax_client(step).proxied(ajax_url):
+                self._fetch_dynamic_course(ajax_url, step)
+            else:
+                yield self._make_request(ajax_url, self.parse_dynamic_course, playwright=False, step_index=step_index)
 
         # Next, handle pagination if a pagination selector is provided in the step config.
         # (For example, add "pagination_selector": "css_selector_for_pagination_links" in your config.)
-        pagination_selector = step.get("pagination_selector")
-        if pagination_selector:
-            pagination_links = _select(response, pagination_selector)
-            all_page_links = pagination_links.getall() if pagination_links else []
-            self.logger.debug(f"DynamicFind: Found {len(all_page_links)} pagination link(s).")
-            for link in pagination_links:
-                href = link.get()
+        if plan.pagination:
+            all_page_links = plan.pagination.getall(root)
+            self.logger.debug("DynamicFind: Found %d pagination link(s).", len(all_page_links))
+            for href in all_page_links:
                 if href:
                     abs_url = response.urljoin(href)
-                    from .helpers import canonicalize_url  # Ensure canonicalization is imported
-                    canonical_url = canonicalize_url(abs_url)
+                    canonical_url = self.canonicalize_url(abs_url)
                     if canonical_url not in self.visited_urls:
                         self.visited_urls.add(canonical_url)
-                        self.logger.debug(f"DynamicFind: Following pagination URL: {abs_url}")
-                        yield scrapy.Request(
-                            url=abs_url,
-                            callback=lambda r, s=step: self.dynamic_find(r, s)
-                        )
-                
+                        self.logger.debug("DynamicFind: Following pagination URL: %s", abs_url)
+                        yield self._make_request(abs_url, self._dynamic_find_page, playwright=False, step_index=step_index)
+
+    def _dynamic_find_page(self, response):
+        if self.page_parser is not None:
+            self.page_parser.scope(response)
+        step_index = response.meta["step_index"]
+        yield from self.dynamic_find(response, self.steps[step_index], step_index)
+
     def parse_dynamic_course(self, response):
-        step = response.meta.get('step')
-        fields = step.get('fields', {})
-        title_xpath = fields.get('title')
-        desc_xpath = fields.get('description')
-        from .helpers import _extract_text  # Use our helper for text extraction
-        title = _extract_text(response, title_xpath)
-        description = _extract_text(response, desc_xpath)
-        yield {
+        step = self.steps[response.meta["step_index"]]
+        yield self._dynamic_course_item(step, _root(response))
+
+    def _dynamic_course_item(self, step, root):
+        fields = step["plan"].field_map
+        title = fields["title"].extract_text(root) if "title" in fields else None
+        description = fields["description"].extract_text(root) if "description" in fields else None
+        return {
             'title': title if title else "No Title Found",
             'description': description if description else "No Description Found",
         }
 
+    def _fetch_dynamic_course(self, ajax_url, step):
+        """
+        Fetch a course fragment through the AjaxClient instead of a Scrapy
+        request, and hand its item straight to the item pipeline.
+        """
+        if self.archive is not None and self.archive.mode == "replay":
+            stored = self.archive.get(self.canonicalize_url(ajax_url))
+            if stored is None:
+                self.crawler.stats.inc_value("archive/missed")
+                return
+            self.crawler.stats.inc_value("archive/replayed")
+            _response_url, status, headers, body = stored
+            self._dynamic_course_fetched((status, headers.get("Content-Type", [None])[0], body), ajax_url, step)
+            return
+        self._ajax_in_flight += 1
+        d = self._ajax_client(step).fetch(ajax_url)
+        if self.archive is not None:
+            d.addCallback(self._archive_fetched, ajax_url)
+        d.addCallback(self._dynamic_course_fetched, ajax_url, step)
+        d.addErrback(self._dynamic_course_failed, ajax_url)
+        d.addBoth(self._dynamic_course_done)
+
+    def _ajax_client(self, step):
+        if self.ajax_client is None:
+            self.ajax_client = AjaxClient(self.crawler, step.get("max_per_host", 8))
+        return self.ajax_client
+
+    def _archive_fetched(self, result, ajax_url):
+        status, content_type, body = result
+        headers = {"Content-Type": [content_type]} if content_type else {}
+        self.archive.put(self.canonicalize_url(ajax_url), ajax_url, status, headers, body)
+        self.crawler.stats.inc_value("archive/captured")
+        return result
+
+    def _dynamic_course_fetched(self, result, ajax_url, step):
+        status, content_type, body = result
+        if status != 200 or not body.strip():
+            self.logger.debug("DynamicFind: %s returned %s", ajax_url, status)
+            self.crawler.stats.inc_value("dynamicfind/failed")
+            return
+        self.crawler.stats.inc_value("dynamicfind/fetched")
+        # The charset comes from the header, a BOM or a <meta> tag, as for a Scrapy response.
+        _encoding, text = html_to_unicode(content_type, body)
+        item = self._dynamic_course_item(step, etree.fromstring(text.encode("utf8"), parser=_FRAGMENT_PARSER))
+        self.crawler.engine.scraper.start_itemproc(item, response=None)
+
+    def _dynamic_course_failed(self, failure, ajax_url):
+        self.logger.debug("DynamicFind: fetching %s failed: %r", ajax_url, failure.value)
+        self.crawler.stats.inc_value("dynamicfind/failed")
+
+    def _dynamic_course_done(self, _):
+        self._ajax_in_flight -= 1
+
+    def _wait_for_ajax(self, spider):
+        # Direct fetches are invisible to the scheduler; keep the spider open until they finish.
+        if self._ajax_in_flight:
+            raise DontCloseSpider
+
+    def _follow(self, url, step_index, parent_item):
+        """
+        Follow one link of a parent item. Each target is fetched and its
+        next_steps run once: parents linking to a target already in flight
+        wait for that request, and targets fetched recently are answered
+        from the LRU of results.
+        """
+        stats = self.crawler.stats
+        key = (step_index, self.canonicalize_url(url))
+        results = self._follow_results.get(key)
+        if results is not None:
+            self._follow_results.move_to_end(key)
+            stats.inc_value("follow/cache_hits")
+            yield from self._merge_followed(results, [parent_item])
+            return
+        meta = self._follow_waiting.get(key)
+        if meta is not None:
+            meta["parent_items"].append(parent_item)
+            state = {"step_index": step_index, "parent_items": meta["parent_items"]}
+            if "pending_id" not in meta or self.crawl_store.update_pending(meta["pending_id"], state):
+                stats.inc_value("follow/coalesced")
+                return
+            # Another node of a distributed crawl has taken the request already.
+            meta["parent_items"].pop()
+        stats.inc_value("follow/cache_misses")
+        yield self._follow_request(url, step_index, [parent_item])
+
+    def _follow_request(self, url, step_index, parent_items, pending_id=None):
+        # dont_filter: repeated targets are merged here, and a target evicted from the LRU must be fetchable again.
+        request = self._make_request(
+            url, self._parse_followed_page, playwright=False, pending_id=pending_id, errback=self._follow_failed,
+            dont_filter=True, step_index=step_index, parent_items=parent_items,
+        )
+        self._follow_waiting[(step_index, self.canonicalize_url(url))] = request.meta
+        return request
+
+    def _parse_followed_page(self, response):
+        step_index = response.meta["step_index"]
+        if step_index in self.follow_parsers:
+            self.follow_parsers[step_index].scope(response)
+        results = list(self.parse_followed_steps(response, self.steps[step_index].get("next_steps", []), {}))
+        key = self._follow_key(response.request)
+        self._follow_results[key] = results
+        if len(self._follow_results) > self._follow_cache_size:
+            self._follow_results.popitem(last=False)
+        self._follow_waiting.pop(key, None)
+        yield from self._merge_followed(results, response.meta["parent_items"])
+
+    def _follow_failed(self, failure):
+        self._follow_waiting.pop(self._follow_key(failure.request), None)
+        self.crawler.stats.inc_value("follow/failed")
+
+    def _follow_key(self, request):
+        # Keyed by the URL that was followed, not the one it redirected to.
+        url = request.meta.get("redirect_urls", [request.url])[0]
+        return request.meta["step_index"], self.canonicalize_url(url)
+
+    @staticmethod
+    def _merge_followed(results, parent_items):
+        # The merge parse_followed_steps does, with the target's items computed once for every parent.
+        for parent_item in parent_items:
+            for result in results:
+                yield {**parent_item, **result}
+
     def parse_followed_steps(self, response, steps, parent_item):
         if not steps:
             yield parent_item
@@ -207,7 +727,7 @@ class StepSpider(scrapy.Spider):
         step = steps[0]
         action = step.get("type", "").lower()
         if action == "find":
-            for item in find(response, step):
+            for item in self._find(response, step):
                 merged = {**parent_item, **item}
                 yield from self.parse_followed_steps(response, steps[1:], merged)
         else:
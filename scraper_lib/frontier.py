@@ -0,0 +1,159 @@
+# scraper_module/scraper_lib/frontier.py
+import heapq
+import itertools
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+FRONTIER_STRATEGIES = ("bfs", "best_first")
+
+_URL_SPLIT = re.compile(r"[/\-_.,;:+=&?]+")
+_WORDS = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+
+
+def url_tokens(url):
+    """
+    Path segments and query keys of a URL, split on punctuation, lowercased
+    and with digit runs collapsed, so /dept3/courses/page-12.html and
+    /dept7/courses/page-2.html share every token. Bare numbers are dropped;
+    page-N and story-N say nothing about what a page is.
+    """
+    parts = urlsplit(url)
+    keys = "&".join(pair.split("=", 1)[0] for pair in parts.query.split("&"))
+    text = f"{parts.path}?{keys}".lower()
+    return _normalize(_URL_SPLIT.split(text))
+
+
+def text_tokens(text):
+    return _normalize(_WORDS.findall(text.lower())) if text else set()
+
+
+def _normalize(tokens):
+    return {_DIGITS.sub("0", token) for token in tokens if token and not token.isdigit()}
+
+
+class _TokenStats:
+    __slots__ = ("pages", "counts")
+
+    def __init__(self):
+        self.pages = 0
+        self.counts = Counter()
+
+    def add(self, tokens):
+        self.pages += 1
+        self.counts.update(tokens)
+
+    def share(self, token):
+        # Fraction of pages that had the token.
+        return self.counts[token] / self.pages if self.pages else 0.0
+
+
+class Frontier:
+    """
+    Orders the Search_Links frontier. With strategy="bfs" links go straight
+    to the Scrapy scheduler, fetched breadth-first (priority = -depth).
+
+    With "best_first" every fetched page teaches the frontier which URL
+    tokens and anchor words are common on target pages and rare on
+    navigation pages; a link's priority is that contrast, averaged over its
+    tokens, minus its depth. Scrapy fixes a request's priority when it is
+    queued, so best-first links are held here instead and released a few at
+    a time (see StepSpider._release_frontier). After a new target page
+    held links are rescored lazily, as they reach the top of the heap; all
+    of them are rescored when the page count grows by a quarter. Until the
+    first target page, best-first behaves like breadth-first.
+    """
+
+    ANCHOR_WEIGHT = 0.5
+    SCALE = 100  # Scrapy priorities are ints
+    RESCORE_GROWTH = 1.25
+
+    def __init__(self, strategy="bfs"):
+        if strategy not in FRONTIER_STRATEGIES:
+            raise ValueError(f"Unknown frontier strategy '{strategy}'. Expected one of: {', '.join(FRONTIER_STRATEGIES)}")
+        self.best_first = strategy == "best_first"
+        self._target_urls = _TokenStats()
+        self._other_urls = _TokenStats()
+        self._target_anchors = _TokenStats()
+        self._other_anchors = _TokenStats()
+        # Held links: (-priority, seq, request, url, anchor_text, depth, scored_at)
+        self._heap = []
+        self._seq = itertools.count()
+        self._rescored_pages = 0  # Page count at the last full rescore
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def targets(self):
+        return self._target_urls.pages
+
+    @property
+    def pages(self):
+        return self._target_urls.pages + self._other_urls.pages
+
+    def add_page(self, url, anchor_text, is_target):
+        """
+        Learn from a fetched page: its URL and the anchor text of the link that led to it.
+        """
+        if is_target:
+            self._target_urls.add(url_tokens(url))
+            self._target_anchors.add(text_tokens(anchor_text))
+        else:
+            self._other_urls.add(url_tokens(url))
+            self._other_anchors.add(text_tokens(anchor_text))
+
+    @staticmethod
+    def _contrast(tokens, target, other):
+        if not tokens:
+            return 0.0
+        return sum(target.share(t) - other.share(t) for t in tokens) / len(tokens)
+
+    def score(self, url, anchor_text=None):
+        """
+        How much a link looks like the target pages seen so far, roughly -1..1.
+        """
+        if not self.targets:
+            return 0.0
+        url_score = self._contrast(url_tokens(url), self._target_urls, self._other_urls)
+        anchor_score = self._contrast(text_tokens(anchor_text), self._target_anchors, self._other_anchors)
+        return url_score + self.ANCHOR_WEIGHT * anchor_score
+
+    def priority(self, url, anchor_text, depth):
+        if not self.best_first:
+            return -depth
+        return round(self.SCALE * self.score(url, anchor_text)) - depth
+
+    def push(self, request, url, anchor_text, depth):
+        """
+        Hold a best-first request until pop() releases it.
+        """
+        priority = self.priority(url, anchor_text, depth)
+        heapq.heappush(self._heap, (-priority, next(self._seq), request, url, anchor_text, depth, self.targets))
+
+    def pop(self):
+        """
+        The held request with the highest priority (set on the request), or None.
+        """
+        if not self._heap:
+            return None
+        if self.pages >= self._rescored_pages * self.RESCORE_GROWTH and self.pages > self._rescored_pages:
+            self._rescore()
+        # Rescore links scored before the latest target pages until the top one is current;
+        # each link is rescored at most once per new target.
+        while self._heap[0][6] != self.targets:
+            _, seq, request, url, anchor_text, depth, _ = self._heap[0]
+            priority = self.priority(url, anchor_text, depth)
+            heapq.heapreplace(self._heap, (-priority, seq, request, url, anchor_text, depth, self.targets))
+        priority, _, request, *_ = heapq.heappop(self._heap)
+        request.priority = -priority
+        return request
+
+    def _rescore(self):
+        self._rescored_pages = self.pages
+        self._heap = [
+            (-self.priority(url, anchor_text, depth), seq, request, url, anchor_text, depth, self.targets)
+            for _, seq, request, url, anchor_text, depth, _ in self._heap
+        ]
+        heapq.heapify(self._heap)
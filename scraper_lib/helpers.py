@@ -1,46 +1,195 @@
 # scraper_module/scraper_lib/helpers.py
 from parsel import Selector
-from urllib.parse import urlparse, urlunparse
+from parsel.csstranslator import HTMLTranslator
+from lxml import etree
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from scrapy.utils.response import get_base_url
 import logging
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
-def _select(selector_or_response, selector_str):
+# Same extra namespace parsel registers, so "re:test(...)" keeps working in compiled XPath.
+_XPATH_NAMESPACES = {"re": "http://exslt.org/regular-expressions"}
+_css_translator = HTMLTranslator()
+_STRING_LITERALS = re.compile(r'"[^"]*"|\'[^\']*\'')
+# Axes that can leave the row a field is evaluated from.
+_NON_LOCAL_AXES = re.compile(r"\.\.|\b(?:ancestor|ancestor-or-self|parent|preceding|preceding-sibling|following|following-sibling)::")
+# Only text and attribute results can be batched: they can never be mistaken for a row element.
+_STRING_RESULT = re.compile(r"(?:text\(\)|@[\w:.*-]+|attribute::[\w:.*-]+)(?:\[[^\[\]]*\])*$")
+# libxml2's node-set merging is quadratic in the size of the result, so batched
+# fields are evaluated over chunks of rows rather than the whole container.
+_BATCH_ROWS = 256
+
+
+class CompiledSelector:
     """
-    Select elements using either XPath or CSS.
-    If the selector_str starts with 'xpath:', use XPath; otherwise, assume CSS.
+    A selector string resolved once: the 'xpath:' prefix and 'join' suffix are
+    stripped, CSS is translated to XPath and the expression is compiled by lxml.
+    It is evaluated directly against lxml nodes.
     """
-    if selector_str.startswith("xpath:"):
-        expr = selector_str.replace("xpath:", "")
-        try:
-            return selector_or_response.xpath(expr)
-        except Exception as e:
-            logger.error(f"XPath expression failed: {expr}. Error: {e}")
-            raise
-    else:
+    __slots__ = ("selector_str", "expr", "join", "_xpath")
+
+    def __init__(self, selector_str):
+        self.selector_str = selector_str
+        self.join = selector_str.endswith("join")
+        raw = selector_str[:-len("join")] if self.join else selector_str
+        if raw.startswith("xpath:"):
+            self.expr = raw[len("xpath:"):]
+        else:
+            try:
+                self.expr = _css_translator.css_to_xpath(raw)
+            except Exception as e:
+                logger.error(f"CSS selector failed: {raw}. Error: {e}")
+                raise
         try:
-            return selector_or_response.css(selector_str)
+            self._xpath = etree.XPath(self.expr, namespaces=_XPATH_NAMESPACES, smart_strings=False)
         except Exception as e:
-            logger.error(f"CSS selector failed: {selector_str}. Error: {e}")
+            logger.error(f"XPath expression failed: {self.expr}. Error: {e}")
             raise
 
+    def nodes(self, node):
+        """
+        Evaluate against an lxml node and return the raw results as a list.
+        """
+        result = self._xpath(node)
+        return result if isinstance(result, list) else [result]
+
+    def getall(self, node):
+        """
+        Same strings parsel's SelectorList.getall() would return.
+        """
+        return [_node_text(r) for r in self.nodes(node)]
+
+    def extract_text(self, node):
+        """
+        Extract text from the first match or join all matches if 'join' is appended.
+        """
+        return _collapse(self.getall(node), self.join)
+
+
+def _collapse(raw_matches, join):
+    matches = [m for m in map(str.strip, raw_matches) if m]
+    if join:
+        return " ".join(matches)
+    if not matches:
+        return None
+    return matches[0] if len(matches) == 1 else matches
+
+
+def _compile_batched(repeating, field):
+    """
+    Compile "$rows | $rows/field" so a field is evaluated for many rows in one
+    call instead of once per row. The rows are passed in as an XPath variable;
+    since the result is in document order, each row is immediately followed
+    by its own matches. Returns None when the field can't be evaluated that
+    way (element results, unions, absolute paths, function results or axes
+    that leave the row).
+    """
+    expr = _STRING_LITERALS.sub('""', field.expr).strip()
+    if expr.startswith("/") or "|" in expr or _NON_LOCAL_AXES.search(expr) or not _STRING_RESULT.search(expr):
+        return None
+    try:
+        return etree.XPath(f"$rows | $rows/{field.expr}", namespaces=_XPATH_NAMESPACES, smart_strings=False)
+    except etree.XPathSyntaxError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def compile_selector(selector_str):
+    """
+    Return the CompiledSelector for a selector string, compiling it only once.
+    """
+    return CompiledSelector(selector_str)
+
+
+class StepPlan:
+    """
+    The compiled selectors of a Find, Follow or DynamicFind step.
+    """
+    __slots__ = ("search_space", "repeating", "fields", "field_map", "required_fields", "pagination", "batched_fields")
+
+    def __init__(self, step):
+        search_space = step.get("search_space")
+        repeating_selector = step.get("repeating_selector")
+        pagination_selector = step.get("pagination_selector")
+        self.search_space = compile_selector(search_space) if search_space else None
+        self.repeating = compile_selector(repeating_selector) if repeating_selector else None
+        self.pagination = compile_selector(pagination_selector) if pagination_selector else None
+        fields = step.get("fields") or {}
+        self.fields = tuple((name, compile_selector(sel)) for name, sel in fields.items())
+        self.field_map = dict(self.fields)
+        num_required = step.get("num_required", 0) or 0
+        self.required_fields = tuple(list(fields.keys())[:num_required]) if num_required > 0 else ()
+        # (name, selector, batched XPath or None) for Find steps with batched=True.
+        self.batched_fields = None
+        if step.get("batched") and self.repeating:
+            self.batched_fields = tuple(
+                (name, selector, _compile_batched(self.repeating, selector)) for name, selector in self.fields
+            )
+
+
+def compile_steps(steps):
+    """
+    Return copies of the step dicts with a StepPlan attached under 'plan',
+    so selector strings are parsed once per spider instead of once per row.
+    """
+    compiled = []
+    for step in steps:
+        step = dict(step)
+        if step.get("next_steps"):
+            step["next_steps"] = compile_steps(step["next_steps"])
+        step["plan"] = StepPlan(step)
+        compiled.append(step)
+    return compiled
+
+
+def _plan(step):
+    return step.get("plan") or StepPlan(step)
+
+
+def _root(selector_or_response):
+    """
+    Return the lxml root of a Response, parsel Selector or lxml node.
+    """
+    if isinstance(selector_or_response, etree._Element):
+        return selector_or_response
+    return getattr(selector_or_response, "selector", selector_or_response).root
+
+
+def _node_text(result):
+    # Mirrors parsel's Selector.get() for element, string and scalar results.
+    if isinstance(result, str):
+        return result
+    if isinstance(result, etree._Element):
+        return etree.tostring(result, method="html", encoding="unicode", with_tail=False)
+    if result is True:
+        return "1"
+    if result is False:
+        return "0"
+    return str(result)
+
+
+def _select(selector_or_response, selector_str):
+    """
+    Select elements using either XPath or CSS.
+    If the selector_str starts with 'xpath:', use XPath; otherwise, assume CSS.
+    """
+    return selector_or_response.xpath(compile_selector(selector_str).expr)
+
 def _extract_text(selector_or_response, selector_str):
     """
     Extract text from the first match or join all matches if 'join' is appended.
     """
-    if selector_str.endswith("join"):
-        raw_matches = _select(selector_or_response, selector_str.replace("join", "")).getall()
-        return " ".join(m.strip() for m in raw_matches if m.strip())
-    else:
-        raw_matches = _select(selector_or_response, selector_str).getall()
-        matches = [m.strip() for m in raw_matches if m.strip()]
-        if not matches:
-            return None
-        return matches[0] if len(matches) == 1 else matches
+    return compile_selector(selector_str).extract_text(_root(selector_or_response))
 
-def find_pages(selector_or_response, step):
+def pagination_extractor(step, canonicalize=None):
     """
-    Given a pagination step definition, yield each found pagination URL.
+    The LinkExtractor for a pagination step's links, or None if the step
+    lacks a search_space or link_selector. Keep it for the whole crawl, so
+    its resolution cache carries over between pages.
     """
     search_space = step.get("search_space")
     if not ("href" in str(step.get("link_selector"))):
@@ -48,54 +197,272 @@ def find_pages(selector_or_response, step):
     else:
         link_selector = step.get("link_selector")
     if not (search_space and link_selector):
+        return None
+    return LinkExtractor(search_space, link_selector, canonicalize=canonicalize or canonicalize_url)
+
+
+def find_pages(selector_or_response, step, seen=None, canonicalize=None, extractor=None):
+    """
+    Given a pagination step definition, yield each found pagination URL.
+    'seen' may be a visited set (see visited.py) shared across pages; URLs
+    already in it are skipped and new ones are added, keyed by 'canonicalize'
+    (canonicalize_url by default). 'extractor' is the step's
+    pagination_extractor, if the caller keeps one.
+    """
+    if extractor is None:
+        extractor = pagination_extractor(step, canonicalize)
+    if extractor is None:
         logger.debug("Pagination step missing search_space or link_selector.")
         return []
-    seen_urls = set()
-    for node in _select(selector_or_response, search_space):
-        for ln in _select(node, link_selector):
-            href = ln.get()
-            if href:
-                abs_url = selector_or_response.urljoin(href)
-                canonical_url = canonicalize_url(abs_url)
-                if canonical_url not in seen_urls:
-                    seen_urls.add(canonical_url)
-                    logger.debug(f"Found pagination URL: {canonical_url}")
-                    yield abs_url
+    for abs_url, _anchor_text in extractor.links(selector_or_response, seen):
+        logger.debug("Found pagination URL: %s", abs_url)
+        yield abs_url
 
 
-def find(selector_or_response, step):
+def find(selector_or_response, step, timings=None):
     """
     Given a 'find' step definition, yield dictionaries representing items.
+    'timings' may be an Instrumentation that each selector's time is added to.
     """
+    plan = _plan(step)
     search_space = step.get("search_space")
-    repeating_selector = step.get("repeating_selector")
-    fields = step.get("fields", {})
-    parents = _select(selector_or_response, search_space) if search_space else [selector_or_response]
-    logger.debug(f"Found {len(parents)} parent(s) using search_space: {search_space}")
+    root = _root(selector_or_response)
+    start = time.perf_counter() if timings is not None else 0.0
+    parents = plan.search_space.nodes(root) if plan.search_space else [root]
+    if timings is not None and plan.search_space:
+        timings.add("selector", search_space, time.perf_counter() - start, len(parents))
+    logger.debug("Found %d parent(s) using search_space: %s", len(parents), search_space)
     if not parents:
-        logger.debug(f"No parents found in {selector_or_response.url} using search_space: {search_space}")
+        logger.debug("No parents found in %s using search_space: %s", getattr(selector_or_response, 'url', None), search_space)
 
-    num_required = step.get("num_required", 0)
-    required_fields = list(fields.keys())[:num_required] if num_required > 0 else []
+    fields = plan.fields
+    required_fields = plan.required_fields
+    # Optionally add source URL if available
+    source = selector_or_response.request.url if hasattr(selector_or_response, "request") else None
     for p in parents:
-        for row in _select(p, repeating_selector):
-            item = {field: _extract_text(row, selector) for field, selector in fields.items()}
+        if plan.batched_fields:
+            rows_items = _extract_batched(plan, p, timings)
+        elif timings is not None:
+            rows_items = _extract_timed(plan, p, timings)
+        else:
+            rows_items = ({field: selector.extract_text(row) for field, selector in fields} for row in plan.repeating.nodes(p))
+        for item in rows_items:
             if required_fields and any(not item.get(req) for req in required_fields):
-                logger.debug(f"Skipping item due to missing required fields: {item}")
+                logger.debug("Skipping item due to missing required fields: %s", item)
                 continue
-            # Optionally add source URL if available
-            if hasattr(selector_or_response, "request"):
-                item["source"] = selector_or_response.request.url
+            if source is not None:
+                item["source"] = source
             yield item
 
-def canonicalize_url(url):
+def _extract_timed(plan, parent, timings):
+    """
+    The per-row extraction of find(), timing the repeating selector and each field selector.
+    """
+    start = time.perf_counter()
+    rows = plan.repeating.nodes(parent)
+    timings.add("selector", plan.repeating.selector_str, time.perf_counter() - start, len(rows))
+    spent = [0.0] * len(plan.fields)
+    items = []
+    for row in rows:
+        item = {}
+        for i, (field, selector) in enumerate(plan.fields):
+            start = time.perf_counter()
+            item[field] = selector.extract_text(row)
+            spent[i] += time.perf_counter() - start
+        items.append(item)
+    for (_field, selector), seconds in zip(plan.fields, spent):
+        timings.add("selector", selector.selector_str, seconds, len(rows))
+    return items
+
+def _extract_batched(plan, parent, timings=None):
+    """
+    Build the items of every row under one search_space container, evaluating
+    each field over chunks of rows in a single XPath call and assembling the
+    items column by column. Produces the same dicts as calling extract_text
+    per row.
+    """
+    start = time.perf_counter() if timings is not None else 0.0
+    rows = plan.repeating.nodes(parent)
+    if timings is not None:
+        timings.add("selector", plan.repeating.selector_str, time.perf_counter() - start, len(rows))
+    row_index = {row: i for i, row in enumerate(rows)}
+    # Nested rows would share matches, which only the per-row path handles correctly.
+    for row in rows:
+        for ancestor in row.iterancestors():
+            if ancestor in row_index:
+                return [{field: selector.extract_text(r) for field, selector in plan.fields} for r in rows]
+            if ancestor is parent:
+                break
+
+    columns = {}
+    for field, selector, batched in plan.batched_fields:
+        start = time.perf_counter() if timings is not None else 0.0
+        if batched is None:
+            columns[field] = [selector.extract_text(row) for row in rows]
+        else:
+            columns[field] = _batched_column(parent, rows, row_index, selector, batched)
+        if timings is not None:
+            timings.add("selector", selector.selector_str, time.perf_counter() - start, len(rows))
+
+    return [{field: columns[field][i] for field, _selector in plan.fields} for i in range(len(rows))]
+
+
+def _batched_column(parent, rows, row_index, selector, batched):
+    per_row = [[] for _ in rows]
+    current = None
+    for start in range(0, len(rows), _BATCH_ROWS):
+        for match in batched(parent, rows=rows[start:start + _BATCH_ROWS]):
+            if isinstance(match, str):
+                current.append(match)
+            else:
+                current = per_row[row_index[match]]
+    return [_collapse(matches, selector.join) for matches in per_row]
+
+
+# Query parameters that only track where a click came from; a trailing * matches a prefix.
+DEFAULT_TRACKING_PARAMS = ("utm_*", "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl", "igshid")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class UrlCanonicalizer:
+    """
+    Maps URLs to the key they are de-duplicated under: lowercased scheme and
+    host, no default port, no trailing slash on the path, query parameters
+    sorted with tracking parameters dropped, and no fragment (except "#!" and
+    "#/" client-side routes). Results are memoized in a bounded LRU cache,
+    since the same menu and pager links turn up on every page.
+    """
+
+    def __init__(self, tracking_params=DEFAULT_TRACKING_PARAMS, cache_size=65536):
+        tracking_params = tuple(tracking_params or ())
+        self._drop = frozenset(p for p in tracking_params if not p.endswith("*"))
+        self._drop_prefixes = tuple(p[:-1] for p in tracking_params if p.endswith("*"))
+        self._cached = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def __call__(self, url):
+        return self._cached(url)
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+    def _keep(self, pair):
+        key = pair.split("=", 1)[0]
+        return key not in self._drop and not key.startswith(self._drop_prefixes)
+
+    def _canonicalize(self, url):
+        scheme, netloc, path, query, fragment = urlsplit(url)
+        scheme = scheme.lower()
+        netloc = netloc.lower()
+        if ":" in netloc:
+            host, _, port = netloc.rpartition(":")
+            if port == str(_DEFAULT_PORTS.get(scheme)) or not port:
+                netloc = host
+        # Normalize the path: remove trailing slash if not the root
+        path = path.rstrip("/") or "/"
+        if query:
+            query = "&".join(sorted(pair for pair in query.split("&") if pair and self._keep(pair)))
+        if fragment[:1] not in ("!", "/"):
+            fragment = ""
+        return urlunsplit((scheme, netloc, path, query, fragment))
+
+
+canonicalize_url = UrlCanonicalizer()
+
+
+class LinkScope:
     """
-    Returns a canonical form of the URL by normalizing the path.
-    For example, removes a trailing slash (unless the path is just '/').
+    Which links a Search_Links crawl may follow, resolved once from base_url
+    (a host or URL prefix, e.g. "umd.edu" or "https://catalog.umd.edu/courses")
+    or, failing that, from the host of the start_url. A link is in scope if
+    it is http(s), on that host or one of its subdomains, and under the
+    base_url path.
     """
-    parsed = urlparse(url)
-    # Normalize the path: remove trailing slash if not the root
-    path = parsed.path.rstrip('/')
-    if not path:
-        path = '/'
-    return urlunparse((parsed.scheme, parsed.netloc, path, parsed.params, parsed.query, parsed.fragment))
\ No newline at end of file
+    __slots__ = ("host", "path_prefix")
+
+    def __init__(self, start_url, base_url=None):
+        scope = urlsplit(base_url if "//" in (base_url or "//") else f"//{base_url}") if base_url else urlsplit(start_url)
+        self.host = (scope.hostname or "").lower()
+        self.path_prefix = scope.path.rstrip("/") if base_url else ""
+
+    def allows(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+        host = parts.hostname or ""
+        if host != self.host and not host.endswith(f".{self.host}"):
+            return False
+        return not self.path_prefix or parts.path == self.path_prefix or parts.path.startswith(f"{self.path_prefix}/")
+
+
+# An href with its own scheme and host, which resolves the same against any base with that scheme.
+_ABSOLUTE_HREF = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://")
+
+
+class LinkExtractor:
+    """
+    Gets the new links of a page in one pass over the anchors of its link
+    containers ('search_space' matches). With no link_selector every
+    <a href> below a container is taken, walking the tree with lxml's
+    iterator instead of an XPath per container; otherwise the link_selector
+    is evaluated per container (its matches are the hrefs).
+
+    Each href is resolved, canonicalized and checked against the optional
+    LinkScope once. The result is cached by (base, href). Absolute and
+    root-relative hrefs are keyed by the page's scheme or origin, so menu
+    links shared by every page are only worked out for the first one. Links
+    whose canonical URL is already in 'seen' are dropped before any request
+    is built. Anchor text is only read for the links that are new.
+    """
+
+    def __init__(self, search_space, link_selector=None, scope=None, canonicalize=None, cache_size=65536):
+        self.search_space = compile_selector(search_space)
+        self.link_selector = compile_selector(link_selector) if link_selector else None
+        self.scope = scope
+        self.canonicalize = canonicalize or canonicalize_url
+        self._resolve = lru_cache(maxsize=cache_size)(self._resolve_uncached)
+
+    def _resolve_uncached(self, base, href):
+        abs_url = urljoin(base, href)
+        canonical_url = self.canonicalize(abs_url)
+        if self.scope is not None and not self.scope.allows(canonical_url):
+            return abs_url, None
+        return abs_url, canonical_url
+
+    def _hrefs(self, root):
+        # (href, anchor element or None) in document order
+        for container in self.search_space.nodes(root):
+            if self.link_selector is not None:
+                for href in self.link_selector.getall(container):
+                    if href:
+                        yield href, None
+                continue
+            for anchor in container.iterdescendants("a"):
+                href = anchor.get("href")
+                if href:
+                    yield href, anchor
+
+    def links(self, response, seen=None, anchor_text=False):
+        """
+        (absolute URL, anchor text or None) of each in-scope link whose
+        canonical URL is not in 'seen' (a visited set, see visited.py), once
+        per page; their canonical URLs are added to 'seen'.
+        """
+        base = get_base_url(response) if hasattr(response, "text") else response.url
+        parts = urlsplit(base)
+        scheme_base, origin = f"{parts.scheme}:", f"{parts.scheme}://{parts.netloc}"
+        seen = set() if seen is None else seen
+        resolve = self._resolve
+        new = []
+        for href, anchor in self._hrefs(_root(response)):
+            if _ABSOLUTE_HREF.match(href) or href.startswith("//"):
+                key = scheme_base
+            elif href.startswith("/"):
+                key = origin
+            else:
+                key = base
+            abs_url, canonical_url = resolve(key, href)
+            if canonical_url is None or canonical_url in seen:
+                continue
+            seen.add(canonical_url)
+            new.append((abs_url, anchor.text_content().strip() if anchor_text and anchor is not None else None))
+        return new
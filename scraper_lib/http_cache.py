@@ -0,0 +1,113 @@
+# scraper_module/scraper_lib/http_cache.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def steps_fingerprint(steps, tagged=False):
+    """
+    Hash of the step configs that produce a page's items; 'tagged' is whether
+    items carry the dedup STEP_FIELD. Items stored under another fingerprint
+    are not replayed.
+    """
+    config = json.dumps({"steps": steps, "tagged": tagged}, sort_keys=True, default=str)
+    return hashlib.blake2b(config.encode("utf8"), digest_size=16).hexdigest()
+
+
+class HttpCacheStore:
+    """
+    Per-engine SQLite cache for incremental re-crawls. For each canonical URL
+    it keeps the validators (ETag / Last-Modified), a hash and compressed copy
+    of the last body, and the items the parse_steps pipeline produced from it
+    with the steps_fingerprint of the config that produced them.
+    """
+
+    def __init__(self, name, cache_dir="./http_cache", fingerprint=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}.sqlite3")
+        self.fingerprint = fingerprint
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                hash TEXT NOT NULL,
+                body BLOB NOT NULL,
+                items TEXT,
+                items_fingerprint TEXT
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}
+        if "items_fingerprint" not in columns:
+            # Caches written before the fingerprint was kept; their items are never replayed.
+            self.conn.execute("ALTER TABLE pages ADD COLUMN items_fingerprint TEXT")
+
+    def validators(self, url):
+        """
+        Return (etag, last_modified, hash) for a cached URL, or None.
+        """
+        return self.conn.execute("SELECT etag, last_modified, hash FROM pages WHERE url = ?", (url,)).fetchone()
+
+    def body(self, url):
+        """
+        Return (content_type, body) of the cached copy of a URL, or None.
+        """
+        row = self.conn.execute("SELECT content_type, body FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return row[0], zlib.decompress(row[1])
+
+    def store_page(self, url, etag, last_modified, content_type, body_hash, body):
+        # A changed body invalidates the items extracted from the old one.
+        self.conn.execute(
+            """
+            INSERT INTO pages (url, etag, last_modified, content_type, hash, body, items)
+            VALUES (?, ?, ?, ?, ?, ?, NULL)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_type = excluded.content_type,
+                items = CASE WHEN pages.hash = excluded.hash THEN pages.items ELSE NULL END,
+                hash = excluded.hash,
+                body = excluded.body
+            """,
+            (url, etag, last_modified, content_type, body_hash, zlib.compress(body)),
+        )
+
+    def touch(self, url, etag, last_modified):
+        """
+        Refresh the validators of a page whose body did not change.
+        """
+        self.conn.execute("UPDATE pages SET etag = ?, last_modified = ? WHERE url = ?", (etag, last_modified, url))
+
+    def items(self, url):
+        """
+        Items recorded for a URL, or None if there are none to replay, or
+        they were produced by a different steps config.
+        """
+        row = self.conn.execute("SELECT items, items_fingerprint FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or row[0] is None or row[1] != self.fingerprint:
+            return None
+        return json.loads(row[0])
+
+    def store_items(self, url, items):
+        self.conn.execute(
+            "UPDATE pages SET items = ?, items_fingerprint = ? WHERE url = ?",
+            (json.dumps([dict(item) for item in items], ensure_ascii=False), self.fingerprint, url),
+        )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,131 @@
+# scraper_module/scraper_lib/instrumentation.py
+import json
+import logging
+import re
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("cprofile", "pyinstrument")
+_METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]+")
+
+
+class Instrumentation:
+    """
+    Where a StepSpider's time goes: seconds and counts per Find step, per
+    selector, per callback and per crawl phase (queued, download, parse).
+    Spiders without it hold None, so the hot path only pays for an
+    "is not None" check. Optionally profiles the parse of the first page
+    whose URL contains profile_page.
+
+    Selectors evaluated in a parse pool (parse_workers) are not timed
+    individually; the pool's wall time is recorded as phase "pool_parse".
+    """
+
+    def __init__(self, name, profile_page=None, profiler="cprofile", profile_dir="./profiles"):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}'. Expected one of: {', '.join(PROFILERS)}")
+        self.name = name
+        self.profile_page = profile_page
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        # (kind, name) -> [calls, count, seconds]
+        self.timings = {}
+        self.started = time.perf_counter()
+
+    def add(self, kind, name, seconds, count=1):
+        """
+        Record one call that took 'seconds' and handled 'count' things (rows, items, bytes).
+        """
+        entry = self.timings.get((kind, name))
+        if entry is None:
+            entry = self.timings[(kind, name)] = [0, 0, 0.0]
+        entry[0] += 1
+        entry[1] += count
+        entry[2] += seconds
+
+    def wants_profile(self, url):
+        return self.profile_page is not None and self.profile_page in url
+
+    def profile(self, func, url):
+        """
+        Run func() under the configured profiler, write the report to
+        profile_dir and return func's result. Only the first matching page
+        is profiled.
+        """
+        self.profile_page = None
+        Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return func()
+            finally:
+                profiler.stop()
+                path = Path(self.profile_dir) / f"{self.name}.html"
+                path.write_text(profiler.output_html(), encoding="utf8")
+                logger.info(f"Wrote pyinstrument profile of {url} to {path}")
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            path = Path(self.profile_dir) / f"{self.name}.prof"
+            profiler.dump_stats(str(path))
+            logger.info(f"Wrote cProfile profile of {url} to {path} (view with `python -m pstats {path}`)")
+
+    def summary(self, stats):
+        """
+        Flat 'timing/<kind>/<name>/{calls,count,seconds}' entries, plus
+        pages/sec and bytes/sec over the crawl, for the Scrapy stats.
+        """
+        elapsed = time.perf_counter() - self.started
+        summary = {}
+        for (kind, name), (calls, count, seconds) in self.timings.items():
+            summary[f"timing/{kind}/{name}/calls"] = calls
+            summary[f"timing/{kind}/{name}/count"] = count
+            summary[f"timing/{kind}/{name}/seconds"] = round(seconds, 6)
+        summary["timing/elapsed_seconds"] = round(elapsed, 3)
+        if elapsed > 0:
+            summary["timing/pages_per_sec"] = round(stats.get("response_received_count", 0) / elapsed, 2)
+            summary["timing/bytes_per_sec"] = round(stats.get("downloader/response_bytes", 0) / elapsed, 1)
+        return summary
+
+
+def dump_stats(path, name, stats):
+    """
+    Write a crawl's stats to path: Prometheus text exposition format if it
+    ends in .prom, JSON otherwise. Numeric stats only for Prometheus.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".prom":
+        path.write_text(_prometheus(name, stats), encoding="utf8")
+    else:
+        with open(path, "w", encoding="utf8") as f:
+            json.dump({"spider": name, "stats": stats}, f, indent=2, default=str)
+    logger.info(f"Wrote crawl stats to {path}")
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus(name, stats):
+    lines = []
+    spider = f'spider="{_label(name)}"'
+    for key, value in sorted(stats.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key.startswith("timing/") and key.count("/") >= 3:
+            # timing/<kind>/<name>/<field>; the name (a selector, step or phase) becomes a label.
+            _, kind, rest = key.split("/", 2)
+            label, field = rest.rsplit("/", 1)
+            metric = f"scraper_{_METRIC_NAME.sub('_', kind)}_{field}"
+            lines.append(f'{metric}{{{spider},name="{_label(label)}"}} {value}')
+        else:
+            metric = f"scraper_{_METRIC_NAME.sub('_', key).strip('_')}"
+            lines.append(f"{metric}{{{spider}}} {value}")
+    return "\n".join(lines) + "\n"
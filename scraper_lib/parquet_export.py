@@ -0,0 +1,117 @@
+# scraper_module/scraper_lib/parquet_export.py
+import logging
+import os
+from scrapy.exporters import BaseItemExporter
+from .helpers import compile_selector
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for Parquet output
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet output requires the 'pyarrow' package")
+
+
+def _step_fields(steps):
+    for step in steps:
+        yield from (step.get("fields") or {}).items()
+        yield from _step_fields(step.get("next_steps") or [])
+
+
+def item_schema(steps):
+    """
+    Arrow schema of the items the steps produce: one column per field of every
+    Find/Follow/DynamicFind step, plus "source". Fields whose selector ends in
+    "join" are always a single string; the others can match several times
+    and become list<string> columns.
+    """
+    _require_pyarrow()
+    columns = {}
+    for field, selector in _step_fields(steps):
+        columns[field] = pa.string() if compile_selector(selector).join else pa.list_(pa.string())
+    columns.setdefault("source", pa.string())
+    return pa.schema(list(columns.items()))
+
+
+def _as_list(value):
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
+
+class ParquetSink:
+    """
+    Writes items to a Parquet file in record batches of batch_size rows, so
+    at most one batch is held in memory. 'where' is a path or a binary file
+    object. Keys missing from the schema are dropped.
+    """
+
+    def __init__(self, where, schema, batch_size=1024):
+        _require_pyarrow()
+        if isinstance(where, str) and os.path.dirname(where):
+            os.makedirs(os.path.dirname(where), exist_ok=True)
+        self.path = where if isinstance(where, str) else getattr(where, "name", None)
+        self.schema = schema
+        self.batch_size = batch_size
+        self.count = 0
+        self._names = set(schema.names)
+        self._list_columns = {f.name for f in schema if pa.types.is_list(f.type)}
+        self._rows = []
+        self._dropped = set()
+        self._writer = pq.ParquetWriter(where, schema)
+
+    def write(self, item):
+        self._rows.append(item)
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        columns = []
+        for name in self.schema.names:
+            values = [row.get(name) for row in self._rows]
+            if name in self._list_columns:
+                values = [_as_list(v) for v in values]
+            columns.append(values)
+        for row in self._rows:
+            self._dropped.update(key for key in row if key not in self._names)
+        self._writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=f.type) for values, f in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        self._rows = []
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+        if self._dropped:
+            logger.warning(f"Fields not in the Parquet schema were dropped: {', '.join(sorted(self._dropped))}")
+        logger.info(f"Wrote {self.count} items to {self.path}")
+
+
+class ParquetItemExporter(BaseItemExporter):
+    """
+    Feed exporter for FEEDS entries with format "parquet". The schema comes
+    from the engine's steps, passed as item_export_kwargs {"steps": ...}.
+    """
+
+    def __init__(self, file, steps=(), batch_size=1024, **kwargs):
+        super().__init__(dont_fail=True, **kwargs)
+        self.sink = ParquetSink(file, item_schema(steps), batch_size=batch_size)
+
+    def export_item(self, item):
+        self.sink.write(dict(item))
+
+    def finish_exporting(self):
+        self.sink.close()
@@ -0,0 +1,119 @@
+# scraper_module/scraper_lib/parse_pool.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from scrapy.http import HtmlResponse, Request
+from twisted.internet import threads
+from twisted.python.threadpool import ThreadPool
+from .helpers import LinkExtractor, compile_steps, compile_selector, find, find_pages, pagination_extractor, _root
+from .scoped_parse import scoped_parsers
+
+PARSE_MODES = ("thread", "process")
+
+# Set once per worker process by _init_worker.
+_worker_parser = None
+
+
+def _strip_plans(steps):
+    # StepPlans hold compiled XPath objects, which can't be pickled; workers compile their own.
+    stripped = []
+    for step in steps:
+        step = {key: value for key, value in step.items() if key != "plan"}
+        if step.get("next_steps"):
+            step["next_steps"] = _strip_plans(step["next_steps"])
+        stripped.append(step)
+    return stripped
+
+
+class PageParser:
+    """
+    Everything StepSpider extracts from a page, as a plain function of the
+    response body: the items of each Find step, whether it is a target page,
+    and the pagination links found on it. Runs on any thread or process.
+    """
+
+    def __init__(self, steps, pagination, scoped_parse=False):
+        self.steps = steps
+        self.pagination = pagination or {}
+        self.page_parser, self.follow_parsers = scoped_parsers(steps, pagination) if scoped_parse else (None, {})
+        target_page_selector = self.pagination.get("target_page_selector")
+        self.target_selector = compile_selector(target_page_selector) if target_page_selector else None
+        search_space = self.pagination.get("search_space")
+        # Scope and visited checks need the spider's state, so they happen there
+        self.search_links = LinkExtractor(search_space) if search_space else None
+        self.page_links = pagination_extractor(self.pagination) if self.pagination.get("type") == "listed_links" else None
+
+    def parse(self, url, request_url, body, encoding, follow_index=None):
+        """
+        Return {"finds": [...], "is_target": bool, "links": [...]}. 'finds'
+        lines up with the top-level steps, or with the next_steps of the
+        follow step at follow_index, and holds a list of items for each Find
+        step (None for the others). 'links' are URLs for listed_links and
+        (URL, anchor text) pairs for search_links.
+        """
+        response = HtmlResponse(url, body=body, encoding=encoding, request=Request(request_url))
+        scoped = self.page_parser if follow_index is None else self.follow_parsers.get(follow_index)
+        if scoped is not None:
+            scoped.scope(response)
+        steps = self.steps if follow_index is None else self.steps[follow_index].get("next_steps", [])
+        finds = [list(find(response, step)) if step.get("type", "").lower() == "find" else None for step in steps]
+        if follow_index is not None:
+            return {"finds": finds, "is_target": True, "links": []}
+        root = _root(response)
+        is_target = self.target_selector is None or bool(self.target_selector.nodes(root))
+        ptype = self.pagination.get("type")
+        if ptype == "listed_links":
+            links = list(find_pages(response, self.pagination, extractor=self.page_links))
+        elif ptype == "search_links" and self.search_links is not None:
+            links = self.search_links.links(response, anchor_text=True)
+        else:
+            links = []
+        return {"finds": finds, "is_target": is_target, "links": links}
+
+
+def _init_worker(steps, pagination, scoped_parse):
+    global _worker_parser
+    _worker_parser = PageParser(compile_steps(steps), pagination, scoped_parse)
+
+
+def _parse_in_worker(*args):
+    return _worker_parser.parse(*args)
+
+
+class ParsePool:
+    """
+    Runs PageParser.parse off the reactor thread and returns a Deferred, so
+    downloads keep flowing while a large page is parsed. mode="thread" parses
+    in up to 'workers' threads (lxml releases the GIL while parsing);
+    mode="process" in that many worker processes, started with "spawn".
+    """
+
+    def __init__(self, steps, pagination, mode="thread", workers=4, scoped_parse=False):
+        if mode not in PARSE_MODES:
+            raise ValueError(f"Unknown parse mode '{mode}'. Expected one of: {', '.join(PARSE_MODES)}")
+        # Threads share the compiled XPath objects; lxml evaluates each under its own lock.
+        self.parser = PageParser(steps, pagination, scoped_parse)
+        # In process mode these threads only wait on the worker processes.
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=workers, name="parse_pool")
+        self.threadpool.start()
+        self.executor = None
+        if mode == "process":
+            self.executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(_strip_plans(steps), pagination, scoped_parse),
+            )
+
+    def parse(self, response, follow_index=None):
+        from twisted.internet import reactor
+        args = (response.url, response.request.url, response.body, response.encoding, follow_index)
+        if self.executor is None:
+            return threads.deferToThreadPool(reactor, self.threadpool, self.parser.parse, *args)
+        return threads.deferToThreadPool(
+            reactor, self.threadpool, lambda: self.executor.submit(_parse_in_worker, *args).result()
+        )
+
+    def close(self):
+        self.threadpool.stop()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
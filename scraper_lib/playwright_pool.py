@@ -0,0 +1,98 @@
+# scraper_module/scraper_lib/playwright_pool.py
+import logging
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import DeferredSemaphore
+
+logger = logging.getLogger(__name__)
+
+PLAYWRIGHT_WAITS = ("timeout", "selector", "networkidle", "domstable")
+# Resource types PLAYWRIGHT_ABORT_REQUEST drops when playwright_block_resources is set.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
+# Resolves once the DOM has had no mutations for quietMs, or after timeoutMs at the latest.
+_DOM_STABLE_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quiet;
+    const done = () => { observer.disconnect(); clearTimeout(quiet); clearTimeout(cap); resolve(); };
+    const observer = new MutationObserver(() => { clearTimeout(quiet); quiet = setTimeout(done, quietMs); });
+    const cap = setTimeout(done, timeoutMs);
+    quiet = setTimeout(done, quietMs);
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+})
+"""
+
+
+def abort_heavy_resources(request):
+    """
+    PLAYWRIGHT_ABORT_REQUEST hook: skip images, fonts and media.
+    """
+    return request.resource_type in BLOCKED_RESOURCE_TYPES
+
+
+async def wait_for_condition(page, condition, selector=None, timeout=10000, quiet_ms=500):
+    """
+    Page method that waits until the condition holds, for at most timeout ms,
+    then lets the page content be taken as it is:
+    "selector" - an element matching the selector is attached
+    "networkidle" - no network connections for 500 ms
+    "domstable" - no DOM mutations for quiet_ms
+    """
+    # Imported here so crawls without Playwright never load it.
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    try:
+        if condition == "selector":
+            await page.wait_for_selector(selector, state="attached", timeout=timeout)
+        elif condition == "networkidle":
+            await page.wait_for_load_state("networkidle", timeout=timeout)
+        elif condition == "domstable":
+            await page.evaluate(_DOM_STABLE_JS, [quiet_ms, timeout])
+    except PlaywrightTimeoutError:
+        logger.debug(f"Wait for {condition} timed out after {timeout} ms on {page.url}")
+
+
+class PagePool:
+    """
+    A bounded pool of open Playwright pages, spread over a few named browser
+    contexts. At most 'size' Playwright requests are in flight; each one
+    reuses an idle page (or opens one while fewer than 'size' exist) and
+    hands it back once its response or error arrives, so pages and contexts
+    are not created and torn down for every request.
+    """
+
+    def __init__(self, size, contexts=1, name="pool"):
+        self.size = size
+        self._open = {f"{name}-{i}": 0 for i in range(max(1, contexts))}
+        self._idle = []
+        self._slots = DeferredSemaphore(size)
+
+    @property
+    def pages_per_context(self):
+        return -(-self.size // len(self._open))
+
+    async def checkout(self, request):
+        await maybe_deferred_to_future(self._slots.acquire())
+        meta = request.meta
+        while self._idle:
+            context, page = self._idle.pop()
+            if not page.is_closed():
+                meta["playwright_page"] = page
+                break
+            self._open[context] -= 1
+        else:
+            # No idle page: scrapy-playwright opens one in the least used context.
+            context = min(self._open, key=self._open.get)
+            self._open[context] += 1
+        meta["playwright_context"] = context
+        meta["playwright_include_page"] = True
+        meta["playwright_pool_slot"] = True
+
+    def checkin(self, meta):
+        if not meta.pop("playwright_pool_slot", False):
+            return
+        page = meta.pop("playwright_page", None)
+        context = meta["playwright_context"]
+        if page is None or page.is_closed():
+            self._open[context] -= 1
+        else:
+            self._idle.append((context, page))
+        self._slots.release()
@@ -0,0 +1,199 @@
+# scraper_module/scraper_lib/registry.py
+import ast
+import dataclasses
+import importlib.util
+import json
+import logging
+import typing
+from pathlib import Path
+from scraper_module.config import (
+    SpiderConfig, PaginationConfig, Listed_Links, Search_Links, TaskConfig, Find, Follow, DynamicFind,
+)
+from .scraper_engine import ScraperEngine
+
+logger = logging.getLogger(__name__)
+
+CONFIG_SUFFIXES = (".py", ".json", ".yaml", ".yml")
+# Serialized "type" -> dataclass, named the way ScraperEngine names the internal steps
+PAGINATION_TYPES = {cls.__name__.lower(): cls for cls in (Listed_Links, Search_Links)}
+TASK_TYPES = {cls.__name__.lower(): cls for cls in (Find, Follow, DynamicFind)}
+
+
+def _check_value(value, hint, where):
+    """
+    Check a deserialized value against a config field's type hint, building
+    nested config dataclasses from dicts. Returns the value to set.
+    """
+    origin, args = typing.get_origin(hint), typing.get_args(hint)
+    if origin is typing.Union:
+        if value is None and type(None) in args:
+            return None
+        return _check_value(value, next(arg for arg in args if arg is not type(None)), where)
+    if hint is PaginationConfig:
+        return _from_dict(value, PAGINATION_TYPES, where)
+    if hint is TaskConfig:
+        return _from_dict(value, TASK_TYPES, where)
+    if dataclasses.is_dataclass(hint):
+        return _build(hint, value, where)
+    if origin is list:
+        if not isinstance(value, list):
+            raise ValueError(f"{where}: expected a list, got {type(value).__name__}")
+        return [_check_value(v, args[0], f"{where}[{i}]") for i, v in enumerate(value)]
+    if origin is dict:
+        if not isinstance(value, dict):
+            raise ValueError(f"{where}: expected a mapping, got {type(value).__name__}")
+        return {_check_value(k, args[0], where): _check_value(v, args[1], f"{where}.{k}") for k, v in value.items()}
+    # bool is an int subclass, but a flag is never a valid count and vice versa.
+    expected = (int, float) if hint is float else hint
+    if isinstance(value, bool) != (hint is bool) or not isinstance(value, expected):
+        raise ValueError(f"{where}: expected {hint.__name__}, got {type(value).__name__}")
+    return value
+
+
+def _from_dict(value, types, where):
+    if not isinstance(value, dict):
+        raise ValueError(f"{where}: expected a mapping, got {type(value).__name__}")
+    value = dict(value)
+    kind = value.pop("type", None)
+    if kind not in types:
+        raise ValueError(f"{where}: 'type' must be one of: {', '.join(types)} (got {kind!r})")
+    return _build(types[kind], value, where)
+
+
+def _build(cls, data, where):
+    if not isinstance(data, dict):
+        raise ValueError(f"{where}: expected a mapping, got {type(data).__name__}")
+    hints = typing.get_type_hints(cls)
+    fields = {f.name: f for f in dataclasses.fields(cls) if f.name != "type"}
+    unknown = set(data) - set(fields)
+    if unknown:
+        raise ValueError(f"{where}: unknown {cls.__name__} option(s): {', '.join(sorted(unknown))}")
+    kwargs = {}
+    for name, f in fields.items():
+        if name not in data:
+            if f.default is dataclasses.MISSING and f.default_factory is dataclasses.MISSING:
+                raise ValueError(f"{where}: {cls.__name__} requires '{name}'")
+            continue
+        value = data[name]
+        # Fields such as target_page_selector: str = None take None despite their hint.
+        if value is None and f.default is None:
+            kwargs[name] = None
+            continue
+        kwargs[name] = _check_value(value, hints[name], f"{where}.{name}")
+    return cls(**kwargs)
+
+
+def config_from_dict(data, where="config"):
+    """
+    Build a SpiderConfig from its serialized form, checking option names and
+    types against the config.py dataclasses. pagination and each task carry
+    a "type": listed_links/search_links and find/follow/dynamicfind.
+    """
+    return _build(SpiderConfig, data, where)
+
+
+def load_config(path):
+    """
+    Load a SpiderConfig from a .json, .yaml/.yml or .py file; a .py file
+    must define it as 'config', as in configs/*.py.
+    """
+    path = Path(path)
+    if path.suffix == ".py":
+        spec = importlib.util.spec_from_file_location(f"scraper_config_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if not isinstance(getattr(module, "config", None), SpiderConfig):
+            raise ValueError(f"{path} does not define a SpiderConfig named 'config'")
+        return module.config
+    with open(path, encoding="utf8") as f:
+        if path.suffix == ".json":
+            data = json.load(f)
+        elif path.suffix in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("YAML configs require the 'pyyaml' package") from None
+            data = yaml.safe_load(f)
+        else:
+            raise ValueError(f"Unknown config format '{path.suffix}'. Expected one of: {', '.join(CONFIG_SUFFIXES)}")
+    return config_from_dict(data, where=str(path))
+
+
+def _static_name(path):
+    """
+    The literal name= of the SpiderConfig a config module assigns to 'config', read without running it.
+    """
+    for node in ast.parse(path.read_bytes(), str(path)).body:
+        if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)):
+            continue
+        if not any(isinstance(target, ast.Name) and target.id == "config" for target in node.targets):
+            continue
+        for keyword in node.value.keywords:
+            if keyword.arg == "name" and isinstance(keyword.value, ast.Constant) and isinstance(keyword.value.value, str):
+                return keyword.value.value
+    return None
+
+
+class ConfigRegistry:
+    """
+    Index of the configs in a folder by name, built without running any of
+    them: a .py config is named by the literal name= of its SpiderConfig
+    (or its file name when that is computed), a .json/.yaml config by its
+    file name. A config is loaded, and its engine built, only once it is
+    selected, so a run of a few configs out of hundreds starts quickly.
+    """
+
+    def __init__(self, folder="configs"):
+        self.folder = Path(folder)
+        self._paths = {}
+        self._configs = {}
+        for path in sorted(self.folder.iterdir()):
+            if path.suffix not in CONFIG_SUFFIXES or path.name.startswith("_"):
+                continue
+            name = (_static_name(path) if path.suffix == ".py" else None) or path.stem
+            if name in self._paths:
+                raise ValueError(f"Config name '{name}' is used by both {self._paths[name]} and {path}")
+            self._paths[name] = path
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, name):
+        return name in self._paths
+
+    def names(self):
+        return list(self._paths)
+
+    def path(self, name):
+        if name not in self._paths:
+            raise KeyError(f"No config named '{name}' in {self.folder}")
+        return self._paths[name]
+
+    def config(self, name):
+        """
+        Load (once) and return the named SpiderConfig.
+        """
+        if name not in self._configs:
+            path = self.path(name)
+            config = load_config(path)
+            if config.name != name:
+                raise ValueError(f"{path} defines config '{config.name}' but is registered as '{name}'; "
+                                 f"give SpiderConfig a literal name= or rename the file")
+            self._configs[name] = config
+        return self._configs[name]
+
+    def select(self, names=None, exclude=()):
+        """
+        The registered names to run: 'names' (all by default) minus 'exclude'.
+        """
+        names = self.names() if names is None else [name for name in names if self.path(name)]
+        exclude = set(exclude)
+        return [name for name in names if name not in exclude]
+
+    def engines(self, names=None, exclude=()):
+        """
+        Build a ScraperEngine for each selected config.
+        """
+        selected = self.select(names, exclude)
+        logger.info(f"Loading {len(selected)} of {len(self)} configs from {self.folder}")
+        return [ScraperEngine(self.config(name)) for name in selected]
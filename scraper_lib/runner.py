@@ -1,52 +1,217 @@
 # scraper_module/scraper_lib/runner.py
+import dataclasses
 import logging
 import json
+import multiprocessing
+import os
+from queue import Empty
 from scrapy.crawler import CrawlerProcess
 from scrapy import signals
 from .engine_spider import StepSpider
+from .parquet_export import ParquetSink, item_schema
+from .scraper_engine import ScraperEngine
 
 logger = logging.getLogger(__name__)
 
 class RunAllEngines:
-    def __init__(self, engines, global_settings=None):
+    def __init__(self, engines, global_settings=None, output_folder="./data_output"):
         self.engines = engines
         self.global_settings = global_settings or {}
+        self.output_folder = output_folder
+        self.stats = {}
         self.logger = logger
 
+    def _schedule(self, process, engine):
+        if not engine.start_url:
+            raise ValueError(f"Engine '{engine.name}' has no start_url set.")
+        crawler = process.create_crawler(StepSpider)
+        crawler.settings.update(self._crawler_settings(engine), priority="spider")
+
+        def item_collector(item, response, spider, this_engine=engine):
+            # Duplicates were already dropped by DedupPipeline.
+            this_engine.logger.debug("%s scraped item: %s", this_engine.name, item)
+            # A Deferred returned here holds the item until it fires (see AsyncRunAllEngines).
+            return self._collect(this_engine, item)
+
+        # weak=False: these closures are rebound for every engine, and a weak
+        # reference would let all but the last engine's handlers be collected.
+        crawler.signals.connect(item_collector, signal=signals.item_scraped, weak=False)
+
+        def report_seen_items(spider, this_engine=engine, this_crawler=crawler):
+            this_crawler.stats.set_value("seen_items/backend", this_engine.seen_items.backend)
+            this_crawler.stats.set_value("seen_items/memory_bytes", this_engine.seen_items.memory_bytes())
+            this_engine.add_timings(spider)
+
+        def finish(this_engine=engine, this_crawler=crawler):
+            # spider_closed handlers run before CoreStats sets finish_reason; engine_stopped comes after the stats close.
+            self._finish(this_engine, this_engine.finish(this_crawler.spider))
+
+        crawler.signals.connect(report_seen_items, signal=signals.spider_closed, weak=False)
+        crawler.signals.connect(finish, signal=signals.engine_stopped, weak=False)
+        engine.open_sink(self.output_folder)
+        return crawler, process.crawl(crawler, **self._spider_kwargs(engine))
+
+    def _crawler_settings(self, engine):
+        return engine.crawler_settings()
+
+    def _spider_kwargs(self, engine):
+        return engine.spider_kwargs()
+
+    def _collect(self, engine, item):
+        return engine.collect(item)
+
+    def _finish(self, engine, stats):
+        self.stats[engine.name] = stats
+        engine.close_sink()
+
     def run_all(self):
         process = CrawlerProcess(self.global_settings)
         for engine in self.engines:
-            if not engine.start_url:
-                raise ValueError(f"Engine '{engine.name}' has no start_url set.")
-            crawler = process.create_crawler(StepSpider)
-
-            def item_collector(item, response, spider, this_engine=engine):
-                # Create a unique key for the item (convert title to string if needed)
-                title = item.get("title")
-                source = item.get("source", "")
-                title_key = ", ".join(title) if isinstance(title, list) else title
-                key = (title_key, source)
-                if key not in this_engine.seen_items:
-                    this_engine.seen_items.add(key)
-                    this_engine.logger.debug(f"{this_engine.name} scraped item: {item}")
-                    this_engine.items_collected.append(item)
-                else:
-                    this_engine.logger.debug(f"Duplicate item skipped: {item}")
-
-            crawler.signals.connect(item_collector, signal=signals.item_scraped)
-            process.crawl(crawler,
-                          start_url=engine.start_url,
-                          steps=engine.steps,
-                          use_playwright=engine.playwright,
-                          pagination=engine.pagination)
+            self._schedule(process, engine)
         self.logger.info("Starting all spiders...")
         process.start()  # Blocking until all spiders finish.
         return {engine.name: engine.items_collected for engine in self.engines}
 
-    def save_all(self, output_folder="./data_output"):
+    def save_all(self, output_folder=None, format="json"):
+        """
+        Write each engine's collected items to <name>_out.json, or to
+        <name>_out.parquet with format="parquet".
+        """
+        output_folder = output_folder or self.output_folder
         for engine in self.engines:
+            if engine.config.stream_output and not engine.config.keep_items:
+                self.logger.info(f"{engine.name} items were streamed to {output_folder}; nothing to save")
+                continue
+            if format == "parquet":
+                path = f"{output_folder}/{engine.name}_out.parquet"
+                self.logger.info(f"Saving {len(engine.items_collected)} items to {path}")
+                sink = ParquetSink(path, item_schema(engine.steps))
+                for item in engine.items_collected:
+                    sink.write(item)
+                sink.close()
+                continue
             fname = f"{engine.name}_out.json"
             path = f"{output_folder}/{fname}"
             self.logger.info(f"Saving {len(engine.items_collected)} items to {path}")
             with open(path, "w", encoding="utf8") as f:
                 json.dump(engine.items_collected, f, indent=4, ensure_ascii=False)
+
+
+class _ShardRunner(RunAllEngines):
+    """
+    RunAllEngines inside a worker process: items and stats go to the parent
+    through a queue instead of being kept here.
+    """
+
+    def __init__(self, engines, global_settings, queue):
+        super().__init__(engines, global_settings)
+        self.queue = queue
+
+    def _collect(self, engine, item):
+        self.queue.put(("item", engine.name, dict(item)))
+
+    def _finish(self, engine, stats):
+        self.queue.put(("stats", engine.name, stats))
+
+
+def _run_shard(configs, global_settings, queue):
+    # Runs in a fresh (spawned) process, so it gets its own reactor.
+    try:
+        _ShardRunner([ScraperEngine(config) for config in configs], global_settings, queue).run_all()
+    finally:
+        queue.put(("done", None, None))
+
+
+class ShardedRunAllEngines(RunAllEngines):
+    """
+    Runs the engines across a pool of worker processes, each with its own
+    CrawlerProcess, so CPU-bound parsing uses more than one core. Engines are
+    spread over the workers by the page counts of earlier runs, kept in
+    history_path. Items and stats are streamed back to this process, so
+    run_all() returns and save_all() writes the same as RunAllEngines.
+
+    Workers are started with the "spawn" method: scripts using this must
+    guard their entry point with `if __name__ == "__main__":`.
+    """
+
+    def __init__(self, engines, global_settings=None, output_folder="./data_output",
+                 workers=None, history_path="./crawl_state/page_counts.json"):
+        super().__init__(engines, global_settings, output_folder)
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(engines)))
+        self.history_path = history_path
+
+    def _load_history(self):
+        try:
+            with open(self.history_path, encoding="utf8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_history(self, history):
+        for name, stats in self.stats.items():
+            history[name] = stats.get("response_received_count", 0)
+        parent = os.path.dirname(self.history_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(self.history_path, "w", encoding="utf8") as f:
+            json.dump(history, f, indent=4)
+
+    def shards(self, history=None):
+        """
+        Split the engines into one list per worker, largest first onto the
+        least loaded worker. Engines without history count as the average.
+        """
+        history = self._load_history() if history is None else history
+        known = [history[e.name] for e in self.engines if e.name in history]
+        default = sum(known) / len(known) if known else 1
+        weight = {e.name: max(history.get(e.name, default), 1) for e in self.engines}
+        shards = [[] for _ in range(self.workers)]
+        loads = [0] * self.workers
+        for engine in sorted(self.engines, key=lambda e: weight[e.name], reverse=True):
+            i = loads.index(min(loads))
+            shards[i].append(engine)
+            loads[i] += weight[engine.name]
+        return [shard for shard in shards if shard]
+
+    def run_all(self):
+        for engine in self.engines:
+            if not engine.start_url:
+                raise ValueError(f"Engine '{engine.name}' has no start_url set.")
+        history = self._load_history()
+        by_name = {engine.name: engine for engine in self.engines}
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        processes = []
+        for shard in self.shards(history):
+            # Outputs are written here, not in the workers.
+            configs = [dataclasses.replace(engine.config, stream_output=False) for engine in shard]
+            processes.append(ctx.Process(target=_run_shard, args=(configs, self.global_settings, queue)))
+            self.logger.info(f"Worker {len(processes)}: {', '.join(engine.name for engine in shard)}")
+        for engine in self.engines:
+            engine.open_sink(self.output_folder)
+        for process in processes:
+            process.start()
+
+        running = len(processes)
+        while running:
+            try:
+                kind, name, payload = queue.get(timeout=1)
+            except Empty:
+                if not any(process.is_alive() for process in processes):
+                    self.logger.error("Worker processes exited without finishing")
+                    break
+                continue
+            if kind == "item":
+                by_name[name].collect(payload)
+            elif kind == "stats":
+                self._finish(by_name[name], payload)
+            else:
+                running -= 1
+        for process in processes:
+            process.join()
+            if process.exitcode:
+                self.logger.error(f"Worker process {process.pid} exited with code {process.exitcode}")
+        for engine in self.engines:
+            engine.close_sink()
+        self._save_history(history)
+        return {engine.name: engine.items_collected for engine in self.engines}
@@ -0,0 +1,178 @@
+# scraper_module/scraper_lib/scoped_parse.py
+import codecs
+import logging
+import re
+from lxml import etree, html
+from scrapy.selector import Selector
+from .helpers import compile_selector, _NON_LOCAL_AXES, _STRING_LITERALS
+
+logger = logging.getLogger(__name__)
+
+# An absolute path that starts at an element with a literal id: //*[@id="x"]..., //div[@id='x']...,
+# or the descendant-or-self::*[@id = 'x'] a CSS "#x" selector translates to.
+_ID_ANCHOR = re.compile(r"""^\s*(?://|descendant-or-self::)(?:\*|[\w-]+)\[\s*@id\s*=\s*(?:"([^"]*)"|'([^']*)')\s*\]""")
+_FEED_BYTES = 64 * 1024
+
+
+def container_id(selector_str):
+    """
+    The id a selector's matches all lie inside (or on), or None if it can reach
+    anywhere else in the page.
+    """
+    expr = compile_selector(selector_str).expr
+    match = _ID_ANCHOR.match(expr)
+    if match is None:
+        return None
+    rest = _STRING_LITERALS.sub('""', expr[match.end():])
+    if "|" in rest or "(/" in rest or "[/" in rest or "(//" in rest or _NON_LOCAL_AXES.search(rest):
+        return None
+    return match.group(1) if match.group(1) is not None else match.group(2)
+
+
+def _is_local(selector_str):
+    # A selector evaluated from a container node that cannot leave it.
+    expr = _STRING_LITERALS.sub('""', compile_selector(selector_str).expr).strip()
+    return not expr.startswith("/") and "|" not in expr and not _NON_LOCAL_AXES.search(expr)
+
+
+def _step_ids(step):
+    """
+    The container ids a step reads from, or None if it reads from anywhere.
+    """
+    action = step.get("type", "").lower()
+    if action == "find":
+        if not step.get("search_space"):
+            return None
+        relative = [step.get("repeating_selector"), *(step.get("fields") or {}).values()]
+        if not all(sel and _is_local(sel) for sel in relative):
+            return None
+        ids = {container_id(step["search_space"])}
+    elif action == "dynamicfind":
+        # Only the course links and pager are read from the listing page; fields apply to the AJAX fragments.
+        ids = {container_id(step["search_space"])}
+        if step.get("pagination_selector"):
+            ids.add(container_id(step["pagination_selector"]))
+    elif action == "follow":
+        # Follow only reads the parent item; its next_steps run on the followed page.
+        return set()
+    else:
+        return None
+    return None if None in ids else ids
+
+
+def page_scope(steps, pagination=None):
+    """
+    Container ids that hold everything the steps and pagination read from a
+    crawled page, or None when some selector is not anchored on an id.
+    """
+    ids = set()
+    for step in steps:
+        step_ids = _step_ids(step)
+        if step_ids is None:
+            return None
+        ids |= step_ids
+    if pagination:
+        space = pagination.get("search_space")
+        if not space or container_id(space) is None:
+            return None
+        ids.add(container_id(space))
+        if pagination.get("type") == "listed_links" and not _is_local(pagination.get("link_selector") or ""):
+            return None
+        target = pagination.get("target_page_selector")
+        if target:
+            if container_id(target) is None:
+                return None
+            ids.add(container_id(target))
+    return frozenset(ids) or None
+
+
+def scoped_parsers(steps, pagination=None):
+    """
+    (ScopedParser for crawled pages or None, {follow step index: ScopedParser for its followed pages}).
+    """
+    ids = page_scope(steps, pagination)
+    if ids is None:
+        logger.warning("scoped_parse: some selector is not anchored on an element id; parsing whole pages")
+    follow_parsers = {}
+    for index, step in enumerate(steps):
+        if step.get("type", "").lower() == "follow":
+            follow_ids = page_scope(step.get("next_steps") or [])
+            if follow_ids is not None:
+                follow_parsers[index] = ScopedParser(follow_ids)
+    return (ScopedParser(ids) if ids is not None else None), follow_parsers
+
+
+class ScopedParser:
+    """
+    Builds the lxml tree of a page with an HTMLPullParser, fed in chunks, and
+    stops reading once every container with one of 'ids' has closed. Elements
+    that close outside those containers (and are not their ancestors) are
+    dropped as soon as they close, so scripts, navigation and footers never
+    stay in memory. Absolute selectors anchored on those ids, and anything
+    relative to their matches, give the same results as on the full page.
+    HTML ids should be unique; a second container with the same id after the
+    first has closed is not seen.
+    """
+
+    def __init__(self, ids):
+        self.ids = frozenset(ids)
+
+    def root(self, body, encoding="utf-8"):
+        """
+        Parse the page like parsel does (same parser and options) as far as it is needed.
+        """
+        parser = etree.HTMLPullParser(events=("start", "end"), recover=True, encoding="utf-8", huge_tree=True)
+        parser.set_element_class_lookup(html.HtmlElementClassLookup())
+        remaining = set(self.ids)
+        # Open containers, and the ancestors of every container found so far.
+        open_scopes = 0
+        keep = set()
+        for chunk in self._chunks(body, encoding):
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                scope = element.get("id") in remaining
+                if event == "start":
+                    if scope:
+                        open_scopes += 1
+                        for ancestor in element.iterancestors():
+                            if ancestor in keep:
+                                break
+                            keep.add(ancestor)
+                    continue
+                if scope:
+                    open_scopes -= 1
+                    remaining.discard(element.get("id"))
+                elif open_scopes == 0 and element not in keep:
+                    parent = element.getparent()
+                    if parent is not None:
+                        parent.remove(element)
+            if not remaining:
+                break
+        root = parser.close()
+        return root if root is not None else etree.fromstring(b"<html/>", parser=html.HTMLParser())
+
+    @staticmethod
+    def _chunks(body, encoding):
+        # UTF-8 bodies are fed as they are, so the tail after the containers is never decoded.
+        if codecs.lookup(encoding).name == "utf-8":
+            body = body.strip()
+            for start in range(0, len(body), _FEED_BYTES):
+                yield body[start:start + _FEED_BYTES].replace(b"\x00", b"")
+            return
+        text = body.decode(encoding, "replace").strip().replace("\x00", "")
+        step = _FEED_BYTES // 4
+        for start in range(0, len(text), step):
+            yield text[start:start + step].encode("utf-8")
+
+    def scope(self, response):
+        """
+        Give an HTML response a selector over the scoped tree; the spider's
+        selectors (and response.xpath/css) then read that instead of a full parse.
+        """
+        if getattr(response, "_cached_selector", None) is not None or not hasattr(response, "text"):
+            return response
+        if "html" not in response.headers.get("Content-Type", b"text/html").decode("latin-1").lower():
+            return response
+        root = self.root(response.body, response.encoding)
+        response._cached_selector = Selector(root=root, type="html")
+        return response
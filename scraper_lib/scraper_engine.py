@@ -3,6 +3,14 @@ import logging
 from pathlib import Path
 from scrapy.utils.project import get_project_settings
 from .engine_spider import StepSpider
+from .crawl_store import CrawlStore
+from .visited import make_visited_set
+from .http_cache import HttpCacheStore, steps_fingerprint
+from .archive import ResponseArchive
+from .dedup import DedupStore, ItemDeduplicator
+from .sinks import NDJsonSink
+from .instrumentation import Instrumentation, dump_stats
+from .playwright_pool import abort_heavy_resources
 from scrapy.crawler import CrawlerProcess
 from typing import List
 from scraper_module.config import SpiderConfig
@@ -15,7 +23,10 @@ class ScraperEngine:
         self.name = config.name
         self.logger = logger.getChild(self.name)
         self.items_collected: List[dict] = []
-        self.seen_items = set()
+        self.sink = None
+        # Scrapy stats of the last crawl (with timing/* entries when instrument is on)
+        self.stats = {}
+        self.seen_items = make_visited_set(config.visited_backend, config.visited_fp_rate)
         self.start_url = config.start_url
         self.playwright = config.use_playwright
         # Convert pagination and tasks from the config to the internal format
@@ -25,6 +36,7 @@ class ScraperEngine:
             self.pagination = {**config.pagination.__dict__, "type": pagination_type}
         else:
             self.pagination = None
+        self.crawl_rate = dict(config.crawl_rate.__dict__) if config.crawl_rate else None
         # Convert tasks to a list of dicts
         def task_to_dict(task):
             # Use the task's own type name if the task doesn't specify one (or if task.task_type is not set)
@@ -35,58 +47,227 @@ class ScraperEngine:
             return task_dict
         self.steps = [task_to_dict(task) for task in config.tasks]
 
-    def run(self):
-        settings = get_project_settings()
-        output_file = f"./data_output/{self.name}.json"
-        settings.set("FEEDS", {
-            output_file: {
-                "format": "json",
-                "encoding": "utf8",
-                "store_empty": False,
-                "indent": 4,
-                "overwrite": True,
-            },
-        })
-        process = CrawlerProcess(settings)
-        crawler = process.create_crawler(StepSpider)
-        
-        # Define a simple item collector
+    def spider_kwargs(self, crawl_store=None, dedup_store=None):
+        """
+        Keyword arguments StepSpider is crawled with for this engine. A runner
+        may pass the crawl_store and item dedup_store to use instead of the
+        ones the config asks for (see distributed.py).
+        """
+        if crawl_store is None and self.config.resume:
+            crawl_store = CrawlStore(self.name, self.config.state_dir)
+            if crawl_store.has_state():
+                self.logger.info(f"Resuming interrupted crawl from {crawl_store.path}")
+        return dict(
+            start_url=self.start_url,
+            steps=self.steps,
+            # Replayed pages were rendered when they were captured.
+            use_playwright=self.playwright and not self.replaying,
+            pagination=self.pagination,
+            crawl_store=crawl_store,
+            visited_backend=self.config.visited_backend,
+            visited_fp_rate=self.config.visited_fp_rate,
+            http_cache=self.http_cache(),
+            parse_workers=self.config.parse_workers,
+            parse_mode=self.config.parse_mode,
+            scoped_parse=self.config.scoped_parse,
+            playwright_wait=self.config.playwright_wait,
+            playwright_wait_selector=self.config.playwright_wait_selector,
+            playwright_wait_timeout=self.config.playwright_wait_timeout,
+            playwright_pool_size=self.config.playwright_pool_size,
+            playwright_contexts=self.config.playwright_contexts,
+            crawl_rate=self.crawl_rate,
+            tracking_params=self.config.tracking_params,
+            instrumentation=self.instrumentation(),
+            archive=ResponseArchive(self.name, self.config.archive_dir, self.config.archive_mode) if self.config.archive_mode else None,
+            item_dedup=self.item_dedup(dedup_store),
+            follow_cache_size=self.config.follow_cache_size,
+        )
+
+    @property
+    def replaying(self):
+        return self.config.archive_mode == "replay"
+
+    def http_cache(self):
+        """
+        The HttpCacheStore for an incremental crawl, or None.
+        """
+        # A replay re-parses every page, rather than replaying last run's items for unchanged ones.
+        if not self.config.incremental or self.replaying:
+            return None
+        # Items are tagged with their Find step (dedup.STEP_FIELD) when dedup is on.
+        return HttpCacheStore(self.name, self.config.cache_dir, steps_fingerprint(self.steps, tagged=self.config.dedup))
+
+    def item_dedup(self, store=None):
+        """
+        An ItemDeduplicator over this engine's seen_items (and the shared dedup_store), or None if dedup is off.
+        """
+        if not self.config.dedup:
+            return None
+        if store is None and self.config.dedup_store:
+            store = DedupStore(self.config.dedup_store)
+        return ItemDeduplicator(self.steps, self.seen_items, store, self.name)
+
+    def instrumentation(self):
+        """
+        A fresh Instrumentation if the config asks for timings or a profile, else None.
+        """
+        if not (self.config.instrument or self.config.profile_page):
+            return None
+        return Instrumentation(self.name, self.config.profile_page, self.config.profiler)
+
+    def crawler_settings(self):
+        """
+        Settings this engine needs on its own crawler.
+        """
+        settings = {}
+        if self.playwright and not self.replaying:
+            # Only crawlers that render pages load scrapy-playwright (and start a browser).
+            handler = "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler"
+            settings["DOWNLOAD_HANDLERS"] = {"http": handler, "https": handler}
+        if self.playwright and self.config.playwright_pool_size:
+            contexts = max(1, self.config.playwright_contexts)
+            settings["PLAYWRIGHT_MAX_CONTEXTS"] = contexts
+            settings["PLAYWRIGHT_MAX_PAGES_PER_CONTEXT"] = -(-self.config.playwright_pool_size // contexts)
+        if self.playwright and self.config.playwright_block_resources:
+            settings["PLAYWRIGHT_ABORT_REQUEST"] = abort_heavy_resources
+        if self.crawl_rate:
+            settings["CONCURRENT_REQUESTS_PER_DOMAIN"] = self.crawl_rate["start_per_host"]
+            # Scrapy's default total of 16 would otherwise cap a fast host below max_per_host.
+            settings["CONCURRENT_REQUESTS"] = max(16, self.crawl_rate["max_per_host"])
+            if self.crawl_rate["download_timeout"]:
+                settings["DOWNLOAD_TIMEOUT"] = self.crawl_rate["download_timeout"]
+        if self.replaying:
+            # Nothing goes over the network, so parsing is the only limit. The pipelines are synchronous,
+            # so Scrapy's default of 100 parallel item tasks per response is pure Deferred overhead.
+            settings.update({
+                "ROBOTSTXT_OBEY": False,
+                "DOWNLOAD_DELAY": 0,
+                "AUTOTHROTTLE_ENABLED": False,
+                "CONCURRENT_REQUESTS": 64,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": 64,
+                "CONCURRENT_ITEMS": 8,
+            })
+        return settings
+
+    def open_sink(self, output_dir: str = "./data_output"):
+        """
+        Open the streaming output file if this engine streams its items.
+        """
+        if self.config.stream_output and self.sink is None:
+            self.sink = NDJsonSink.for_engine(output_dir, self.name, self.config.output_compression)
+        return self.sink
+
+    def close_sink(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def collect(self, item):
+        """
+        Hand a scraped item to the sink, and keep it in memory unless it is
+        streamed (or keep_items asks for both).
+        """
+        if self.sink is not None:
+            self.sink.write(item)
+            if not self.config.keep_items:
+                return
+        self.items_collected.append(item)
+
+    def add_timings(self, spider):
+        """
+        Add the spider's timings to its crawl stats. Runs on spider_closed,
+        so Scrapy's closing stats log includes them.
+        """
+        stats = spider.crawler.stats
+        if spider.instrumentation is not None:
+            for key, value in spider.instrumentation.summary(stats.get_stats()).items():
+                stats.set_value(key, value)
+
+    def finish(self, spider):
+        """
+        Keep the spider's crawl stats and write them to stats_dump if
+        configured. Runs on engine_stopped, once CoreStats has set
+        finish_reason and elapsed_time_seconds.
+        """
+        self.stats = spider.crawler.stats.get_stats()
+        if self.config.stats_dump:
+            dump_stats(self.config.stats_dump, self.name, self.stats)
+        return self.stats
+
+    def _connect(self, crawler, output_dir):
+        crawler.settings.update(self.crawler_settings(), priority="spider")
+        if self.open_sink(output_dir) is None and self.config.output_format == "parquet":
+            crawler.settings.set("FEED_EXPORTERS", {"parquet": "scraper_module.scraper_lib.parquet_export.ParquetItemExporter"})
+            crawler.settings.set("FEEDS", {
+                str(Path(output_dir) / f"{self.name}.parquet"): {
+                    "format": "parquet",
+                    "store_empty": False,
+                    "overwrite": True,
+                    "item_export_kwargs": {"steps": self.steps},
+                },
+            })
+        elif self.sink is None:
+            crawler.settings.set("FEEDS", {
+                str(Path(output_dir) / f"{self.name}.json"): {
+                    "format": "json",
+                    "encoding": "utf8",
+                    "store_empty": False,
+                    "indent": 4,
+                    "overwrite": True,
+                },
+            })
+
         def item_collector(item, response, spider):
-            self.items_collected.append(item)
-        crawler.signals.connect(item_collector, signal=signals.item_scraped)
-        process.crawl(crawler,
-                      start_url=self.start_url,
-                      steps=self.steps,
-                      use_playwright=self.playwright,
-                      pagination=self.pagination)
+            self.collect(item)
+
+        def close_sink(spider):
+            self.close_sink()
+            self.add_timings(spider)
+
+        def finish():
+            self.finish(crawler.spider)
+
+        crawler.signals.connect(item_collector, signal=signals.item_scraped, weak=False)
+        crawler.signals.connect(close_sink, signal=signals.spider_closed, weak=False)
+        crawler.signals.connect(finish, signal=signals.engine_stopped, weak=False)
+
+    def run(self, output_dir: str = "./data_output"):
+        process = CrawlerProcess(get_project_settings())
+        crawler = process.create_crawler(StepSpider)
+        self._connect(crawler, output_dir)
+        process.crawl(crawler, **self.spider_kwargs())
         process.start()
         return self.items_collected
     
-    def schedule(self, process, output_dir: str = "./data_output"):
-        out_path = Path(output_dir)
-        
-        feed_uri = str(out_path / f"{self.name}.json")
-        process.settings.set("FEEDS", {
-            feed_uri: {
-                "format": "json",
-                "encoding": "utf8",
-                "store_empty": False,
-                "indent": 4,
-                "overwrite": True,
-            },
-        })
+    def new_run(self):
+        """
+        Forget the items and stats of the previous crawl, so the engine can be crawled again in the same process.
+        """
+        self.items_collected = []
+        self.stats = {}
+        self.seen_items = make_visited_set(self.config.visited_backend, self.config.visited_fp_rate)
 
-        crawler = process.create_crawler(StepSpider)
+    async def crawl(self, output_dir: str = "./data_output"):
+        """
+        Crawl from a running asyncio event loop and return the items (see AsyncRunAllEngines).
+        """
+        from .async_runner import AsyncRunAllEngines
+        return await AsyncRunAllEngines([self], get_project_settings(), output_dir).crawl(self)
 
-        def item_collector(item, response, spider):
-            self.items_collected.append(item)
-
-        crawler.signals.connect(item_collector, signal=signals.item_scraped)
+    async def stream(self, output_dir: str = "./data_output", queue_size: int = 100):
+        """
+        Crawl from a running asyncio event loop, yielding items as they are scraped.
+        """
+        from .async_runner import AsyncRunAllEngines
+        items = AsyncRunAllEngines([self], get_project_settings(), output_dir, queue_size).stream(self)
+        try:
+            async for item in items:
+                yield item
+        finally:
+            # Stops the crawl when the caller leaves its loop early.
+            await items.aclose()
 
-        process.crawl(
-            crawler,
-            start_url=self.start_url,
-            steps=self.steps,
-            use_playwright=self.playwright,
-            pagination=self.pagination,
-        )
\ No newline at end of file
+    def schedule(self, process, output_dir: str = "./data_output"):
+        crawler = process.create_crawler(StepSpider)
+        self._connect(crawler, output_dir)
+        process.crawl(crawler, **self.spider_kwargs())
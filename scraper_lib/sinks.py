@@ -0,0 +1,89 @@
+# scraper_module/scraper_lib/sinks.py
+import gzip
+import json
+import logging
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for compression="zstd"
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class NDJsonSink:
+    """
+    Streams items to a newline-delimited JSON file as they are scraped,
+    optionally gzip or zstd compressed. Lines are buffered and written once
+    buffer_size bytes are pending or fsync_interval seconds have passed since
+    the last fsync, which then flushes and fsyncs the file, so a crash loses
+    only the items of the last few seconds.
+    """
+
+    def __init__(self, path, compression=None, buffer_size=1 << 16, fsync_interval=5.0):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression '{compression}'. Expected one of: gzip, zstd")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("compression='zstd' requires the 'zstandard' package")
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.buffer_size = buffer_size
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self._raw = open(path, "wb")
+        if compression == "gzip":
+            self._out = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif compression == "zstd":
+            self._out = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._out = self._raw
+        self._compression = compression
+        self._buffer = []
+        self._buffered = 0
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def for_engine(cls, output_dir, name, compression=None, **kwargs):
+        return cls(os.path.join(output_dir, f"{name}.jsonl{COMPRESSION_SUFFIXES[compression]}"), compression, **kwargs)
+
+    def write(self, item):
+        line = json.dumps(dict(item), ensure_ascii=False).encode("utf8") + b"\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.count += 1
+        # A slow crawl may never fill the buffer, so time alone also flushes it.
+        due = time.monotonic() - self._last_sync >= self.fsync_interval
+        if due or self._buffered >= self.buffer_size:
+            self.flush(sync=due)
+
+    def flush(self, sync=False):
+        if self._buffer:
+            self._out.write(b"".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        if sync:
+            # Push compressed data out to the file before syncing it.
+            if self._compression == "gzip":
+                self._out.flush()
+            elif self._compression == "zstd":
+                self._out.flush(zstandard.FLUSH_BLOCK)
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._raw.closed:
+            return
+        self.flush()
+        if self._out is not self._raw:
+            self._out.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        logger.info(f"Wrote {self.count} items to {self.path}")
@@ -0,0 +1,179 @@
+# scraper_module/scraper_lib/visited.py
+import hashlib
+import math
+import sys
+from array import array
+
+# Every backend implements add(key), `key in s`, len(s) and memory_bytes().
+# Keys are canonical URL strings or tuples of strings (item keys).
+
+
+def _key_bytes(key):
+    if isinstance(key, str):
+        return key.encode("utf8")
+    return "\x1f".join("" if k is None else str(k) for k in key).encode("utf8")
+
+
+def _hash64(key):
+    return int.from_bytes(hashlib.blake2b(_key_bytes(key), digest_size=8).digest(), "little")
+
+
+class ExactSet(set):
+    """
+    The default: a plain Python set holding every key.
+    """
+    backend = "exact"
+
+    def memory_bytes(self):
+        total = sys.getsizeof(self)
+        for key in self:
+            total += sys.getsizeof(key)
+            if isinstance(key, tuple):
+                total += sum(sys.getsizeof(k) for k in key)
+        return total
+
+
+class HashSet64:
+    """
+    Keeps only a 64-bit hash of each key in an open-addressing table packed
+    into an array of unsigned 64-bit ints (8 bytes per slot). Two distinct
+    keys collide with probability ~n/2**64, which is negligible at crawl sizes.
+    """
+    backend = "hash64"
+
+    def __init__(self, initial_capacity=1024):
+        size = 1
+        while size < initial_capacity * 2:
+            size <<= 1
+        self._table = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._len = 0
+
+    def _slot(self, h):
+        # 0 marks an empty slot, so the hash 0 is stored as 1.
+        h = h or 1
+        i = h & self._mask
+        table = self._table
+        while table[i] and table[i] != h:
+            i = (i + 1) & self._mask
+        return i, h
+
+    def add(self, key):
+        i, h = self._slot(_hash64(key))
+        if self._table[i]:
+            return
+        self._table[i] = h
+        self._len += 1
+        if self._len * 2 > len(self._table):
+            self._grow()
+
+    def _grow(self):
+        old = self._table
+        self._table = array("Q", bytes(8 * len(old) * 2))
+        self._mask = len(self._table) - 1
+        for h in old:
+            if h:
+                i, _ = self._slot(h)
+                self._table[i] = h
+
+    def __contains__(self, key):
+        i, _ = self._slot(_hash64(key))
+        return bool(self._table[i])
+
+    def __len__(self):
+        return self._len
+
+    def memory_bytes(self):
+        return sys.getsizeof(self._table)
+
+
+class _BloomFilter:
+    __slots__ = ("capacity", "num_bits", "num_hashes", "bits", "count")
+
+    def __init__(self, capacity, fp_rate):
+        self.capacity = capacity
+        self.num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, math.ceil(math.log2(1 / fp_rate)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h1, h2):
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, h1, h2):
+        for pos in self._positions(h1, h2):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hashes):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(*hashes))
+
+
+class ScalableBloomFilter:
+    """
+    A Bloom filter that adds a larger, stricter filter whenever the current
+    one is full, so the overall false-positive rate stays below fp_rate no
+    matter how many keys are added. A false positive means a URL or item is
+    wrongly treated as already seen and skipped.
+    """
+    backend = "bloom"
+    # Each new filter holds GROWTH times more keys with a TIGHTENING times lower error rate.
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, fp_rate=0.001, initial_capacity=1024):
+        self.fp_rate = fp_rate
+        self._filters = []
+        self._len = 0
+        self._add_filter(initial_capacity)
+
+    def _add_filter(self, capacity):
+        # The error rates form a geometric series that sums to fp_rate.
+        rate = self.fp_rate * (1 - self.TIGHTENING) * (self.TIGHTENING ** len(self._filters))
+        self._filters.append(_BloomFilter(capacity, rate))
+
+    @staticmethod
+    def _hashes(key):
+        digest = hashlib.blake2b(_key_bytes(key), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, key):
+        hashes = self._hashes(key)
+        if any(hashes in f for f in self._filters):
+            return
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            self._add_filter(current.capacity * self.GROWTH)
+            current = self._filters[-1]
+        current.add(*hashes)
+        self._len += 1
+
+    def __contains__(self, key):
+        hashes = self._hashes(key)
+        return any(hashes in f for f in self._filters)
+
+    def __len__(self):
+        return self._len
+
+    def memory_bytes(self):
+        return sum(sys.getsizeof(f.bits) for f in self._filters)
+
+
+VISITED_BACKENDS = {
+    "exact": ExactSet,
+    "hash64": HashSet64,
+    "bloom": ScalableBloomFilter,
+}
+
+
+def make_visited_set(backend="exact", fp_rate=0.001):
+    """
+    Create an empty visited/seen set for the named backend.
+    """
+    if backend not in VISITED_BACKENDS:
+        raise ValueError(f"Unknown visited backend '{backend}'. Expected one of: {', '.join(VISITED_BACKENDS)}")
+    if backend == "bloom":
+        return ScalableBloomFilter(fp_rate=fp_rate)
+    return VISITED_BACKENDS[backend]()
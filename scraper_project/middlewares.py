@@ -1,6 +1,10 @@
 # scraper_module/scraper_project/middlewares.py
-
+import time
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scraper_module.scraper_lib.http_cache import content_hash
 
 class ScraperProjectSpiderMiddleware:
     """
@@ -45,27 +49,72 @@ class ScraperProjectSpiderMiddleware:
         spider.logger.info('Spider opened: %s' % spider.name)
 
 
-class ScraperProjectDownloaderMiddleware:
+class IncrementalCacheMiddleware:
     """
-    Not activated by default. See settings.py to enable it.
+    Conditional requests for incremental re-crawls. Enabled for every
+    StepSpider (see StepSpider.update_settings) but a no-op unless the spider
+    has an HttpCacheStore, i.e. its SpiderConfig sets incremental=True.
+
+    Cached URLs are requested with If-None-Match / If-Modified-Since. A 304
+    is turned back into a full response from the cached body, and both a 304
+    and a 200 whose body hash is unchanged are flagged with
+    meta["incremental_unchanged"], so the spider can replay the items it
+    extracted last time instead of running parse_steps again.
     """
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your downloader middleware.
         s = cls()
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
         return s
 
+    def spider_opened(self, spider):
+        self.stats = spider.crawler.stats
+
     def process_request(self, request, spider):
-        """
-        Called for each request that goes through the downloader middleware.
-        """
+        cache = getattr(spider, "http_cache", None)
+        if cache is None or request.meta.get("playwright"):
+            return None
+        cached = cache.validators(spider.canonicalize_url(request.url))
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                request.headers.setdefault("If-None-Match", etag)
+            if last_modified:
+                request.headers.setdefault("If-Modified-Since", last_modified)
         return None
 
     def process_response(self, request, response, spider):
-        """
-        Called with the response returned from the downloader.
-        """
+        cache = getattr(spider, "http_cache", None)
+        if cache is None or request.meta.get("playwright"):
+            return response
+        url = spider.canonicalize_url(request.url)
+        if response.status == 304:
+            cached = cache.body(url)
+            if cached is None:
+                return response
+            content_type, body = cached
+            headers = Headers(response.headers)
+            if content_type:
+                headers["Content-Type"] = content_type
+            respcls = responsetypes.from_args(headers=headers, url=response.url, body=body)
+            request.meta["incremental_unchanged"] = True
+            self.stats.inc_value("incremental/not_modified")
+            return respcls(url=response.url, status=200, headers=headers, body=body,
+                           request=request, flags=response.flags + ["cached"])
+        if response.status != 200:
+            return response
+        body_hash = content_hash(response.body)
+        cached = cache.validators(url)
+        etag, last_modified = _header(response, "ETag"), _header(response, "Last-Modified")
+        if cached and cached[2] == body_hash:
+            request.meta["incremental_unchanged"] = True
+            self.stats.inc_value("incremental/unchanged")
+            cache.touch(url, etag, last_modified)
+        else:
+            self.stats.inc_value("incremental/changed")
+            content_type = _header(response, "Content-Type")
+            cache.store_page(url, etag, last_modified, content_type, body_hash, response.body)
         return response
 
     def process_exception(self, request, exception, spider):
@@ -73,3 +122,192 @@ class ScraperProjectDownloaderMiddleware:
         Called when a download handler or process_request() raises an exception.
         """
         pass
+
+
+class ResponseArchiveMiddleware:
+    """
+    Record and replay of responses. Enabled for every StepSpider (see
+    StepSpider.update_settings) but a no-op unless the spider has a
+    ResponseArchive, i.e. its SpiderConfig sets archive_mode.
+
+    It sits first in the chain, so in "capture" mode it stores responses as
+    the spider will see them (redirected, decompressed) and in "replay" mode
+    it answers requests before any other middleware or the network is
+    involved. A request missing from the archive is dropped in replay mode.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls()
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        return s
+
+    def spider_opened(self, spider):
+        self.stats = spider.crawler.stats
+
+    def process_request(self, request, spider):
+        archive = getattr(spider, "archive", None)
+        if archive is None or archive.mode != "replay":
+            return None
+        stored = archive.get(self._key(request, spider))
+        if stored is None:
+            self.stats.inc_value("archive/missed")
+            raise IgnoreRequest(f"{request.url} is not in the response archive")
+        self.stats.inc_value("archive/replayed")
+        response_url, status, headers, body = stored
+        headers = Headers(headers)
+        respcls = responsetypes.from_args(headers=headers, url=response_url, body=body)
+        return respcls(url=response_url, status=status, headers=headers, body=body, request=request, flags=["archived"])
+
+    def process_response(self, request, response, spider):
+        archive = getattr(spider, "archive", None)
+        if archive is None or archive.mode != "capture":
+            return response
+        headers = {
+            key.decode("latin1"): [value.decode("latin1") for value in values]
+            for key, values in response.headers.items()
+        }
+        archive.put(self._key(request, spider), response.url, response.status, headers, response.body)
+        self.stats.inc_value("archive/captured")
+        return response
+
+    @staticmethod
+    def _key(request, spider):
+        # Keyed by the URL that was requested, not the one it redirected to, which replay never asks for.
+        return spider.canonicalize_url(request.meta.get("redirect_urls", [request.url])[0])
+
+
+class PlaywrightPagePoolMiddleware:
+    """
+    Lends pooled Playwright pages to Playwright requests. Added to every
+    StepSpider (see StepSpider.update_settings) but a no-op unless the spider
+    has a PagePool, i.e. its SpiderConfig sets playwright_pool_size.
+
+    It sits next to the downloader so it sees responses and errors before
+    the retry and redirect middlewares copy the request meta.
+    """
+
+    async def process_request(self, request, spider):
+        pool = getattr(spider, "page_pool", None)
+        if pool is None or not request.meta.get("playwright") or request.meta.get("playwright_pool_slot"):
+            return None
+        await pool.checkout(request)
+        return None
+
+    def process_response(self, request, response, spider):
+        pool = getattr(spider, "page_pool", None)
+        if pool is not None:
+            pool.checkin(request.meta)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        pool = getattr(spider, "page_pool", None)
+        if pool is not None:
+            pool.checkin(request.meta)
+        return None
+
+
+class _DomainRate:
+    __slots__ = ("pages", "errors", "bytes", "latency", "latency_total", "first", "last", "window")
+
+    def __init__(self):
+        self.pages = self.errors = self.bytes = self.window = 0
+        self.latency = None
+        self.latency_total = 0.0
+        self.first = self.last = time.monotonic()
+
+    def record(self, latency, size, failed):
+        self.last = time.monotonic()
+        if failed:
+            self.errors += 1
+            return
+        self.pages += 1
+        self.bytes += size
+        if latency is not None:
+            self.latency_total += latency
+            # Moving average, so one slow response doesn't throttle a host.
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Tracks throughput per download slot (one per host) and reports it in the
+    crawl stats when the spider closes. If the spider has a crawl_rate
+    policy (SpiderConfig.crawl_rate), it also tunes each slot's concurrency
+    while crawling, additive-increase / multiplicative-decrease:
+    - a 5xx/429 response or a download error multiplies it by 'backoff'
+    - after a window of 'concurrency' good responses it grows by one, or
+      shrinks by one while the average latency is above target_latency
+    always staying within [min_per_host, max_per_host].
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.domains = {}
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_response(self, request, response, spider):
+        failed = response.status >= 500 or response.status == 429
+        self._record(request, spider, request.meta.get("download_latency"), len(response.body), failed)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._record(request, spider, None, 0, True)
+        return None
+
+    def _record(self, request, spider, latency, size, failed):
+        key = request.meta.get("download_slot")
+        if key is None:
+            return
+        state = self.domains.get(key)
+        if state is None:
+            state = self.domains[key] = _DomainRate()
+        state.record(latency, size, failed)
+        policy = getattr(spider, "crawl_rate", None)
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if policy is None or slot is None:
+            return
+        concurrency = slot.concurrency
+        if failed:
+            state.window = 0
+            concurrency = int(concurrency * policy["backoff"])
+        else:
+            state.window += 1
+            if state.window < concurrency:
+                return
+            state.window = 0
+            target = policy["target_latency"]
+            concurrency += -1 if target and state.latency is not None and state.latency > target else 1
+        concurrency = max(policy["min_per_host"], min(policy["max_per_host"], concurrency))
+        if concurrency != slot.concurrency:
+            spider.logger.debug("%s: concurrency %d -> %d (latency %s)", key, slot.concurrency, concurrency, state.latency)
+            slot.concurrency = concurrency
+
+    def spider_closed(self, spider):
+        stats = self.crawler.stats
+        slots = self.crawler.engine.downloader.slots
+        for key, state in self.domains.items():
+            elapsed = state.last - state.first
+            rate = state.pages / elapsed if elapsed > 0 else 0.0
+            avg_latency = state.latency_total / state.pages if state.pages else 0.0
+            prefix = f"domain/{key}/"
+            stats.set_value(prefix + "pages", state.pages)
+            stats.set_value(prefix + "errors", state.errors)
+            stats.set_value(prefix + "bytes", state.bytes)
+            stats.set_value(prefix + "pages_per_sec", round(rate, 2))
+            stats.set_value(prefix + "avg_latency", round(avg_latency, 3))
+            if key in slots:
+                stats.set_value(prefix + "concurrency", slots[key].concurrency)
+            spider.logger.info(
+                f"{key}: {state.pages} pages, {state.errors} errors, {rate:.2f} pages/s, "
+                f"avg latency {avg_latency:.3f}s"
+            )
+
+
+def _header(response, name):
+    value = response.headers.get(name)
+    return value.decode("latin1") if value else None
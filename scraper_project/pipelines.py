@@ -1,23 +1,95 @@
-import json
+import logging
+from scrapy.exceptions import DropItem
+from scrapy.logformatter import LogFormatter
+from scraper_module.scraper_lib.dedup import STEP_FIELD
+from scraper_module.scraper_lib.sinks import NDJsonSink
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateItem(DropItem):
+    pass
+
+
+class QuietDuplicatesLogFormatter(LogFormatter):
+    """
+    Logs dropped duplicates at DEBUG instead of one WARNING per item.
+    """
+
+    def dropped(self, item, exception, response, spider):
+        result = super().dropped(item, exception, response, spider)
+        if isinstance(exception, DuplicateItem):
+            result["level"] = logging.DEBUG
+        return result
+
+
+class DedupPipeline:
+    """
+    Drops items the spider's ItemDeduplicator has seen before (see
+    scraper_lib/dedup.py), ahead of every exporter and the item_scraped
+    handlers. Added to every StepSpider; a no-op for spiders without one.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
+    def process_item(self, item, spider):
+        # Taken out of every item, including ones a crawl with dedup restores after it was turned off.
+        step_index = item.pop(STEP_FIELD, None)
+        dedup = getattr(spider, "item_dedup", None)
+        if dedup is None:
+            return item
+        seen = dedup.check(item, step_index)
+        if seen is None:
+            self.stats.inc_value("dedup/unique")
+            return item
+        self.stats.inc_value("dedup/duplicates")
+        self.stats.inc_value(f"dedup/duplicates/{seen}")
+        raise DuplicateItem(f"Duplicate item ({'earlier run or engine' if seen == 'store' else 'this run'})")
+
+    def close_spider(self, spider):
+        dedup = getattr(spider, "item_dedup", None)
+        if dedup is None:
+            return
+        unique = self.stats.get_value("dedup/unique", 0)
+        duplicates = self.stats.get_value("dedup/duplicates", 0)
+        if unique + duplicates:
+            self.stats.set_value("dedup/hit_rate", round(duplicates / (unique + duplicates), 4))
+            logger.info(f"{dedup.name}: dropped {duplicates} duplicate items of {unique + duplicates}")
+        dedup.close()
+
+
 class JsonWriterPipeline:
+    """
+    Streams every item to JSON_WRITER_PATH (default output.jsonl) as one JSON
+    object per line, compressed if JSON_WRITER_COMPRESSION is "gzip" or "zstd".
+    """
+
+    def __init__(self, path, compression=None):
+        self.path = path
+        self.compression = compression
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            crawler.settings.get("JSON_WRITER_PATH", "output.jsonl"),
+            crawler.settings.get("JSON_WRITER_COMPRESSION"),
+        )
+
     def open_spider(self, spider):
-        self.file = open('output.json', 'w', encoding='utf8')
-        self.file.write('[\n')  # Start the JSON array
-        self.first_item = True
+        self.sink = NDJsonSink(self.path, self.compression)
 
     def close_spider(self, spider):
-        self.file.write('\n]\n')  # End the JSON array
-        self.file.close()
+        self.sink.close()
 
     def process_item(self, item, spider):
-        if not self.first_item:
-            self.file.write(',\n')  # Add a comma between JSON objects
-        else:
-            self.first_item = False
-        line = json.dumps(dict(item), ensure_ascii=False, indent=4)
-        self.file.write(line)
+        self.sink.write(item)
         return item
-    
+
 class ScraperModulePipeline:
     def process_item(self, item, spider):
         return item
\ No newline at end of file
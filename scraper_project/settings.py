@@ -9,6 +9,12 @@ NEWSPIDER_MODULE = 'scraper_module.scraper_project.spiders'
 # Obey robots.txt rules? (Many turn this off to scrape more freely)
 ROBOTSTXT_OBEY = False
 
+# StepSpider.update_settings (scraper_lib/engine_spider.py) merges its own components into these
+# settings, each a no-op unless its SpiderConfig feature is set:
+#   DOWNLOADER_MIDDLEWARES: ResponseArchiveMiddleware 50, IncrementalCacheMiddleware 585,
+#                           AdaptiveConcurrencyMiddleware 900, PlaywrightPagePoolMiddleware 950
+#   ITEM_PIPELINES:         DedupPipeline 100
+
 ITEM_PIPELINES = {
     'scraper_module.scraper_project.pipelines.ScraperModulePipeline': 300,
     'scraper_module.scraper_project.pipelines.JsonWriterPipeline': 300,
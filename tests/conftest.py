@@ -0,0 +1,117 @@
+# scraper_module/tests/conftest.py
+"""
+Fixtures for the end-to-end tests: a local HTTP server for the crawls and
+a runner that crawls in a subprocess, since a Twisted reactor can only be
+started once per process.
+
+Run from the directory above the checkout: python -m pytest scraper_module/tests
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# abspath rather than resolve(), so a scraper_module symlink to the checkout keeps its name.
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CRAWL_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl.py")
+
+
+class Site:
+    """
+    Pages served by the local server, {path: html}. Every page has an ETag
+    (a hash of its body) and answers a matching If-None-Match with a 304,
+    unless etags is turned off. Each response waits delay seconds first.
+    hits counts the GETs per path.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.etags = True
+        self.delay = 0
+        self.hits = {}
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with site._lock:
+                    site.hits[self.path] = site.hits.get(self.path, 0) + 1
+                    html = site.pages.get(self.path)
+                time.sleep(site.delay)
+                if html is None:
+                    self._send(404, b"")
+                    return
+                body = html.encode("utf8")
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if site.etags and self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", etag)
+                    return
+                self._send(200, body, etag if site.etags else None)
+
+            def _send(self, status, body, etag=None):
+                self.send_response(status)
+                if status != 304:
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+    def url(self, path):
+        return self.base + path
+
+    def reset_hits(self):
+        with self._lock:
+            self.hits = {}
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    thread = threading.Thread(target=site.server.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
+
+
+def run_crawl(configs, cwd, settings=None, **runner):
+    """
+    Crawl the serialized SpiderConfigs (see registry.config_from_dict) in a
+    subprocess and return {"items": {name: [...]}, "stats": {name: {...}}}.
+    runner may set shared_dir and node for a DistributedRunAllEngines node.
+    """
+    spec = {"configs": configs, "settings": {"LOG_LEVEL": "ERROR", **(settings or {})}, **runner}
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_PARENT, os.environ.get("PYTHONPATH")])))
+    return subprocess.Popen(
+        [sys.executable, CRAWL_SCRIPT, json.dumps(spec)], cwd=cwd, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+
+
+def crawl_result(process, timeout=120):
+    out, err = process.communicate(timeout=timeout)
+    assert process.returncode == 0, err[-2000:]
+    return json.loads(out.strip().splitlines()[-1])
+
+
+@pytest.fixture
+def crawl(tmp_path):
+    def crawl(configs, settings=None, **runner):
+        return crawl_result(run_crawl(configs, tmp_path, settings, **runner))
+    return crawl
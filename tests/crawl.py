@@ -0,0 +1,32 @@
+# scraper_module/tests/crawl.py
+"""
+Runs one crawl for the tests and prints its items and stats as JSON. The
+argument is a JSON spec: {"configs": [...], "settings": {...}} plus, for a
+distributed node, "shared_dir" and "node".
+"""
+import asyncio
+import json
+import sys
+
+from scraper_module.scraper_lib.distributed import DistributedRunAllEngines
+from scraper_module.scraper_lib.registry import config_from_dict
+from scraper_module.scraper_lib.runner import RunAllEngines
+from scraper_module.scraper_lib.scraper_engine import ScraperEngine
+
+
+def main(spec):
+    engines = [ScraperEngine(config_from_dict(config)) for config in spec["configs"]]
+    if spec.get("shared_dir"):
+        runner = DistributedRunAllEngines(
+            engines, spec["shared_dir"], spec["settings"], node=spec["node"],
+            lease_seconds=spec.get("lease_seconds", 10), poll_seconds=0.2,
+        )
+        items = asyncio.run(runner.run_all())
+    else:
+        runner = RunAllEngines(engines, spec["settings"])
+        items = runner.run_all()
+    print(json.dumps({"items": items, "stats": runner.stats}, default=str))
+
+
+if __name__ == "__main__":
+    main(json.loads(sys.argv[1]))
@@ -0,0 +1,76 @@
+# scraper_module/tests/test_dedup.py
+import json
+
+COURSES = '<div id="c"><p><span>Algebra</span><em>one</em></p><p><span>Algebra</span><em>two</em></p></div>'
+SECTIONS = '<div id="s"><p><span>Lab</span><em>A</em></p><p><span>Lab</span><em>B</em></p></div>'
+
+
+def find(container, dedup_keys=None):
+    return {
+        "type": "find", "task_name": container, "search_space": f'xpath://div[@id="{container}"]',
+        "repeating_selector": "xpath:./p", "fields": {"title": "xpath:./span/text()", "d": "xpath:./em/text()"},
+        "dedup_keys": dedup_keys,
+    }
+
+
+def config(site, name, tasks, **options):
+    return {"name": name, "start_url": site.url("/"), "tasks": tasks, **options}
+
+
+def values(result, name):
+    return sorted(item["d"] for item in result["items"][name])
+
+
+def test_dedup_is_opt_in(site, crawl):
+    site.pages["/"] = f"<html><body>{COURSES}{COURSES}</body></html>"
+    result = crawl([config(site, "plain", [find("c")])])
+
+    assert values(result, "plain") == ["one", "one", "two", "two"]
+    assert not any(key.startswith("dedup/") for key in result["stats"]["plain"])
+
+
+def test_dedup_keys_apply_to_their_own_find_step(site, crawl):
+    site.pages["/"] = f"<html><body>{COURSES}{SECTIONS}</body></html>"
+    result = crawl([
+        config(site, "keyed", [find("c", ["title"])], dedup=True),
+        # Items come from the last Find, which keys on all its fields.
+        config(site, "chain", [find("c", ["title"]), find("s")], dedup=True),
+    ])
+
+    assert values(result, "keyed") == ["one"]
+    assert values(result, "chain") == ["A", "B"]
+    assert result["stats"]["keyed"]["dedup/duplicates"] == 1
+
+
+def test_dedup_store_spans_runs(site, tmp_path, crawl):
+    site.pages["/"] = f"<html><body>{COURSES}</body></html>"
+    options = {"dedup": True, "dedup_store": str(tmp_path / "items.sqlite3")}
+    first = crawl([config(site, "stored", [find("c")], **options)])
+    second = crawl([config(site, "stored", [find("c")], **options)])
+
+    assert values(first, "stored") == ["one", "two"]
+    assert values(second, "stored") == []
+    assert second["stats"]["stored"]["dedup/duplicates/store"] == 2
+
+
+def test_resumed_crawl_keys_restored_items_like_new_ones(site, tmp_path, crawl):
+    for n in range(4):
+        rows = "".join(f"<p><span>T{n}-{i}</span><em>{i}</em></p>" for i in range(3))
+        links = "".join(f'<a href="/p{j}">{j}</a>' for j in range(4))
+        site.pages[f"/p{n}"] = f'<html><body><div id="c">{rows}</div><div id="pg">{links}</div></body></html>'
+    options = {
+        "resume": True, "state_dir": str(tmp_path / "state"), "dedup": True,
+        "pagination": {"type": "listed_links", "search_space": 'xpath://div[@id="pg"]', "link_selector": "xpath:a"},
+    }
+    tasks = [dict(find("c", ["title"]), fields={"title": "xpath:./span/text()", "n": "xpath:./em/text()"})]
+    cfg = dict(config(site, "resumed", tasks, **options), start_url=site.url("/p0"))
+    stopped = crawl([cfg], {"CONCURRENT_REQUESTS": 1, "CLOSESPIDER_ITEMCOUNT": 2})
+    resumed = crawl([cfg], {"CONCURRENT_REQUESTS": 1})
+
+    assert stopped["stats"]["resumed"]["finish_reason"] == "closespider_itemcount"
+    assert resumed["stats"]["resumed"]["finish_reason"] == "finished"
+    items = resumed["items"]["resumed"]
+    titles = [item["title"] for item in items]
+    assert sorted(titles) == sorted(f"T{n}-{i}" for n in range(4) for i in range(3))
+    assert resumed["stats"]["resumed"].get("dedup/duplicates", 0) == 0
+    assert all(set(item) == {"title", "n", "source"} for item in items), json.dumps(items)
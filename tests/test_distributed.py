@@ -0,0 +1,62 @@
+# scraper_module/tests/test_distributed.py
+from conftest import crawl_result, run_crawl
+
+PAGES = 30
+
+
+def listing(site, title=lambda n, i: f"T{n}-{i}"):
+    for n in range(PAGES):
+        rows = "".join(f"<p><span>{title(n, i)}</span><em>{n}</em></p>" for i in range(3))
+        # The first page links to all the others, so there are requests for a second node to claim.
+        links = "".join(f'<a href="/p{j}">{j}</a>' for j in (range(1, PAGES) if n == 0 else [(n + 1) % PAGES]))
+        site.pages[f"/p{n}"] = f'<html><body><div id="c">{rows}</div><div id="pg">{links}</div></body></html>'
+
+
+def config(site, name, **options):
+    return {
+        "name": name,
+        "start_url": site.url("/p0"),
+        "pagination": {"type": "listed_links", "search_space": 'xpath://div[@id="pg"]', "link_selector": "xpath:a"},
+        "tasks": [{
+            "type": "find", "task_name": "rows", "search_space": 'xpath://div[@id="c"]',
+            "repeating_selector": "xpath:./p", "fields": {"title": "xpath:./span/text()", "page": "xpath:./em/text()"},
+            "dedup_keys": ["title"],
+        }],
+        **options,
+    }
+
+
+def run_nodes(configs, tmp_path, nodes=2):
+    shared = tmp_path / "shared"
+    processes = [
+        run_crawl(configs, tmp_path, {"CONCURRENT_REQUESTS": 2}, shared_dir=str(shared), node=f"node{i}")
+        for i in range(nodes)
+    ]
+    return [crawl_result(process) for process in processes]
+
+
+def test_nodes_share_the_crawl_and_one_merges_it(site, tmp_path):
+    # Slow enough that the second node joins before the first is done.
+    site.delay = 0.1
+    listing(site)
+    results = run_nodes([config(site, "dist")], tmp_path)
+
+    merged = [result["items"]["dist"] for result in results if "dist" in result["items"]]
+    assert len(merged) == 1
+    assert sorted(item["title"] for item in merged[0]) == sorted(f"T{n}-{i}" for n in range(PAGES) for i in range(3))
+    # Visited URLs are claimed in the shared store, so no page is fetched twice.
+    assert site.hits == {f"/p{n}": 1 for n in range(PAGES)}
+    fetched = [result["stats"]["dist"].get("response_received_count", 0) for result in results if "dist" in result["stats"]]
+    assert sum(fetched) == PAGES
+    assert len(fetched) == 2 and min(fetched) > 0
+
+
+def test_item_dedup_spans_nodes(site, tmp_path):
+    # Every title appears on two pages, which the nodes may fetch separately.
+    listing(site, title=lambda n, i: f"T{n // 2}-{i}")
+    results = run_nodes([config(site, "dist", dedup=True)], tmp_path)
+
+    merged = [result["items"]["dist"] for result in results if "dist" in result["items"]]
+    assert len(merged) == 1
+    titles = [item["title"] for item in merged[0]]
+    assert sorted(titles) == sorted(f"T{n}-{i}" for n in range(PAGES // 2) for i in range(3))
@@ -0,0 +1,75 @@
+# scraper_module/tests/test_incremental.py
+import pytest
+
+PAGES = 4
+
+
+def listing(site, rows=lambda n: [f"Course {n}-{i}" for i in range(3)]):
+    for n in range(PAGES):
+        items = "".join(f"<p><span>{title}</span><em>{n}</em></p>" for title in rows(n))
+        links = "".join(f'<a href="/p{j}">{j}</a>' for j in range(PAGES))
+        site.pages[f"/p{n}"] = f'<html><body><div id="c">{items}</div><div id="pg">{links}</div></body></html>'
+
+
+def config(site, tmp_path, fields=None):
+    return {
+        "name": "incr",
+        "start_url": site.url("/p0"),
+        "incremental": True,
+        "cache_dir": str(tmp_path / "http_cache"),
+        "pagination": {"type": "listed_links", "search_space": 'xpath://div[@id="pg"]', "link_selector": "xpath:a"},
+        "tasks": [{
+            "type": "find", "task_name": "courses", "search_space": 'xpath://div[@id="c"]',
+            "repeating_selector": "xpath:./p", "fields": fields or {"title": "xpath:./span/text()"},
+        }],
+    }
+
+
+def items(result):
+    return sorted(result["items"]["incr"], key=lambda item: item["title"])
+
+
+def titles(result):
+    return [item["title"] for item in items(result)]
+
+
+@pytest.mark.parametrize("etags", [True, False])
+def test_unchanged_pages_replay_their_items(site, tmp_path, crawl, etags):
+    site.etags = etags
+    listing(site)
+    first = crawl([config(site, tmp_path)])
+    second = crawl([config(site, tmp_path)])
+
+    assert items(second) == items(first)
+    assert len(items(first)) == PAGES * 3
+    stats = second["stats"]["incr"]
+    assert stats["incremental/replayed_pages"] == PAGES
+    # With an ETag the server answers 304s, without one the body hash matches.
+    assert stats["incremental/not_modified" if etags else "incremental/unchanged"] == PAGES
+
+
+def test_changed_page_is_parsed_again(site, tmp_path, crawl):
+    listing(site)
+    crawl([config(site, tmp_path)])
+    listing(site, rows=lambda n: [f"Course {n}-{i}" for i in range(4 if n == 2 else 3)])
+    second = crawl([config(site, tmp_path)])
+
+    assert "Course 2-3" in titles(second)
+    assert len(titles(second)) == PAGES * 3 + 1
+    stats = second["stats"]["incr"]
+    assert stats["incremental/replayed_pages"] == PAGES - 1
+    assert stats["incremental/changed"] == 1
+
+
+def test_changed_tasks_parse_unchanged_pages_again(site, tmp_path, crawl):
+    listing(site)
+    crawl([config(site, tmp_path)])
+    fields = {"title": "xpath:./span/text()", "page": "xpath:./em/text()"}
+    second = crawl([config(site, tmp_path, fields)])
+    third = crawl([config(site, tmp_path, fields)])
+
+    assert all("page" in item for item in second["items"]["incr"])
+    assert "incremental/replayed_pages" not in second["stats"]["incr"]
+    # The items are stored again for the new tasks, so the next run replays them.
+    assert items(third) == items(second)
+    assert third["stats"]["incr"]["incremental/replayed_pages"] == PAGES